@@ -27,9 +27,19 @@ CELERYBEAT_SCHEDULE = {
         'task': 'clean_colls_cache',
         'schedule': crontab(hour='*/1', minute=30)
     },
+    'precalc-tt-norms': {
+        'task': 'precalc_tt_norms',
+        'schedule': crontab(hour=2, minute=0),
+        'kwargs': dict(user_id=None, corp_id='susanne', subcorp=None, subcnorm='tokens')
+    },
     'clean-tckc-cache': {
         'task': 'token_connect.clean_cache',
         'schedule': crontab(day_of_week=0, hour=3, minute=30),
         'kwargs': dict(cache_size=10000000)
+    },
+    'db-delete-expired': {
+        'task': 'db.delete_expired',
+        'schedule': crontab(minute='*/15'),
+        'kwargs': dict(chunk_size=1000)
     }
 }
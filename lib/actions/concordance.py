@@ -1130,22 +1130,22 @@ class Actions(Querying):
             self._headers['Content-Disposition'] = 'attachment; filename="%s"' % (
                 mkfilename(saveformat),)
 
-            for block in result['Blocks']:
-                col_names = [item['n'] for item in block['Head'][:-2]] + ['freq', 'freq [%]']
-                if saveformat == 'xml':
-                    col_names.insert(0, 'str')
-                if hasattr(writer, 'add_block'):
-                    writer.add_block('')  # TODO block name
-
-                if colheaders or heading:
-                    writer.writeheading([''] + [item['n'] for item in block['Head'][:-2]] +
-                                        ['freq', 'freq [%]'])
-                i = 1
-                for item in block['Items']:
-                    writer.writerow(i, [w['n'] for w in item['Word']] + [str(item['freq']),
-                                                                         str(item.get('rel', ''))])
-                    i += 1
-            output = writer.raw_content()
+            def freq_rows():
+                for block in result['Blocks']:
+                    col_names = [item['n'] for item in block['Head'][:-2]] + ['freq', 'freq [%]']
+                    if saveformat == 'xml':
+                        col_names.insert(0, 'str')
+                    if hasattr(writer, 'add_block'):
+                        writer.add_block('')  # TODO block name
+
+                    if colheaders or heading:
+                        writer.writeheading([''] + [item['n'] for item in block['Head'][:-2]] +
+                                            ['freq', 'freq [%]'])
+                    i = 1
+                    for item in block['Items']:
+                        yield i, [w['n'] for w in item['Word']] + [str(item['freq']), str(item.get('rel', ''))]
+                        i += 1
+            output = writer.stream_rows(freq_rows())
         return output
 
     @exposed(access_level=0, template='freqs.html', page_model='freq', accept_kwargs=True, func_arg_mapped=True)
@@ -1343,12 +1343,9 @@ class Actions(Querying):
                 self._headers['Content-Disposition'] = f'attachment; filename="{mk_filename(saveformat)}"'
                 if colheaders or heading:
                     writer.writeheading([''] + [item['n'] for item in result.Head])
-                i = 1
-                for item in result.Items:
-                    writer.writerow(
-                        i, (item['str'], str(item['freq'])) + tuple([str(stat['s']) for stat in item['Stats']]))
-                    i += 1
-                out_data = writer.raw_content()
+                out_data = writer.stream_rows(
+                    (i, (item['str'], str(item['freq'])) + tuple([str(stat['s']) for stat in item['Stats']]))
+                    for i, item in enumerate(result.Items, 1))
             else:
                 raise UserActionException(f'Unknown format: {saveformat}')
             return out_data
@@ -1434,6 +1431,32 @@ class Actions(Querying):
                 ans.append(ans_item)
             return ans
 
+        def conc_rows(line_chunks, first_line_num, add_linegroup):
+            """
+            Generate export rows out of chunks of KWIC lines
+            """
+            try:
+                line_num = first_line_num
+                for lines in line_chunks:
+                    for line in lines:
+                        if 'Left' in line:
+                            left_key, kwic_key, right_key = 'Left', 'Kwic', 'Right'
+                        elif 'Sen_Left' in line:
+                            left_key, kwic_key, right_key = 'Sen_Left', 'Kwic', 'Sen_Right'
+                        else:
+                            raise ConcordanceQueryParamsError(translate('Invalid data'))
+                        lang_rows = process_lang(line, left_key, kwic_key, right_key,
+                                                 add_linegroup=add_linegroup)
+                        if 'Align' in line:
+                            lang_rows += process_lang(line['Align'], left_key, kwic_key, right_key,
+                                                      add_linegroup=False)
+                        yield (str(line_num) if numbering else None, *lang_rows)
+                        line_num += 1
+            except Exception as ex:
+                # HTTP headers are already sent here so we can only log the error
+                logging.getLogger(__name__).error(f'Failed to export concordance: {ex}')
+                raise ex
+
         try:
             corpus_info = self.get_corpus_info(self.args.corpname)
             self._apply_viewmode(corpus_info['sentence_struct'])
@@ -1465,10 +1488,9 @@ class Actions(Querying):
             kwic_args.rightctx = self.args.rightctx
             kwic_args.structs = self._get_struct_opts()
 
-            data = kwic.kwicpage(kwic_args)
-
             def mkfilename(suffix): return f'{self.args.corpname}-concordance.{suffix}'
             if saveformat == 'text':
+                data = kwic.kwicpage(kwic_args)
                 self._headers['Content-Type'] = 'text/plain'
                 self._headers['Content-Disposition'] = 'attachment; filename="{}"'.format(
                     mkfilename('txt'))
@@ -1488,7 +1510,7 @@ class Actions(Querying):
                 self._headers['Content-Disposition'] = 'attachment; filename="%s"' % (
                     mkfilename(saveformat),)
 
-                if len(data['Lines']) > 0:
+                if to_line > from_line - 1:
                     aligned_corpora = [self.corp] + \
                                       [self.cm.get_corpus(c) for c in self.args.align if c]
                     writer.set_corpnames([c.get_conf('NAME') or c.get_conffile()
@@ -1498,8 +1520,8 @@ class Actions(Querying):
                         writer.writeheading({
                             'corpus': self._human_readable_corpname(),
                             'subcorpus': self.args.usesubcorp,
-                            'concordance_size': data['concsize'],
-                            'arf': data['result_arf'],
+                            'concordance_size': conc.size(),
+                            'arf': '' if self.corp.is_subcorpus else round(conc.compute_ARF(), 2),
                             'query': ['%s: %s (%s)' % (x['op'], x['arg'], x['size'])
                                       for x in self.concdesc_json().get('Desc', [])]
                         })
@@ -1510,32 +1532,11 @@ class Actions(Querying):
                                      [(x, x) for x in self.corp.get_conf('STRUCTATTRLIST').split(',')])
                         used_refs = [x[1] for x in used_refs if x[0] in refs_args]
                         writer.write_ref_headings([''] + used_refs if numbering else used_refs)
-
-                    if 'Left' in data['Lines'][0]:
-                        left_key = 'Left'
-                        kwic_key = 'Kwic'
-                        right_key = 'Right'
-                    elif 'Sen_Left' in data['Lines'][0]:
-                        left_key = 'Sen_Left'
-                        kwic_key = 'Kwic'
-                        right_key = 'Sen_Right'
-                    else:
-                        raise ConcordanceQueryParamsError(translate('Invalid data'))
-
-                    for i in range(len(data['Lines'])):
-                        line = data['Lines'][i]
-                        if numbering:
-                            row_num = str(i + from_line)
-                        else:
-                            row_num = None
-
-                        lang_rows = process_lang(line, left_key, kwic_key, right_key,
-                                                 add_linegroup=self._lines_groups.is_defined())
-                        if 'Align' in line:
-                            lang_rows += process_lang(line['Align'], left_key, kwic_key, right_key,
-                                                      add_linegroup=False)
-                        writer.writerow(row_num, *lang_rows)
-                output = writer.raw_content()
+                    line_chunks = kwic.iter_kwiclines(kwic_args)
+                else:
+                    line_chunks = ()
+                output = writer.stream_rows(
+                    conc_rows(line_chunks, from_line, add_linegroup=self._lines_groups.is_defined()))
             else:
                 raise UserActionException(translate('Unknown export data type'))
             return output
@@ -283,11 +283,7 @@ class ParadigmaticQuery(Kontext):
         if colheaders or heading:
             writer.writeheading(['', 'value', 'freq'])
 
-        for (i, row) in enumerate(freqs):
-            writer.writerow(i + 1, row)
-
-        output = writer.raw_content()
-        return output
+        return writer.stream_rows((i + 1, row) for i, row in enumerate(freqs))
 
     def _add_save_menu_item(self, label: str, save_format: Optional[str] = None, hint: Optional[str] = None):
         if save_format is None:
@@ -273,11 +273,7 @@ class Wordlist(Kontext):
                     'pattern': self._curr_wlform_args.wlpat
                 })
 
-            i = 1
-            for item in data:
-                writer.writerow(i, (item[0], str(item[1])))
-                i += 1
-            return writer.raw_content()
+            return writer.stream_rows((i, (item[0], str(item[1]))) for i, item in enumerate(data, 1))
         return None
 
     @exposed(func_arg_mapped=True, return_type='json')
@@ -12,17 +12,17 @@
 # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 # GNU General Public License for more details.
 
-import pickle
 import hashlib
 import os
 import time
-from typing import List, Any, Optional
+from typing import List, Any, Optional, Dict
 from dataclasses import dataclass, field, asdict
 
 import corplib
 from conclib.calc import require_existing_conc
 from corplib.errors import MissingSubCorpFreqFile
 from bgcalc import freq_calc
+from bgcalc import columnar_cache
 import settings
 from bgcalc.errors import UnfinishedConcordanceError
 from translation import ugettext as _
@@ -70,7 +70,7 @@ class CollCalcCache(object):
 
     def _cache_file_path(self, cattr, csortfn, cbgrfns, cfromw, ctow, cminbgr, cminfreq):
         v = f'{self._corpname}{self._subcname}{self._user_id}{"".join(self._q)}{cattr}{csortfn}{cbgrfns}{cfromw}{ctow}{cminbgr}{cminbgr}{cminfreq}'
-        filename = f'{hashlib.sha1(v.encode("utf-8")).hexdigest()}.pkl'
+        filename = f'{hashlib.sha1(v.encode("utf-8")).hexdigest()}.kcol'
         return os.path.join(settings.get('corpora', 'colls_cache_dir'), filename)
 
     def get(self, cattr, csortfn, cbgrfns, cfromw, ctow, cminbgr, cminfreq):
@@ -78,18 +78,26 @@ class CollCalcCache(object):
         Get value from cache.
 
         returns:
-        a 2-tuple (cached_data, cache_path)  where cached_data is None in case of cache miss
+        a 2-tuple (cached_data, cache_path)  where cached_data is a memory-mapped
+        columnar_cache.ColumnarResult (the caller is responsible for closing it)
+        or None in case of cache miss
         """
         cache_path = self._cache_file_path(cattr=cattr, csortfn=csortfn, cbgrfns=cbgrfns, cfromw=cfromw, ctow=ctow,
                                            cminbgr=cminbgr, cminfreq=cminfreq)
         if os.path.isfile(cache_path):
-            with open(cache_path, 'rb') as f:
-                collocs = pickle.load(f)
+            collocs = columnar_cache.ColumnarResult(cache_path)
         else:
             collocs = None
         return collocs, cache_path
 
 
+def save_colls_cache(cache_path: str, collocs: Dict[str, Any]):
+    """
+    Store collocations (as returned by calculate_colls_bg in 'data') in the columnar format
+    """
+    columnar_cache.save(cache_path, {}, [(dict(Head=collocs['Head']), collocs['Items'])])
+
+
 # TODO !!!! FIX (missing user-id, deprecated handling of MissingSubCorpFreqFile
 def calculate_colls_bg(coll_args: CollCalcArgs):
     """
@@ -153,14 +161,21 @@ def calculate_colls(coll_args: CollCalcArgs) -> CalculateCollsResult:
     collocs, cache_path = cache.get(cattr=coll_args.cattr, csortfn=coll_args.csortfn, cbgrfns=coll_args.cbgrfns,
                                     cfromw=coll_args.cfromw, ctow=coll_args.ctow, cminbgr=coll_args.cminbgr,
                                     cminfreq=coll_args.cminfreq)
-    if collocs is None:
-        coll_args.cache_path = cache_path
-        app = bgcalc.calc_backend_client(settings)
-        res = app.send_task('calculate_colls', args=(coll_args,), time_limit=TASK_TIME_LIMIT)
-        # worker task caches the value AFTER the result is returned (see worker.py)
-        ans = res.get()
-    else:
-        ans = dict(data=collocs, processing=0)
+    if collocs is not None:
+        with collocs:
+            table = collocs.tables[0]
+            return CalculateCollsResult(
+                Head=table.meta['Head'],
+                attrname=coll_args.cattr,
+                processing=0,
+                lastpage=not collstart + coll_args.citemsperpage < table.num_rows,
+                Items=table.rows(collstart, collend)
+            )
+    coll_args.cache_path = cache_path
+    app = bgcalc.calc_backend_client(settings)
+    res = app.send_task('calculate_colls', args=(coll_args,), time_limit=TASK_TIME_LIMIT)
+    # worker task caches the value (see worker/general.py)
+    ans = res.get()
     return CalculateCollsResult(
         Head=ans['data']['Head'],
         attrname=coll_args.cattr,
@@ -0,0 +1,171 @@
+# Copyright (c) 2021 Charles University, Faculty of Arts,
+#                    Institute of the Czech National Corpus
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 2
+# dated June, 1991.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+"""
+A compact columnar file format for caching results consisting of
+one or more tables of homogeneous rows (dicts), e.g. frequency distributions
+or collocations. The file can be memory-mapped and sliced by rows
+without loading (and decoding) the whole result.
+
+File structure:
+  MAGIC (8 bytes)
+  header length (8 bytes, little endian)
+  header (JSON; meta-data, tables, their columns and data offsets)
+  column data (each column aligned to 8 bytes)
+
+Column types:
+  'q' -- 64-bit integers
+  'd' -- 64-bit floats
+  's' -- JSON-encoded values stored as a string table (an array of num_rows + 1
+         64-bit offsets followed by concatenated UTF-8 data)
+"""
+
+import os
+import json
+import mmap
+import struct
+from array import array
+from typing import Dict, Any, List, Tuple, Optional
+
+MAGIC = b'KCOLv01\n'
+
+_HEADER_LEN_FMT = '<Q'
+
+
+def _detect_column_type(values: List[Any]) -> str:
+    if all(type(v) is int for v in values):
+        return 'q'
+    if all(type(v) in (int, float) for v in values):
+        return 'd'
+    return 's'
+
+
+def _pad(data: bytes) -> bytes:
+    return data + b'\x00' * (-len(data) % 8)
+
+
+def _encode_column(ctype: str, values: List[Any]) -> Tuple[bytes, Dict[str, Any]]:
+    if ctype in ('q', 'd'):
+        return array(ctype, values).tobytes(), {}
+    encoded = [json.dumps(v).encode('utf-8') for v in values]
+    offsets = array('Q', [0])
+    for item in encoded:
+        offsets.append(offsets[-1] + len(item))
+    offsets_data = offsets.tobytes()
+    return offsets_data + b''.join(encoded), dict(data_offset=len(offsets_data))
+
+
+def save(path: str, meta: Dict[str, Any], tables: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]):
+    """
+    Save tables into a columnar file. The file is written atomically (via a temporary file).
+
+    arguments:
+    path -- a path of the target file
+    meta -- any JSON-serializable meta-data of the whole result
+    tables -- a list of pairs (table meta-data, list of rows); all the rows within
+              a table are expected to have the same keys (missing values are stored as None)
+    """
+    header_tables = []
+    chunks = []
+    offset = 0
+    for table_meta, rows in tables:
+        col_names = []
+        for row in rows:
+            for k in row.keys():
+                if k not in col_names:
+                    col_names.append(k)
+        columns = []
+        for name in col_names:
+            values = [row.get(name) for row in rows]
+            ctype = _detect_column_type(values)
+            data, extra = _encode_column(ctype, values)
+            columns.append(dict(name=name, type=ctype, offset=offset, size=len(data), **extra))
+            data = _pad(data)
+            chunks.append(data)
+            offset += len(data)
+        header_tables.append(dict(meta=table_meta, num_rows=len(rows), columns=columns))
+    header = _pad(json.dumps(dict(meta=meta, tables=header_tables)).encode('utf-8'))
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as fw:
+        fw.write(MAGIC)
+        fw.write(struct.pack(_HEADER_LEN_FMT, len(header)))
+        fw.write(header)
+        for chunk in chunks:
+            fw.write(chunk)
+    os.replace(tmp_path, path)
+
+
+class ColumnarTable(object):
+    """
+    A lazily decoded table backed by a memory-mapped file
+    """
+
+    def __init__(self, buff: memoryview, data_start: int, header: Dict[str, Any]):
+        self._buff = buff
+        self._data_start = data_start
+        self.meta: Dict[str, Any] = header['meta']
+        self.num_rows: int = header['num_rows']
+        self._columns = header['columns']
+
+    def _column_slice(self, col: Dict[str, Any], start: int, end: int) -> List[Any]:
+        pos = self._data_start + col['offset']
+        if col['type'] in ('q', 'd'):
+            return list(self._buff[pos + start * 8:pos + end * 8].cast(col['type']))
+        offsets = self._buff[pos + start * 8:pos + (end + 1) * 8].cast('Q')
+        str_pos = pos + col['data_offset']
+        return [json.loads(bytes(self._buff[str_pos + offsets[i]:str_pos + offsets[i + 1]]))
+                for i in range(len(offsets) - 1)]
+
+    def rows(self, start: int = 0, end: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Return rows within [start, end) (i.e. the semantics is the same as in case of Python slices
+        with non-negative indices). Only the requested rows are decoded.
+        """
+        end = self.num_rows if end is None else min(end, self.num_rows)
+        start = min(max(start, 0), end)
+        if start == end:
+            return []
+        cols = [(col['name'], self._column_slice(col, start, end)) for col in self._columns]
+        return [dict((name, values[i]) for name, values in cols) for i in range(end - start)]
+
+
+class ColumnarResult(object):
+    """
+    A memory-mapped columnar file. Please use it as a context manager
+    (or call close() explicitly) - otherwise the file remains mapped.
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as fr:
+            self._mmap = mmap.mmap(fr.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buff = memoryview(self._mmap)
+        if bytes(self._buff[:len(MAGIC)]) != MAGIC:
+            self.close()
+            raise ValueError(f'Unsupported columnar cache file {path}')
+        hpos = len(MAGIC) + struct.calcsize(_HEADER_LEN_FMT)
+        (header_len,) = struct.unpack(_HEADER_LEN_FMT, self._buff[len(MAGIC):hpos])
+        header = json.loads(bytes(self._buff[hpos:hpos + header_len]).rstrip(b'\x00'))
+        self.meta: Dict[str, Any] = header['meta']
+        self.tables: List[ColumnarTable] = [ColumnarTable(self._buff, hpos + header_len, t)
+                                            for t in header['tables']]
+
+    def close(self):
+        self.tables = []
+        self._buff.release()
+        self._mmap.close()
+
+    def __enter__(self) -> 'ColumnarResult':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -12,30 +12,269 @@
 # MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
 # GNU General Public License for more details.
 
+"""
+A CSV cache for row-based results (word lists, paradigmatic queries).
+
+Besides the CSV file itself ([path]), the cache consists of the following
+binary files:
+
+[path].idx -- byte offsets of all the data rows (num_rows + 1 64-bit values,
+              the last one is the end of the last row = the size of the CSV file)
+[path].[sort_id].perm -- a permutation of row numbers (32-bit values) representing
+              an ascending order according to some sorting key
+[path].[sort_id].desc.perm -- the same for the descending order (rows with equal keys
+              keep their stored order - just like with sorted(..., reverse=True))
+
+This allows loading any page in any supported order by a seek and a bounded read.
+Index files missing for any reason (e.g. older cache files, a sorting key not known
+in the time of writing the data) are created on demand. A row index not matching
+the CSV file (i.e. a file replaced by a concurrent writer) is rebuilt.
+"""
+
 import csv
+import glob
+import io
+import os
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
+_OFFSET_TYPE = 'Q'
 
-def load_cached_partial(path, offset, limit):
-    with open(path, 'r') as fr:
-        csv_reader = csv.reader(fr)
-        _, total_str = next(csv_reader)
-        for i in range(0, offset):
-            next(csv_reader)
+_PERM_TYPE = 'I'
+
+PermutationFactory = Callable[[List[Tuple]], Sequence[int]]
+
+
+def _index_path(path: str) -> str:
+    return f'{path}.idx'
+
+
+def _perm_path(path: str, sort_id: str, reverse: bool = False) -> str:
+    return f'{path}.{sort_id}.desc.perm' if reverse else f'{path}.{sort_id}.perm'
+
+
+def _descending(factory: PermutationFactory) -> PermutationFactory:
+    """
+    Create a factory of a descending permutation out of an ascending one. To keep
+    the stored order of rows with equal keys (as sorted(..., reverse=True) does),
+    the ascending (stable) permutation of the reversed rows is reversed.
+    """
+    def fn(rows):
+        last = len(rows) - 1
+        return [last - i for i in reversed(factory(rows[::-1]))]
+    return fn
+
+
+def _decode_row(row: List[str]) -> Tuple:
+    return (row[0], ) + tuple(int(x) for x in row[1:])
+
+
+def _write_array(path: str, data: array, keep_tmp: bool = False) -> str:
+    """
+    Write an array via a temporary file which is renamed to the path
+    (or just returned in case of keep_tmp=True)
+    """
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as fw:
+        data.tofile(fw)
+    if keep_tmp:
+        return tmp_path
+    os.rename(tmp_path, path)
+    return path
+
+
+def _read_array(fr, typecode: str, start: int, end: int) -> array:
+    data = array(typecode)
+    if end > start:
+        fr.seek(start * data.itemsize)
+        data.frombytes(fr.read((end - start) * data.itemsize))
+    return data
+
+
+def save_cached(path: str, total: Any, rows: Sequence[Sequence[Any]],
+                permutations: Optional[Dict[str, PermutationFactory]] = None):
+    """
+    Write rows to a CSV cache file along with its row index and
+    with (optional) permutation indices (for both ascending and descending order).
+
+    All the files are written as temporary ones first. The CSV file is renamed
+    first so readers never combine a new index with an old CSV file (the opposite
+    case is detected by readers, see _is_valid_index()).
+
+    arguments:
+    path -- a path of the CSV file
+    total -- a value stored in the first ('__total__') row
+    rows -- data rows
+    permutations -- sort_id => function returning row numbers in ascending order
+                    (the function receives the rows as they are stored)
+    """
+    for old_perm in glob.glob(glob.escape(path) + '.*.perm'):
+        os.unlink(old_perm)
+    offsets = array(_OFFSET_TYPE)
+    buff = io.StringIO()
+    csv_writer = csv.writer(buff)
+
+    def encode(row):
+        buff.seek(0)
+        buff.truncate()
+        csv_writer.writerow(row)
+        return buff.getvalue().encode('utf-8')
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as fw:
+        fw.write(encode(('__total__', total)))
+        for row in rows:
+            offsets.append(fw.tell())
+            fw.write(encode(row))
+        offsets.append(fw.tell())
+    tmp_files = [(_write_array(_index_path(path), offsets, keep_tmp=True), _index_path(path))]
+    for sort_id, factory in (permutations or {}).items():
+        for reverse, fn in ((False, factory), (True, _descending(factory))):
+            perm_path = _perm_path(path, sort_id, reverse)
+            tmp_files.append((_write_array(perm_path, array(_PERM_TYPE, fn(rows)), keep_tmp=True), perm_path))
+    os.rename(tmp_path, path)
+    for tmp_file, target in tmp_files:
+        os.rename(tmp_file, target)
+
+
+def _read_total(fr) -> int:
+    fr.seek(0)
+    _, total_str = next(csv.reader(io.StringIO(fr.readline().decode('utf-8'))))
+    return int(total_str)
+
+
+def _create_index(path: str) -> array:
+    """
+    Create a row index of a CSV file. Rows are detected by the CSV reader
+    as a single row may span multiple lines (quoted newlines).
+    """
+    offsets = array(_OFFSET_TYPE)
+    with open(path, 'rb') as fr:
+        pos = 0
+
+        def lines():
+            nonlocal pos
+            for line in fr:
+                pos += len(line)
+                yield line.decode('utf-8')
+
+        csv_reader = csv.reader(lines())
+        next(csv_reader)  # skip the '__total__' row
+        offsets.append(pos)
+        for _ in csv_reader:
+            offsets.append(pos)
+    _write_array(_index_path(path), offsets)
+    return offsets
+
+
+def _is_valid_index(path: str) -> bool:
+    """
+    Test whether the row index exists and matches the CSV file
+    (the last offset must be equal to the size of the file)
+    """
+    try:
+        with open(_index_path(path), 'rb') as fr:
+            fr.seek(-array(_OFFSET_TYPE).itemsize, os.SEEK_END)
+            last = array(_OFFSET_TYPE, fr.read())
+        return last[0] == os.path.getsize(path)
+    except (FileNotFoundError, OSError):
+        return False
+
+
+def _num_rows(path: str) -> int:
+    if _is_valid_index(path):
+        size = os.path.getsize(_index_path(path))
+    else:
+        size = len(_create_index(path)) * array(_OFFSET_TYPE).itemsize
+    return size // array(_OFFSET_TYPE).itemsize - 1
+
+
+def _read_offsets(path: str, start: int, end: int) -> array:
+    """
+    Return offsets of rows [start, end] (i.e. including the end
+    of the last row in the range). The index is expected to be
+    checked (or created) by _num_rows() before.
+    """
+    with open(_index_path(path), 'rb') as fr:
+        return _read_array(fr, _OFFSET_TYPE, start, end + 1)
+
+
+def _read_rows(fr, start_pos: int, end_pos: int) -> List[Tuple]:
+    fr.seek(start_pos)
+    data = fr.read(end_pos - start_pos).decode('utf-8')
+    return [_decode_row(row) for row in csv.reader(io.StringIO(data, newline=''))]
+
+
+def _ensure_permutation(path: str, sort_id: str, factory: PermutationFactory, num_rows: int,
+                        reverse: bool) -> str:
+    perm_path = _perm_path(path, sort_id, reverse)
+    try:
+        if os.path.getsize(perm_path) == num_rows * array(_PERM_TYPE).itemsize:
+            return perm_path
+    except FileNotFoundError:
+        pass
+    _, rows = load_cached_full(path)
+    _write_array(perm_path, array(_PERM_TYPE, _descending(factory)(rows) if reverse else factory(rows)))
+    return perm_path
+
+
+def load_cached_partial(path: str, offset: int, limit: int) -> Tuple[int, List[Tuple]]:
+    """
+    Load rows [offset, offset + limit) in the stored order
+    """
+    num_rows = _num_rows(path)
+    start = min(max(offset, 0), num_rows)
+    end = min(start + limit, num_rows)
+    offsets = _read_offsets(path, start, end)
+    with open(path, 'rb') as fr:
+        total = _read_total(fr)
+        if end == start:
+            return total, []
+        return total, _read_rows(fr, offsets[0], offsets[-1])
+
+
+def load_cached_sorted(path: str, offset: int, limit: int, sort_id: Optional[str] = None,
+                       factory: Optional[PermutationFactory] = None,
+                       reverse: bool = False) -> Tuple[int, List[Tuple]]:
+    """
+    Load rows [offset, offset + limit) of a sorted result. In case sort_id is None,
+    the stored order is used. Otherwise a respective permutation index is used (and
+    created via the factory if it does not exist yet).
+
+    arguments:
+    path -- a path of the CSV file
+    offset -- the first row to load
+    limit -- max. number of rows to load
+    sort_id -- an identifier of the permutation index (it must be usable as a part of a file name)
+    factory -- a function creating the (ascending) permutation in case it does not exist yet
+    reverse -- if True then the descending order is applied (for sort_id=None, the stored
+               order is simply reversed)
+    """
+    num_rows = _num_rows(path)
+    start = min(max(offset, 0), num_rows)
+    end = min(start + limit, num_rows)
+    if sort_id is None:
+        if reverse:
+            total, rows = load_cached_partial(path, num_rows - end, end - start)
+            return total, list(reversed(rows))
+        return load_cached_partial(path, start, end - start)
+
+    with open(_ensure_permutation(path, sort_id, factory, num_rows, reverse), 'rb') as fr:
+        row_ids = _read_array(fr, _PERM_TYPE, start, end)
+    with open(_index_path(path), 'rb') as fr_idx, open(path, 'rb') as fr:
+        total = _read_total(fr)
         ans = []
-        i = offset
-        for row in csv_reader:
-            if i == offset + limit:
-                break
-            ans.append((row[0], ) + tuple(int(x) for x in row[1:]))
-            i += 1
-    return int(total_str), ans
+        for row_id in row_ids:
+            row_start, row_end = _read_array(fr_idx, _OFFSET_TYPE, row_id, row_id + 2)
+            ans.extend(_read_rows(fr, row_start, row_end))
+    return total, ans
 
 
-def load_cached_full(path):
+def load_cached_full(path: str) -> Tuple[int, List[Tuple]]:
     ans = []
-    with open(path, 'r') as fr:
+    with open(path, 'r', newline='') as fr:
         csv_reader = csv.reader(fr)
         _, total_str = next(csv_reader)
         for row in csv_reader:
-            ans.append((row[0], ) + tuple(int(x) for x in row[1:]))
+            ans.append(_decode_row(row))
     return int(total_str), ans
@@ -19,9 +19,8 @@ import time
 import math
 import hashlib
 import logging
-import pickle
 from structures import FixedDict
-from typing import Union, List
+from typing import Union, List, Dict, Any
 
 import manatee
 import corplib
@@ -31,6 +30,7 @@ import settings
 import bgcalc
 from bgcalc.errors import UnfinishedConcordanceError, CalcBackendError
 from bgcalc import AsyncTaskStatus
+from bgcalc import columnar_cache
 from translation import ugettext as _
 from controller.errors import UserActionException
 
@@ -219,20 +219,34 @@ class FreqCalcCache(object):
         v = (str(self._corpname) + str(self._subcname) + str(self._user_id) +
              ''.join(self._q) + str(fcrit) + str(flimit) + str(freq_sort) + str(ml) +
              str(ftt_include_empty) + str(rel_mode) + str(collator_locale))
-        filename = '%s.pkl' % hashlib.sha1(v.encode('utf-8')).hexdigest()
+        filename = '%s.kcol' % hashlib.sha1(v.encode('utf-8')).hexdigest()
         return os.path.join(settings.get('corpora', 'freqs_cache_dir'), filename)
 
     def get(self, fcrit, flimit, freq_sort, ml, ftt_include_empty, rel_mode, collator_locale):
+        """
+        returns:
+        a 2-tuple (cached_data, cache_path) where cached_data is a memory-mapped
+        columnar_cache.ColumnarResult (the caller is responsible for closing it)
+        or None in case of cache miss
+        """
         cache_path = self._cache_file_path(
             fcrit, flimit, freq_sort, ml, ftt_include_empty, rel_mode, collator_locale)
         if os.path.isfile(cache_path):
-            with open(cache_path, 'rb') as f:
-                data = pickle.load(f)
+            data = columnar_cache.ColumnarResult(cache_path)
         else:
             data = None
         return data, cache_path
 
 
+def save_freqs_cache(cache_path: str, calc_result: Dict[str, Any]):
+    """
+    Store a result of calculate_freqs_bg in the columnar format
+    """
+    columnar_cache.save(
+        cache_path, dict(conc_size=calc_result['conc_size']),
+        [(dict((k, v) for k, v in block.items() if k != 'Items'), block['Items']) for block in calc_result['freqs']])
+
+
 def calculate_freqs_bg(args: FreqCalsArgs):
     """
     Calculate actual frequency data.
@@ -267,26 +281,40 @@ def calculate_freqs(args: FreqCalsArgs):
     """
     cache = FreqCalcCache(corpname=args.corpname, subcname=args.subcname, user_id=args.user_id, subcpath=args.subcpath,
                           q=args.q, pagesize=args.pagesize, save=args.save, samplesize=args.samplesize)
-    calc_result, cache_path = cache.get(fcrit=args.fcrit, flimit=args.flimit, freq_sort=args.freq_sort, ml=args.ml,
-                                        ftt_include_empty=args.ftt_include_empty, rel_mode=args.rel_mode,
-                                        collator_locale=args.collator_locale)
-
-    if calc_result is None:
-        args.cache_path = cache_path
-        app = bgcalc.calc_backend_client(settings)
-        res = app.send_task('calculate_freqs', args=(args.to_dict(),),
-                            time_limit=TASK_TIME_LIMIT)
-        # worker task caches the value AFTER the result is returned (see worker.py)
-        calc_result = res.get()
-
+    cached, cache_path = cache.get(fcrit=args.fcrit, flimit=args.flimit, freq_sort=args.freq_sort, ml=args.ml,
+                                   ftt_include_empty=args.ftt_include_empty, rel_mode=args.rel_mode,
+                                   collator_locale=args.collator_locale)
+    if cached is not None:
+        with cached:
+            return _paginate_freqs(args, cached.meta['conc_size'],
+                                   [(t.meta, t.num_rows, t.rows) for t in cached.tables])
+
+    args.cache_path = cache_path
+    app = bgcalc.calc_backend_client(settings)
+    res = app.send_task('calculate_freqs', args=(args.to_dict(),),
+                        time_limit=TASK_TIME_LIMIT)
+    # worker task caches the value (see worker/general.py)
+    calc_result = res.get()
     if calc_result is None:
         raise CalcBackendError('Failed to get result')
-    data = calc_result['freqs']
-    conc_size = calc_result['conc_size']
-    lastpage = None
+    blocks = []
+    for block in calc_result['freqs']:
+        items = block.get('Items', [])
+        blocks.append((dict((k, v) for k, v in block.items() if k != 'Items'), len(items),
+                       lambda start, end, items=items: items[start:end]))
+    return _paginate_freqs(args, calc_result['conc_size'], blocks)
+
 
-    if len(data) == 1:  # a single block => pagination
-        total_length = len(data[0]['Items']) if 'Items' in data[0] else 0
+def _paginate_freqs(args: FreqCalsArgs, conc_size: int, blocks):
+    """
+    arguments:
+    args -- freq. calculation arguments
+    conc_size -- size of the source concordance
+    blocks -- a list of triples (block meta-data, number of items, fn(start, end) returning items[start:end])
+    """
+    lastpage = None
+    if len(blocks) == 1:  # a single block => pagination
+        meta, total_length, get_items = blocks[0]
         items_per_page = args.fmaxitems
         fstart = (args.fpage - 1) * args.fmaxitems
         fmaxitems = args.fmaxitems * args.fpage + 1
@@ -296,16 +324,17 @@ def calculate_freqs(args: FreqCalsArgs):
             lastpage = 0
         ans = [dict(Total=total_length,
                     TotalPages=int(math.ceil(total_length / float(items_per_page))),
-                    Items=data[0]['Items'][fstart:fmaxitems - 1] if 'Items' in data[0] else [],
-                    Head=data[0].get('Head', []),
-                    SkippedEmpty=data[0].get('SkippedEmpty', False))]
+                    Items=get_items(fstart, fmaxitems - 1),
+                    Head=meta.get('Head', []),
+                    SkippedEmpty=meta.get('SkippedEmpty', False))]
     else:
-        for item in data:
-            if 'Items' not in item:
-                item['Items'] = []
-            item['Total'] = len(item['Items'])
+        ans = []
+        for meta, total_length, get_items in blocks:
+            item = dict(meta)
+            item['Items'] = get_items(0, total_length)
+            item['Total'] = total_length
             item['TotalPages'] = None
-        ans = data
+            ans.append(item)
         fstart = None
     return dict(lastpage=lastpage, data=ans, fstart=fstart, fmaxitems=args.fmaxitems, conc_size=conc_size)
 
@@ -25,7 +25,7 @@ import csv
 from .errors import PqueryResultNotFound, PqueryArgumentError
 from typing import Tuple
 from argmapping.pquery import PqueryFormArgs
-from bgcalc.csv_cache import load_cached_partial, load_cached_full
+from bgcalc.csv_cache import load_cached_sorted, save_cached
 
 """
 This module contains function for calculating Paradigmatic queries
@@ -52,9 +52,25 @@ def _create_cache_path(pquery: PqueryFormArgs) -> str:
     return os.path.join(settings.get('corpora', 'freqs_cache_dir'), f'pquery_{result_id}.csv')
 
 
+def _mk_value_sort_id(collator_locale: str) -> str:
+    return f'value_{collator_locale}'
+
+
+def _mk_permutations(pquery: PqueryFormArgs, collator_locale: str):
+    """
+    Create factories for permutation indices matching the supported sort keys
+    (the 'freq' key is covered by the order of the stored rows).
+    """
+    ans = {_mk_value_sort_id(collator_locale): lambda rows: l10n.sort(
+        range(len(rows)), key=lambda i: rows[i][0], loc=collator_locale)}
+    for i in range(len(pquery.conc_ids)):
+        ans[f'col{i + 1}'] = lambda rows, col=i + 1: sorted(range(len(rows)), key=lambda j: rows[j][col])
+    return ans
+
+
 def cached(f):
     """
-    A decorator for caching freq merge results (using "pickle" serialization)
+    A decorator for caching freq merge results (using CSV with row and sort indices)
     """
     @wraps(f)
     def wrapper(pquery: PqueryFormArgs, raw_queries, subcpath, user_id, collator_locale):
@@ -67,10 +83,7 @@ def cached(f):
         else:
             ans = f(pquery, raw_queries, subcpath, user_id, collator_locale)
             num_lines = ans[0][1]
-            with open(path, 'w') as fw:
-                csv_writer = csv.writer(fw)
-                csv_writer.writerow(('__total__', num_lines))
-                csv_writer.writerows(ans[1:])
+            save_cached(path, num_lines, ans[1:], _mk_permutations(pquery, collator_locale))
             return ans[1:]
 
     return wrapper
@@ -93,20 +106,22 @@ def require_existing_pquery(pquery: PqueryFormArgs, offset: int, limit: int,
         raise PqueryResultNotFound('The result does not exist')
     else:
         if sort == 'freq':
-            if reverse is True:
-                return load_cached_partial(path, offset, limit)
-            else:
-                total, rows = load_cached_full(path)
-                return total, list(reversed(rows))[offset:offset+limit]
+            # rows are stored in the descending order of the total freq.
+            return load_cached_sorted(path, offset, limit, reverse=not reverse)
         elif sort == 'value':
-            total, rows = load_cached_full(path)
-            return (total,
-                    l10n.sort(rows, key=lambda x: x[0], loc=collator_locale, reverse=reverse)[offset:offset+limit])
+            return load_cached_sorted(
+                path, offset, limit, sort_id=_mk_value_sort_id(collator_locale),
+                factory=_mk_permutations(pquery, collator_locale)[_mk_value_sort_id(collator_locale)],
+                reverse=reverse)
         elif sort.startswith('freq-'):
-            conc_idx = pquery.conc_ids.index(sort[len('freq-'):])
-            total, rows = load_cached_full(path)
-            return (total,
-                    sorted(rows, key=lambda x: x[conc_idx+1], reverse=reverse)[offset:offset+limit])
+            try:
+                conc_idx = pquery.conc_ids.index(sort[len('freq-'):])
+            except ValueError:
+                raise PqueryArgumentError(f'Invalid sort argument: {sort}')
+            sort_id = f'col{conc_idx + 1}'
+            return load_cached_sorted(
+                path, offset, limit, sort_id=sort_id,
+                factory=_mk_permutations(pquery, collator_locale)[sort_id], reverse=reverse)
         else:
             raise PqueryArgumentError(f'Invalid sort argument: {sort}')
 
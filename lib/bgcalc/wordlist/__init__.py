@@ -25,7 +25,7 @@ import l10n
 from argmapping.wordlist import WordlistFormArgs
 from manatee import Structure   # TODO wrap this out
 from bgcalc.wordlist.errors import WordlistResultNotFound
-from bgcalc.csv_cache import load_cached_full
+from bgcalc.csv_cache import load_cached_sorted, save_cached
 import settings
 
 
@@ -43,15 +43,19 @@ def require_existing_wordlist(form: WordlistFormArgs, wlsort: str, reverse: bool
         raise WordlistResultNotFound('The result does not exist')
     else:
         if wlsort == 'f':
-            total, rows = load_cached_full(path)
-            return (
-                total,
-                sorted(rows, key=lambda x: x[1], reverse=reverse)[offset:offset + limit]
-            )
+            return load_cached_sorted(path, offset, limit, sort_id='freq', factory=_sort_by_freq,
+                                      reverse=reverse)
         else:
-            total, rows = load_cached_full(path)
-            rows = l10n.sort(rows, key=lambda x: x[0], loc=collator_locale, reverse=reverse)
-            return total, rows[offset:offset + limit]
+            # the collator locale is not known to the worker so the respective index is created
+            # with the first request
+            return load_cached_sorted(
+                path, offset, limit, sort_id=f'value_{collator_locale}',
+                factory=lambda rows: l10n.sort(range(len(rows)), key=lambda i: rows[i][0], loc=collator_locale),
+                reverse=reverse)
+
+
+def _sort_by_freq(rows: List[Tuple[str, int]]) -> List[int]:
+    return sorted(range(len(rows)), key=lambda i: rows[i][1])
 
 
 def cached(f):
@@ -69,11 +73,7 @@ def cached(f):
                 return [item for item in csv_reader]
         else:
             ans = f(corp, args, sys.maxsize)
-            num_lines = len(ans)
-            with open(path, 'w') as fw:
-                csv_writer = csv.writer(fw)
-                csv_writer.writerow(('__total__', num_lines))
-                csv_writer.writerows(ans)
+            save_cached(path, len(ans), ans, dict(freq=_sort_by_freq))
             return ans[:max_items]
 
     return wrapper
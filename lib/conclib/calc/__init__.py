@@ -38,6 +38,10 @@ from bgcalc.errors import CalcTaskNotFoundError
 
 TASK_TIME_LIMIT = settings.get_int('calc_backend', 'task_time_limit', 300)
 
+# even with status change notifications we re-check the status at least this often (in seconds)
+# to handle changes made without a notification (e.g. an expired record)
+STATUS_WATCH_MAX_INTERVAL = 2
+
 
 def _contains_shuffle_seq(q_ops: Tuple[str, ...]) -> bool:
     """
@@ -96,13 +100,13 @@ def wait_for_conc(cache_map: AbstractConcCache, q: Tuple[str, ...], subchash: Op
     """
     time_limit = 7 if minsize >= 0 else 20   # 7 => ~2s, 20 => ~19s
     t0 = t1 = time.time()
-    i = 1
-    has_min_result, finished = _check_result(cache_map, q, subchash, minsize)
-    while not (finished or has_min_result) and t1 - t0 < time_limit:
-        time.sleep(i * 0.1)
-        i += 1
-        t1 = time.time()
+    # we must subscribe before the first check so no status change can be missed
+    with cache_map.watch_calc_status(subchash, q) as watcher:
         has_min_result, finished = _check_result(cache_map, q, subchash, minsize)
+        while not (finished or has_min_result) and t1 - t0 < time_limit:
+            watcher.wait(min(time_limit - (t1 - t0), STATUS_WATCH_MAX_INTERVAL))
+            t1 = time.time()
+            has_min_result, finished = _check_result(cache_map, q, subchash, minsize)
     if not has_min_result:
         if finished:  # cache vs. filesystem mismatch
             cache_map.del_entry(subchash, q)
@@ -156,7 +160,9 @@ def require_existing_conc(corp: KCorpus, q: Tuple[str, ...]) -> manatee.Concorda
                 mcorp = corpus_manager.get_corpus(qq[2:])
                 break
         try:
-            return PyConc(mcorp, 'l', status.cachefile, orig_corp=corp)
+            conc = PyConc(mcorp, 'l', status.cachefile, orig_corp=corp)
+            cache_map.mark_access(subchash, q)
+            return conc
         except manatee.FileAccessError as ex:
             raise ConcNotFoundException(ex)
     raise BrokenConcordanceException('Concordance broken. File: {}, error: {}'.format(status.cachefile, status.error))
@@ -180,13 +186,17 @@ def find_cached_conc_base(corp: KCorpus, subchash: Optional[str], q: Tuple[str,
     start_time = time.time()
     cache_map = plugins.runtime.CONC_CACHE.instance.get_mapping(corp)
     cache_map.refresh_map()
-    calc_status = cache_map.get_calc_status(subchash, q)
+    # statuses of q[:len(q)], q[:len(q) - 1], ..., q[:1] fetched at once
+    prefix_statuses = cache_map.get_calc_statuses(subchash, [q[:i] for i in range(len(q), 0, -1)])
+    calc_status = prefix_statuses[0]
     if calc_status:
         if calc_status.error is None:
             if calc_status.created - corp.corp_mtime < 0:
                 logging.getLogger(__name__).warning(
                     'Removed outdated cache file (older than corpus indices)')
                 cache_map.del_full_entry(subchash, q)
+                # all the prefixes share the same base query so they are gone too
+                prefix_statuses = [None] * len(q)
         else:
             logging.getLogger(__name__).warning(
                 'Removed failed calculation cache record (error: {0}'.format(calc_status.error))
@@ -203,7 +213,8 @@ def find_cached_conc_base(corp: KCorpus, subchash: Optional[str], q: Tuple[str,
     # try to find the most complete cached operation
     # (e.g. query + filter + sample)
     for i in range(srch_from, 0, -1):
-        cache_path = cache_map.readable_cache_path(subchash, q[:i])
+        prefix_status = prefix_statuses[len(q) - i]
+        cache_path = prefix_status.cachefile if prefix_status and prefix_status.readable else None
         # now we know that someone already calculated the conc (but it might not be finished yet)
         if cache_path:
             try:
@@ -224,6 +235,7 @@ def find_cached_conc_base(corp: KCorpus, subchash: Optional[str], q: Tuple[str,
                             mcorp = corpus_manager.get_corpus(qq[2:])
                             break
                     conc = PyConc(mcorp, 'l', cache_path, orig_corp=corp)
+                    cache_map.mark_access(subchash, q[:i])
             except (ConcCalculationStatusException, manatee.FileAccessError) as ex:
                 logging.getLogger(__name__).error(f'Failed to use cached concordance for {q[:i]}: {ex}')
                 cancel_conc_task(cache_map, subchash, q[:i])
@@ -324,9 +336,9 @@ class ConcSyncCalculation(GeneralWorker):
         try:
             calc_from, conc = find_cached_conc_base(self.corpus_obj, subchash, query, minsize=0)
             if isinstance(conc, InitialConc):   # we have nothing, let's start with the 1st operation only
-                for i in range(0, len(query)):
-                    self.cache_map.add_to_map(subchash, query[:i + 1], ConcCacheStatus(task_id=self._task_id),
-                                              overwrite=True)
+                self.cache_map.add_to_map_many(
+                    subchash, [(query[:i + 1], ConcCacheStatus(task_id=self._task_id)) for i in range(0, len(query))],
+                    overwrite=True)
                 calc_status = self.cache_map.get_calc_status(subchash, query[:1])
                 conc = self.compute_conc(self.corpus_obj, query[:1], samplesize)
                 conc.sync()
@@ -336,9 +348,10 @@ class ConcSyncCalculation(GeneralWorker):
                     subchash, query[:1], readable=True, finished=True, concsize=conc.size())
                 calc_from = 1
             else:
-                for i in range(calc_from, len(query)):
-                    self.cache_map.add_to_map(subchash, query[:i + 1], ConcCacheStatus(task_id=self._task_id),
-                                              overwrite=True)
+                self.cache_map.add_to_map_many(
+                    subchash,
+                    [(query[:i + 1], ConcCacheStatus(task_id=self._task_id)) for i in range(calc_from, len(query))],
+                    overwrite=True)
         except Exception as ex:
             logging.getLogger(__name__).error(ex)
             self._mark_calc_states_err(subchash, query, 0, ex)
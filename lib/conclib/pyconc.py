@@ -25,12 +25,14 @@ import logging
 
 import manatee
 import l10n
+import settings
 from strings import escape_attr_val
 from kwiclib import lngrp_sortcrit
 from translation import ugettext as translate
 from functools import reduce
 from .errors import EmptyParallelCorporaIntersection, UnknownConcordanceAction, ConcordanceException
 from corplib.corpus import KCorpus
+from corplib import struct_attr_norms
 
 
 def get_conc_labelmap(infopath):
@@ -206,21 +208,10 @@ class PyConc(manatee.Concordance):
         """
         full_attr_name = re.split(r'\s+', full_attr_name)[0]
         struct_name, attr_name = full_attr_name.split('.')
-        struct = self.pycorp.get_struct(struct_name)
-        attr = struct.get_attr(attr_name)
-        normvals = dict([(struct.beg(
-            i), struct.end(i) - struct.beg(i)) for i in range(struct.size())])
-        ans = {}
-        for i in range(attr.id_range()):
-            value = attr.id2str(i)
-            valid = attr.str2id(value)
-            r = self.pycorp.filter_query(struct.attr_val(attr_name, valid))
-            cnt = 0
-            while not r.end():
-                cnt += normvals[r.peek_beg()]
-                r.next()
-            ans[value] = cnt
-        return ans
+        attr = self.pycorp.get_struct(struct_name).get_attr(attr_name)
+        norms = struct_attr_norms(self.pycorp, struct_name, attr_name,
+                                  cache_dir=settings.get('corpora', 'struct_norms_cache_dir'))
+        return dict((attr.id2str(i), norms[i]) for i in range(len(norms)))
 
     def xfreq_dist(self, crit, limit=1, sortkey='f', ml='', ftt_include_empty='', rel_mode=0,
                    collator_locale='en_US'):
@@ -47,12 +47,16 @@ def _get_async_conc(corp, user_id, q, subchash, samplesize, minsize):
     """
     cache_map = plugins.runtime.CONC_CACHE.instance.get_mapping(corp)
     status = cache_map.get_calc_status(subchash, q)
-    if not status or status.error:
-        app = bgcalc.calc_backend_client(settings)
-        ans = app.send_task('conc_register', (user_id, corp.corpname, getattr(corp, 'subcname', None),
-                                              subchash, q, samplesize, TASK_TIME_LIMIT),
-                            time_limit=CONC_REGISTER_TASK_LIMIT)
-        ans.get(timeout=CONC_REGISTER_WAIT_LIMIT)
+    # if we do not obtain the lock, someone else is registering the same calculation right now
+    if (not status or status.error) and cache_map.acquire_calc_lock(subchash, q, ttl=CONC_REGISTER_WAIT_LIMIT):
+        try:
+            app = bgcalc.calc_backend_client(settings)
+            ans = app.send_task('conc_register', (user_id, corp.corpname, getattr(corp, 'subcname', None),
+                                                  subchash, q, samplesize, TASK_TIME_LIMIT),
+                                time_limit=CONC_REGISTER_TASK_LIMIT)
+            ans.get(timeout=CONC_REGISTER_WAIT_LIMIT)
+        finally:
+            cache_map.release_calc_lock(subchash, q)
     conc_avail = wait_for_conc(cache_map=cache_map, subchash=subchash, q=q, minsize=minsize)
     if conc_avail:
         return PyConc(corp, 'l', cache_map.readable_cache_path(subchash, q))
@@ -72,16 +76,21 @@ def _get_bg_conc(corp: KCorpus, user_id: int, q: Tuple[str, ...], subchash: Opti
     if status and not status.finished:  # the calc is already running, the client has to wait and check regularly
         return InitialConc(corp, status.cachefile)
     # let's create cache records of the operations we'll have to perform
-    if calc_from < len(q):
-        for i in range(calc_from, len(q)):
-            status = cache_map.add_to_map(subchash, q[:i + 1], ConcCacheStatus(), overwrite=True)
-            if os.path.isfile(status.cachefile):  # the file cannot be valid as otherwise, calc_from would be higher
-                del_silent(status.cachefile)
-                logging.getLogger(__name__).warning(f'Removed unbound conc. cache file {status.cachefile}')
-        app = bgcalc.calc_backend_client(settings)
-        app.send_task('conc_sync_calculate',
-                      (user_id, corp.corpname, getattr(corp, 'subcname', None), subchash, q, samplesize),
-                      time_limit=TASK_TIME_LIMIT)
+    # (unless someone else is registering the same calculation right now)
+    if calc_from < len(q) and cache_map.acquire_calc_lock(subchash, q, ttl=CONC_REGISTER_WAIT_LIMIT):
+        try:
+            statuses = cache_map.add_to_map_many(
+                subchash, [(q[:i + 1], ConcCacheStatus()) for i in range(calc_from, len(q))], overwrite=True)
+            for status in statuses:
+                if os.path.isfile(status.cachefile):  # the file cannot be valid as otherwise, calc_from would be higher
+                    del_silent(status.cachefile)
+                    logging.getLogger(__name__).warning(f'Removed unbound conc. cache file {status.cachefile}')
+            app = bgcalc.calc_backend_client(settings)
+            app.send_task('conc_sync_calculate',
+                          (user_id, corp.corpname, getattr(corp, 'subcname', None), subchash, q, samplesize),
+                          time_limit=TASK_TIME_LIMIT)
+        finally:
+            cache_map.release_calc_lock(subchash, q)
     # for smaller concordances/corpora there is a chance the data
     # is ready in a few seconds - let's try this:
     conc_avail = wait_for_conc(cache_map=cache_map, subchash=subchash, q=q, minsize=minsize)
@@ -93,19 +102,33 @@ def _get_bg_conc(corp: KCorpus, user_id: int, q: Tuple[str, ...], subchash: Opti
 
 
 def _get_sync_conc(worker, corp, q, save, subchash, samplesize):
-    status = worker.create_new_calc_status()
-    conc = worker.compute_conc(corp, q, samplesize)
-    conc.sync()  # wait for the computation to finish
-    status.finished = True
-    status.concsize = conc.size()
-    if save:
-        cache_map = plugins.runtime.CONC_CACHE.instance.get_mapping(corp)
+    if not save:
+        conc = worker.compute_conc(corp, q, samplesize)
+        conc.sync()  # wait for the computation to finish
+        return conc
+    cache_map = plugins.runtime.CONC_CACHE.instance.get_mapping(corp)
+    if not cache_map.acquire_calc_lock(subchash, q[:1], ttl=TASK_TIME_LIMIT):
+        # an identical concordance is being calculated by another process - let's use its result
+        if wait_for_conc(cache_map=cache_map, subchash=subchash, q=q[:1], minsize=-1):
+            cachefile = cache_map.readable_cache_path(subchash, q[:1])
+            if cachefile:
+                return PyConc(corp, 'l', cachefile)
+        logging.getLogger(__name__).warning(
+            f'Failed to wait for a concurrent calculation of {q[:1]}, calculating on our own')
+    try:
+        status = worker.create_new_calc_status()
+        conc = worker.compute_conc(corp, q, samplesize)
+        conc.sync()  # wait for the computation to finish
+        # the status is marked as finished only once the file is saved (others may be waiting for it)
+        status.concsize = conc.size()
         status = cache_map.add_to_map(subchash, q[:1], status)
         conc.save(status.cachefile)
         if os.getuid() == os.stat(status.cachefile).st_uid:
             os.chmod(status.cachefile, 0o664)
         # update size in map file
         cache_map.update_calc_status(subchash, q[:1], concsize=conc.size(), readable=True, finished=True)
+    finally:
+        cache_map.release_calc_lock(subchash, q[:1])
     return conc
 
 
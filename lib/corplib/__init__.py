@@ -26,6 +26,7 @@ from .fallback import EmptyCorpus
 
 import os
 import glob
+import hashlib
 
 import l10n
 import manatee
@@ -429,6 +430,88 @@ def frq_db(corp: KCorpus, attrname: str, nums: str = 'frq', id_range: int = 0) -
     return frq
 
 
+def _calc_struct_attr_norms(corp: KCorpus, struct_name: str, attr_name: str, subcnorm: str) -> array:
+    struct = corp.get_struct(struct_name)
+    attr = struct.get_attr(attr_name)
+    if subcnorm == 'freq':
+        def norm(num): return 1
+    elif subcnorm == 'tokens':
+        def norm(num): return struct.end(num) - struct.beg(num)
+    else:
+        nas = struct.get_attr(subcnorm).pos2str
+
+        def norm(num):
+            try:
+                return int(nas(num))
+            except ValueError:
+                return 0
+    ans = array('q', bytes(8 * attr.id_range()))
+    r = corp.filter_query(struct.whole())
+    while not r.end():
+        num = struct.num_at_pos(r.peek_beg())
+        ans[attr.pos2id(num)] += norm(num)
+        r.next()
+    return ans
+
+
+def _struct_attr_norms_path(corp: KCorpus, cache_dir: str, struct_name: str, attr_name: str,
+                            subcnorm: str) -> str:
+    key = f'{corp.corpname}:{corp.subchash}:{struct_name}.{attr_name}:{subcnorm}'
+    return os.path.join(cache_dir, '{}.norms'.format(hashlib.sha1(key.encode('utf-8')).hexdigest()))
+
+
+def struct_attr_norms(corp: KCorpus, struct_name: str, attr_name: str, subcnorm: str = 'tokens',
+                      cache_dir: Optional[str] = None) -> array:
+    """
+    Return sizes of all the values of a structural attribute as an array
+    indexed by value IDs. The sizes are calculated in a single pass over
+    the structure. In case cache_dir is provided, the result is stored there
+    along with a version stamp of the corpus (or subcorpus) and it is recalculated
+    once the corpus is changed.
+
+    arguments:
+    corp -- a corpus or a subcorpus
+    struct_name -- a structure name (e.g. 'doc')
+    attr_name -- an attribute of the structure (e.g. 'id')
+    subcnorm -- a size type (freq = number of structures, tokens = number of positions,
+                any other value is understood as a numeric attribute of the structure
+                providing the size)
+    cache_dir -- a directory for storing calculated data (typically 'struct_norms_cache_dir');
+                 the stored data are invalidated by corpus changes only so the directory
+                 must not be cleaned by TTL-based tasks (like 'freqs_cache_dir'); please
+                 note that the corpus data directory must not be used here either
+                 as changing its mtime invalidates other cached data of the corpus
+    """
+    if not cache_dir:
+        return _calc_struct_attr_norms(corp, struct_name, attr_name, subcnorm)
+    filename = _struct_attr_norms_path(corp, cache_dir, struct_name, attr_name, subcnorm)
+    stamp = corp.corp_mtime
+    if corp.is_subcorpus:
+        stamp = max(stamp, os.path.getmtime(corp.spath))
+    try:
+        with open(filename, 'rb') as fr:
+            header = array('d')
+            header.frombytes(fr.read(header.itemsize))
+            if header[0] == stamp:
+                ans = array('q')
+                ans.frombytes(fr.read())
+                if len(ans) == corp.get_struct(struct_name).get_attr(attr_name).id_range():
+                    return ans
+    except (OSError, IndexError):
+        pass
+    ans = _calc_struct_attr_norms(corp, struct_name, attr_name, subcnorm)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_filename = f'{filename}.{os.getpid()}.tmp'
+        with open(tmp_filename, 'wb') as fw:
+            array('d', [stamp]).tofile(fw)
+            ans.tofile(fw)
+        os.rename(tmp_filename, filename)
+    except OSError as ex:
+        logging.getLogger(__name__).warning(f'Failed to store struct. attr. norms {filename}: {ex}')
+    return ans
+
+
 def matching_structattr(corp: KCorpus, struct: str, attr: str, val: str, search_attr: str
                         ) -> Tuple[List[str], int, int]:
     """
@@ -16,7 +16,7 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA
 # 02110-1301, USA.
 
-from typing import Any, List, Mapping, Dict, Tuple, Union
+from typing import Any, Iterator, List, Mapping, Dict, Optional, Set, Tuple, Union
 
 from collections import defaultdict
 import re
@@ -32,6 +32,9 @@ from corplib.corpus import KCorpus
 SortCritType = List[Tuple[str, Union[str, int]]]
 LabelMapType = List[Dict[str, List[Dict[str, Union[str, int]]]]]
 
+# number of lines read at once when iterating over a large range of KWIC lines
+DEFAULT_LINES_CHUNK_SIZE = 1000
+
 
 def lngrp_sortcrit(lab: str, separator: str = '.') -> SortCritType:
     # TODO
@@ -294,13 +297,49 @@ class Kwic:
         out.pagination = pagination.export()
         return dict(out)
 
-    def add_aligns(self, result, args):
+    def iter_kwiclines(self, args: KwicPageArgs,
+                       chunk_size: int = DEFAULT_LINES_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Generates KWIC lines (incl. lines of aligned corpora) of the range
+        specified by the 'args' in chunks of at most 'chunk_size' lines so
+        the whole range does not have to be kept in memory. Please note that
+        the 'leftspace' and 'rightspace' paddings are calculated per chunk.
+
+        arguments:
+            args -- a KwicPageArgs instance
+            chunk_size -- max. number of lines read at once
+        """
+        args.refs = getattr(args, 'refs', '').replace('.MAP_OUP', '')
+        from_line = args.calc_fromline()
+        to_line = min(args.calc_toline(), self.conc.size())
+        orig_corpname = self.conc.orig_corp.get_conffile()
+        native_aligned = manatee.StrVector()
+        self.conc.get_aligned(native_aligned)
+        native_aligned = set(native_aligned)
+        for chunk_from in range(from_line, to_line, chunk_size):
+            chunk_to = min(chunk_from + chunk_size, to_line)
+            self.conc.switch_aligned(orig_corpname)
+            chunk = KwicPageData()
+            chunk.Lines = self.kwiclines(args.create_kwicline_args(fromline=chunk_from, toline=chunk_to))
+            self.add_aligns(chunk, args.create_kwicline_args(
+                speech_segment=None, fromline=chunk_from, toline=chunk_to), native_aligned=native_aligned)
+            if args.hidenone:
+                for line, part in itertools.product(chunk.Lines, ('Kwic', 'Left', 'Right')):
+                    for item in line[part]:
+                        item['str'] = item['str'].replace('===NONE===', '')
+            yield chunk.Lines
+        self.conc.switch_aligned(orig_corpname)
+
+    def add_aligns(self, result, args, native_aligned: Optional[Set[str]] = None):
         """
         Adds lines from aligned corpora. Method modifies passed KwicPageData instance by setting
         respective attributes.
 
         arguments:
         result -- KwicPageData type is required
+        native_aligned -- corpora the concordance has been originally aligned with (if None then
+                          the current state of the concordance is used); other aligned corpora are
+                          attached without context
         """
         def create_empty_cell():
             return {'rightsize': 0, 'hitlen': ';hitlen=9', 'Right': [], 'Kwic': [], 'linegroup': '_', 'leftsize': 0,
@@ -316,18 +355,21 @@ class Kwic:
         corps_with_colls = manatee.StrVector()
         self.conc.get_aligned(corps_with_colls)
         result.KWICCorps = [c for c in corps_with_colls]
+        if native_aligned is None:
+            native_aligned = set(corps_with_colls)
         if self.corpus.corpname not in result.KWICCorps:
             result.KWICCorps = [self.corpus.corpname] + result.KWICCorps
         result.CorporaColumns = [dict(n=c.get_conffile(), label=c.get_conf('NAME') or c.get_conffile())
                                  for c in [self.conc.orig_corp] + args.alignlist]
         for al_corp in args.alignlist:
             al_corpname = al_corp.get_conffile()
-            if al_corpname in corps_with_colls:
+            if al_corpname in native_aligned:
                 self.conc.switch_aligned(al_corp.get_conffile())
                 al_lines.append(self.kwiclines(args))
             else:
                 self.conc.switch_aligned(self.conc.orig_corp.get_conffile())
-                self.conc.add_aligned(al_corp.get_conffile())
+                if al_corpname not in corps_with_colls:
+                    self.conc.add_aligned(al_corp.get_conffile())
                 self.conc.switch_aligned(al_corp.get_conffile())
                 al_lines.append(
                     self.kwiclines(args.copy(leftctx='0', rightctx='0', attrs='word', ctxattrs=''))
@@ -33,10 +33,9 @@ internationalisation of KonText:
    processed using the same module.
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, Callable
 
-from functools import cmp_to_key
-from threading import local
+from threading import local, Lock
 try:
     from icu import Locale, Collator
 except ImportError:
@@ -55,6 +54,9 @@ except ImportError:
         def compare(self, s1, s2):
             return locale.strcoll(s1, s2)
 
+        def getSortKey(self, s):
+            return locale.strxfrm(s)
+
         @staticmethod
         def createInstance(locale):
             return Collator(locale)
@@ -62,6 +64,33 @@ except ImportError:
 
 _formats: Dict[str, Any] = {}  # contains lang_code -> Formatter() pairs
 _current = local()  # thread-local variable stores per-request formatter
+_collators: Dict[str, Collator] = {}  # contains locale -> Collator() pairs
+_collators_lock = Lock()
+
+
+def get_collator(loc: str) -> Collator:
+    """
+    Return a collator for the passed locale. Collators are created
+    just once per process (their compare() and getSortKey() methods
+    can be used from multiple threads).
+    """
+    collator = _collators.get(loc)
+    if collator is None:
+        with _collators_lock:
+            collator = _collators.get(loc)
+            if collator is None:
+                collator = Collator.createInstance(Locale(loc))
+                _collators[loc] = collator
+    return collator
+
+
+def sort_key(loc: str) -> Callable[[str], Any]:
+    """
+    Return a function transforming strings into sort keys (byte strings
+    in case ICU is available) matching the passed locale. The keys can be
+    compared directly and also stored for later use.
+    """
+    return get_collator(loc).getSortKey
 
 
 def sort(iterable, loc, key=None, reverse=False):
@@ -74,13 +103,12 @@ def sort(iterable, loc, key=None, reverse=False):
     key -- access to sorted value
     reverse -- whether the result should be in reversed order (default is False)
     """
-    collator = Collator.createInstance(Locale(loc))
+    skey = sort_key(loc)
     if key is None:
-        kf = cmp_to_key(collator.compare)
+        kf = skey
     else:
-        def tmp(v1, v2):
-            return collator.compare(key(v1), key(v2))
-        kf = cmp_to_key(tmp)
+        def kf(v):
+            return skey(key(v))
     return sorted(iterable, key=kf, reverse=reverse)
 
 
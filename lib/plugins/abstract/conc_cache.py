@@ -31,6 +31,7 @@ import logging
 import abc
 from typing import Dict, Any, Optional, Union, Tuple, List
 from corplib.corpus import KCorpus
+from plugins.abstract.general_storage import ChannelWatcher, PollingWatcher
 
 QueryType = Tuple[str, ...]
 
@@ -176,6 +177,23 @@ class AbstractConcCache(abc.ABC):
     def get_calc_status(self, subchash: str, query: QueryType) -> ConcCacheStatus:
         pass
 
+    def get_calc_statuses(self, subchash: Optional[str], queries: List[QueryType]) -> List[Optional[ConcCacheStatus]]:
+        """
+        Return calculation statuses for multiple queries at once (typically prefixes
+        of a single query). For each query without a record None is returned.
+        The default implementation calls get_calc_status for each query - implementations
+        able to fetch the data in a single round trip should override the method.
+
+        arguments:
+        subchash -- a md5 hash generated from subcorpus identifier by
+                    CorpusManager.get_corpus()
+        queries -- a list of queries (each one is a list of query elements)
+
+        returns:
+        a list of statuses in the same order as the queries
+        """
+        return [self.get_calc_status(subchash, q) for q in queries]
+
     @abc.abstractmethod
     def refresh_map(self):
         """
@@ -219,6 +237,23 @@ class AbstractConcCache(abc.ABC):
             an updated version of the original calc_status (e.g. with cachefile set)
         """
 
+    def add_to_map_many(self, subchash: Optional[str], items: List[Tuple[QueryType, ConcCacheStatus]],
+                        overwrite: bool = False) -> List[ConcCacheStatus]:
+        """
+        Add multiple cache entries at once. The semantics is the same as in case
+        of add_to_map. The default implementation calls add_to_map for each item -
+        implementations able to store the data in a single round trip should override
+        the method.
+
+        arguments:
+        subchash -- a subcorpus identifier hash (see corplib.CorpusManager.get_corpus)
+        items -- a list of pairs (query, calc_status)
+        overwrite -- if true then the new calc_status values are always used
+        returns:
+            a list of updated calc_status values (in the same order as the items)
+        """
+        return [self.add_to_map(subchash, q, calc_status, overwrite) for q, calc_status in items]
+
     @abc.abstractmethod
     def del_entry(self, subchash: Optional[str], q: QueryType):
         """
@@ -244,6 +279,55 @@ class AbstractConcCache(abc.ABC):
     def update_calc_status(self, subchash: Optional[str], query: Tuple[str, ...], **kw):
         pass
 
+    def acquire_calc_lock(self, subchash: Optional[str], query: QueryType, ttl: int) -> bool:
+        """
+        Try to obtain an exclusive right to calculate a concordance matching (subchash, query).
+        Clients which do not obtain the lock should wait for the result
+        of the lock owner (see watch_calc_status) instead of calculating the same
+        concordance again. Implementations without locking support
+        can keep the default which always succeeds.
+
+        arguments:
+        subchash -- a md5 hash generated from subcorpus identifier by
+                    CorpusManager.get_corpus()
+        query -- a list of query elements
+        ttl -- number of seconds after which the lock expires (e.g. in case
+               the owner crashed)
+
+        returns:
+        True if the lock has been obtained, False otherwise
+        """
+        return True
+
+    def release_calc_lock(self, subchash: Optional[str], query: QueryType):
+        """
+        Release a lock obtained via acquire_calc_lock. Locks owned by
+        others must not be affected.
+        """
+        pass
+
+    def mark_access(self, subchash: Optional[str], query: QueryType):
+        """
+        Notify the cache that a cached concordance has been used to
+        serve a request. Implementations which do not track cache usage
+        (e.g. for eviction purposes) can keep the default which does nothing.
+        """
+        pass
+
+    def watch_calc_status(self, subchash: Optional[str], query: QueryType) -> ChannelWatcher:
+        """
+        Subscribe to changes of a calculation status matching (subchash, query).
+        The returned watcher allows a client to block until the status changes
+        instead of repeatedly reading the status. Implementations without
+        notification support can keep the default polling watcher.
+
+        arguments:
+        subchash -- a md5 hash generated from subcorpus identifier by
+                    CorpusManager.get_corpus()
+        query -- a list of query elements
+        """
+        return PollingWatcher()
+
 
 class AbstractCacheMappingFactory(abc.ABC):
     """
@@ -106,6 +106,14 @@ class DatabaseBackend(object):
     def load_corpus(self, corp_id: str) -> Dict[str, Any]:
         pass
 
+    def load_corpora_versions(self) -> Dict[str, str]:
+        """
+        Load version stamps of all the available corpora (corpus_id => stamp).
+        A stamp is expected to change each time corpus configuration
+        is modified.
+        """
+        raise NotImplementedError()
+
     @abc.abstractmethod
     def load_all_corpora(self, user_id: int, substrs: Optional[List[str]] = None, keywords: Optional[List[str]] = None,
                          min_size: int = 0, max_size: Optional[int] = None, requestable: bool = False,
@@ -138,6 +146,10 @@ class DatabaseBackend(object):
     def load_corpus_structures(self, corpus_id: str) -> List[Dict[str, Any]]:
         pass
 
+    @abc.abstractmethod
+    def load_corpus_structattrs(self, corpus_id: str, structure_id: str) -> List[Dict[str, Any]]:
+        pass
+
     @abc.abstractmethod
     def load_subcorpattrs(self, corpus_id: str) -> List[str]:
         pass
@@ -174,6 +186,68 @@ class DatabaseBackend(object):
     def load_simple_query_default_attrs(self, corpus_id) -> List[str]:
         raise NotImplementedError()
 
+    # Bulk variants of the loading methods. Each one returns a dict corpus_id => value
+    # (corpora without any matching data may be missing in the dict). The default
+    # implementations just call the respective per-corpus methods, database backends
+    # should override them by set-based queries.
+
+    def load_corpora(self, corp_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        ans = {}
+        for corp_id in corp_ids:
+            row = self.load_corpus(corp_id)
+            if row is not None:
+                ans[corp_id] = row
+        return ans
+
+    def load_corpora_articles(self, corpus_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        return dict((corpus_id, self.load_corpus_articles(corpus_id)) for corpus_id in corpus_ids)
+
+    def load_ttdescs(self, desc_ids: List[int]) -> Dict[int, List[Dict[str, str]]]:
+        return dict((desc_id, self.load_ttdesc(desc_id)) for desc_id in desc_ids)
+
+    def load_corpora_posattrs(self, corpus_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        In addition to load_corpus_posattrs, each item also contains
+        'fromattr' and 'mapto' references (see load_corpus_posattr_references)
+        """
+        ans = {}
+        for corpus_id in corpus_ids:
+            ans[corpus_id] = []
+            for item in self.load_corpus_posattrs(corpus_id):
+                item = dict(item)
+                item['fromattr'], item['mapto'] = self.load_corpus_posattr_references(corpus_id, item['name'])
+                ans[corpus_id].append(item)
+        return ans
+
+    def load_corpora_alignments(self, corpus_ids: List[str]) -> Dict[str, List[str]]:
+        return dict((corpus_id, self.load_corpus_alignments(corpus_id)) for corpus_id in corpus_ids)
+
+    def load_corpora_structures(self, corpus_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        return dict((corpus_id, self.load_corpus_structures(corpus_id)) for corpus_id in corpus_ids)
+
+    def load_corpora_structattrs(self, corpus_ids: List[str]) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+        """
+        returns:
+        a dict corpus_id => structure name => list of structural attributes
+        """
+        ans = {}
+        for corpus_id in corpus_ids:
+            ans[corpus_id] = dict((s['name'], self.load_corpus_structattrs(corpus_id, s['name']))
+                                  for s in self.load_corpus_structures(corpus_id))
+        return ans
+
+    def load_corpora_tckc_providers(self, corpus_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        return dict((corpus_id, self.load_tckc_providers(corpus_id)) for corpus_id in corpus_ids)
+
+    def load_corpora_tagsets(self, corpus_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        return dict((corpus_id, self.load_corpus_tagsets(corpus_id)) for corpus_id in corpus_ids)
+
+    def load_corpora_interval_attrs(self, corpus_ids: List[str]) -> Dict[str, List[Tuple[str, str]]]:
+        return dict((corpus_id, self.load_interval_attrs(corpus_id)) for corpus_id in corpus_ids)
+
+    def load_corpora_simple_query_default_attrs(self, corpus_ids: List[str]) -> Dict[str, List[str]]:
+        return dict((corpus_id, self.load_simple_query_default_attrs(corpus_id)) for corpus_id in corpus_ids)
+
 
 class DatabaseWritableBackend(DatabaseBackend):
 
@@ -276,23 +276,22 @@ class RegistryConf(object):
         self.set_freqttattrs(self._backend.load_freqttattrs(self._corpus_id))
         self.set_aligned(self._backend.load_corpus_alignments(self._corpus_id))
 
-        for item in self._backend.load_corpus_posattrs(self._corpus_id):
+        for item in self._backend.load_corpora_posattrs([self._corpus_id]).get(self._corpus_id, []):
             pa = PosAttribute(name=item['name'], position=item['position'])
             for k, v in [x for x in list(dict(item).items()) if x[0].upper() == x[0]]:
                 pa.new_item(SimpleAttr(k, value=v))
-            fromattr, mapto = self._backend.load_corpus_posattr_references(
-                self._corpus_id, item['name'])
-            if fromattr:
-                pa.new_item(SimpleAttr('FROMATTR', fromattr))
-            if mapto:
-                pa.new_item(SimpleAttr('MAPTO', mapto))
+            if item['fromattr']:
+                pa.new_item(SimpleAttr('FROMATTR', item['fromattr']))
+            if item['mapto']:
+                pa.new_item(SimpleAttr('MAPTO', item['mapto']))
             self.add_item(pa)
 
+        structattrs = self._backend.load_corpora_structattrs([self._corpus_id]).get(self._corpus_id, {})
         for item in self._backend.load_corpus_structures(self._corpus_id):
             st = Struct(name=item['name'])
             for k, v in [x for x in list(dict(item).items()) if x[0].upper() == x[0]]:
                 st.new_item(SimpleAttr(k, value=v))
-            for sattr in self._backend.load_corpus_structattrs(self._corpus_id, item['name']):
+            for sattr in structattrs.get(item['name'], []):
                 sobj = Attribute(name=sattr['name'])
                 for k, v in [x for x in list(dict(sattr).items()) if x[0].upper() == x[0]]:
                     sobj.new_item(SimpleAttr(k, value=v))
@@ -17,11 +17,60 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
 import abc
-from typing import Union, List, Dict
+import time
+from contextlib import contextmanager
+from typing import Union, List, Dict, Iterator
 
 Serializable = Union[int, float, str, bool, list, dict, None]
 
 
+class ChannelWatcher(abc.ABC):
+    """
+    ChannelWatcher represents a subscription to a notification channel
+    (see KeyValueStorage.subscribe). The subscription is active since
+    the watcher is created so a client can subscribe first, then check
+    the watched data and only then wait for a change without a risk
+    of missing the notification.
+    """
+
+    @abc.abstractmethod
+    def wait(self, timeout: float) -> bool:
+        """
+        Block until a message arrives in the channel or until
+        the timeout (in seconds) elapses.
+
+        returns:
+        True if a notification has arrived, False otherwise (please note
+        that False does not mean there was no change - the client should
+        always re-check the watched data)
+        """
+
+    def close(self):
+        pass
+
+    def __enter__(self) -> 'ChannelWatcher':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class PollingWatcher(ChannelWatcher):
+    """
+    PollingWatcher is a fallback watcher for storages without
+    any notification support. It just sleeps for a gradually
+    increasing time interval (0.1s, 0.2s, 0.3s,...).
+    """
+
+    def __init__(self):
+        self._num_waits = 0
+
+    def wait(self, timeout):
+        self._num_waits += 1
+        time.sleep(max(0, min(self._num_waits * 0.1, timeout)))
+        return False
+
+
 class KeyValueStorage(abc.ABC):
     """
     A general key-value storage is a core data storage for KonText and its default
@@ -139,6 +188,56 @@ class KeyValueStorage(abc.ABC):
         field -- the field to be deleted
         """
 
+    def hash_mget(self, key: str, fields: List[str]) -> List[Serializable]:
+        """
+        Get multiple values from a hash table stored under the passed key.
+        For each missing field None is returned. The default implementation
+        calls hash_get for each field - storages able to do this in a single
+        round trip should override the method.
+
+        arguments:
+        key -- data access key
+        fields -- a list of hash table entry keys
+
+        returns:
+        a list of values in the same order as the fields
+        """
+        return [self.hash_get(key, field) for field in fields]
+
+    def hash_set_map(self, key: str, mapping: Dict[str, Serializable]):
+        """
+        Put multiple values into a hash table stored under the passed key
+        (other fields of the hash table are kept untouched). The default implementation
+        calls hash_set for each item - storages able to do this in a single round trip
+        should override the method.
+
+        arguments:
+        key -- data access key
+        mapping -- a dict field => value
+        """
+        for field, value in mapping.items():
+            self.hash_set(key, field, value)
+
+    def hash_incr(self, key: str, field: str, amount: int = 1) -> int:
+        """
+        Increment an integer value stored within a hash table. A missing field
+        is initialized as 'amount'.
+
+        The default implementation is not atomic - storages able to perform
+        the operation atomically should override the method.
+
+        arguments:
+        key -- data access key
+        field -- hash table entry key
+        amount -- a value to be added
+
+        returns:
+        the new value
+        """
+        value = (self.hash_get(key, field) or 0) + amount
+        self.hash_set(key, field, value)
+        return value
+
     @abc.abstractmethod
     def hash_get_all(self, key: str) -> Dict[str, Serializable]:
         """
@@ -161,6 +260,20 @@ class KeyValueStorage(abc.ABC):
         default -- a value to be returned in case there is no such key
         """
 
+    def mget(self, keys: List[str]) -> List[Serializable]:
+        """
+        Get multiple values at once. For each missing key None is returned.
+        The default implementation calls get for each key - storages able to
+        do this in a single round trip should override the method.
+
+        arguments:
+        keys -- a list of data access keys
+
+        returns:
+        a list of values in the same order as the keys
+        """
+        return [self.get(key) for key in keys]
+
     @abc.abstractmethod
     def set(self, key: str, data: Serializable):
         """
@@ -221,6 +334,75 @@ class KeyValueStorage(abc.ABC):
         key -- data access key
         """
 
+    def set_if_absent(self, key: str, data: Serializable, ttl: int) -> bool:
+        """
+        Save 'data' with 'key' only if there is no value stored with the key yet
+        and set auto expiration timeout in seconds. This can be used
+        as a simple distributed lock.
+
+        The default implementation is not atomic - storages able to perform
+        the operation atomically should override the method.
+
+        arguments:
+        key -- an access key
+        data -- a value to be saved
+        ttl -- number of seconds to wait before the value is removed
+
+        returns:
+        True if the value has been saved, False otherwise
+        """
+        if self.exists(key):
+            return False
+        self.set(key, data)
+        self.set_ttl(key, ttl)
+        return True
+
+    def publish(self, channel: str, message: Serializable):
+        """
+        Send a notification message to all the clients subscribed to the
+        channel (see subscribe()). Storages without notification support
+        can leave the default implementation which does nothing.
+
+        arguments:
+        channel -- channel name
+        message -- a message to be sent
+        """
+        pass
+
+    def subscribe(self, channel: str) -> ChannelWatcher:
+        """
+        Subscribe to a notification channel. The returned watcher should be
+        used as a context manager (or closed explicitly).
+        Storages without notification support can leave the default
+        implementation which returns a simple polling watcher.
+
+        arguments:
+        channel -- channel name
+        """
+        return PollingWatcher()
+
+    @contextmanager
+    def pipeline(self) -> Iterator['KeyValueStorage']:
+        """
+        Provide an object with the same interface as the storage which
+        allows sending multiple write operations at once (i.e. in a single
+        round trip) when the context is left. The pipeline is intended for
+        write operations only - values returned by operations within the pipeline
+        are undefined and read operations may raise RuntimeError (as their results
+        are not available before the pipeline is executed).
+
+        The default implementation provides the storage itself (i.e. each
+        operation is performed immediately) - storages able to send multiple
+        commands at once should override the method.
+
+        Typical usage:
+
+        with db.pipeline() as pipe:
+            pipe.set(key, data)
+            pipe.set_ttl(key, ttl)
+        """
+        yield self
+
     def get_instance(self, plugin_id):
         """
         Return the current instance of the plug-in
@@ -107,6 +107,13 @@ class IntegrationDatabase(abc.ABC, Generic[N, R]):
         """
         pass
 
+    def execute_prepared(self, sql, args=()):
+        """
+        Execute a frequently used query and return all the rows. Implementations
+        may cache the query as a prepared statement.
+        """
+        return self.execute(sql, args).fetchall()
+
     @abc.abstractmethod
     def start_transaction(self, isolation_level=None):
         """
@@ -18,45 +18,185 @@
 
 import http.client
 import logging
+import os
+import threading
+import time
 import urllib.parse
-from typing import Dict, Any, List, Union, Tuple
+from collections import defaultdict
+from typing import Dict, Any, List, Union, Tuple, Optional
+
+# max. number of connections (both idle and active) per a single host
+DEFAULT_MAX_CONNECTIONS_PER_HOST = 10
+
+# max. number of repeated attempts in case of a connection error
+DEFAULT_MAX_RETRIES = 2
+
+# a delay (in seconds) before the first retry; each following retry doubles the value
+DEFAULT_RETRY_BACKOFF = 0.1
+
+DEFAULT_TIMEOUT = 15
+
+# methods we can safely repeat even if the server may have processed the failed request
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+# errors denoting a broken connection (e.g. a keep-alive connection closed by the server)
+RETRYABLE_ERRORS = (ConnectionError, http.client.BadStatusLine, http.client.CannotSendRequest,
+                    http.client.ResponseNotReady)
 
 
 class HTTPClientException(Exception):
     pass
 
 
+class _HostPool:
+
+    def __init__(self, max_connections: int):
+        self.idle: List[http.client.HTTPConnection] = []
+        self.slots = threading.BoundedSemaphore(max_connections)
+
+
+class HTTPConnectionPool:
+    """
+    A thread-safe pool of keep-alive HTTP(S) connections. Connections are
+    reused per (ssl, server, port). The number of connections per host is limited
+    (a request waits for a free connection up to its timeout). Requests failed due to
+    a broken connection are repeated with a new connection (with an exponential backoff).
+    """
+
+    def __init__(self, max_connections_per_host: int = DEFAULT_MAX_CONNECTIONS_PER_HOST,
+                 max_retries: int = DEFAULT_MAX_RETRIES, retry_backoff: float = DEFAULT_RETRY_BACKOFF):
+        self._max_connections_per_host = max_connections_per_host
+        self._max_retries = max_retries
+        self._retry_backoff = retry_backoff
+        self._hosts: Dict[Tuple[bool, str, int], _HostPool] = {}
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, int] = defaultdict(lambda: 0)
+
+    def _get_host(self, key: Tuple[bool, str, int]) -> _HostPool:
+        with self._lock:
+            if key not in self._hosts:
+                self._hosts[key] = _HostPool(self._max_connections_per_host)
+            return self._hosts[key]
+
+    def _incr(self, metric: str):
+        with self._lock:
+            self._metrics[metric] += 1
+
+    def _checkout(self, key: Tuple[bool, str, int], host: _HostPool, timeout: float):
+        with self._lock:
+            if len(host.idle) > 0:
+                self._metrics['reused'] += 1
+                return host.idle.pop(), True
+            self._metrics['created'] += 1
+        ssl, server, port = key
+        if ssl:
+            return http.client.HTTPSConnection(server, port=port, timeout=timeout), False
+        return http.client.HTTPConnection(server, port=port, timeout=timeout), False
+
+    def _checkin(self, host: _HostPool, connection: http.client.HTTPConnection):
+        with self._lock:
+            host.idle.append(connection)
+
+    def request(self, ssl: bool, server: str, port: int, method: str, path: str, body: Any = None,
+                headers: Optional[Dict[str, str]] = None,
+                timeout: float = DEFAULT_TIMEOUT) -> Tuple[int, bytes]:
+        """
+        Perform an HTTP request and read the whole response.
+
+        returns:
+        a 2-tuple (response status, response body)
+        """
+        key = (ssl, server, port)
+        host = self._get_host(key)
+        self._incr('requests')
+        attempt = 0
+        while True:
+            if not host.slots.acquire(timeout=timeout):
+                self._incr('failures')
+                raise HTTPClientException(f'No free connection to {server}:{port} available')
+            connection, reused = self._checkout(key, host, timeout)
+            try:
+                connection.timeout = timeout
+                if connection.sock is not None:
+                    connection.sock.settimeout(timeout)
+                connection.request(method, path, body, headers if headers is not None else {})
+                response = connection.getresponse()
+                data = response.read()
+                if response.will_close:
+                    connection.close()
+                else:
+                    self._checkin(host, connection)
+                return response.status, data
+            except RETRYABLE_ERRORS as ex:
+                connection.close()
+                # a stale keep-alive connection has failed before the request reached the server
+                repeatable = method in IDEMPOTENT_METHODS or (reused and attempt == 0)
+                if attempt >= self._max_retries or not repeatable:
+                    self._incr('failures')
+                    raise HTTPClientException(f'HTTP request to {server}:{port} failed: {ex}') from ex
+                self._incr('retries')
+                if not reused:
+                    time.sleep(self._retry_backoff * 2 ** attempt)
+                attempt += 1
+            except Exception:
+                connection.close()
+                self._incr('failures')
+                raise
+            finally:
+                host.slots.release()
+
+    def metrics(self) -> Dict[str, int]:
+        """
+        Return pool statistics (number of requests, created and reused connections,
+        retries, failures and currently idle connections)
+        """
+        with self._lock:
+            ans = dict(requests=0, created=0, reused=0, retries=0, failures=0)
+            ans.update(self._metrics)
+            ans['idle'] = sum(len(h.idle) for h in self._hosts.values())
+            return ans
+
+    def close(self):
+        with self._lock:
+            for host in self._hosts.values():
+                for connection in host.idle:
+                    connection.close()
+                host.idle = []
+
+
+_pool: Optional[HTTPConnectionPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> HTTPConnectionPool:
+    """
+    Return a process-wide connection pool. A new pool is created after fork
+    (connections must not be shared by processes).
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = HTTPConnectionPool()
+            _pool_pid = os.getpid()
+        return _pool
+
+
 class HTTPClient:
 
-    def __init__(self, server: str, port: int = 80, ssl: bool = False):
+    def __init__(self, server: str, port: int = 80, ssl: bool = False, timeout: float = DEFAULT_TIMEOUT):
         self._server = server
         self._port = port
         self._ssl = ssl
+        self._timeout = timeout
 
     @staticmethod
-    def _is_valid_response(response):
-        return response and (200 <= response.status < 300 or 400 <= response.status < 500)
+    def _is_valid_response(status: int):
+        return 200 <= status < 300 or 400 <= status < 500
 
     @staticmethod
-    def _is_found(response):
-        return 200 <= response.status < 300
-
-    def create_connection(self):
-        if self._ssl:
-            return http.client.HTTPSConnection(
-                self._server, port=self._port, timeout=15)
-        else:
-            return http.client.HTTPConnection(
-                self._server, port=self._port, timeout=15)
-
-    def process_response(self, connection):
-        response = connection.getresponse()
-        if self._is_valid_response(response):
-            logging.getLogger(__name__).debug(
-                'HTTP client response status: {0}'.format(response.status))
-            return response.read().decode('utf-8'), self._is_found(response)
-        else:
-            raise HTTPClientException('HTTP client response error {0}'.format(response.status))
+    def _is_found(status: int):
+        return 200 <= status < 300
 
     @staticmethod
     def enc_val(s):
@@ -74,11 +214,19 @@ class HTTPClient:
         return '&'.join(ans)
 
     def request(self, method: str, path: str, args: Union[Dict[str, Any], List[Tuple[str, Any]]], body: Any = None,
-                headers=None):
-        connection = self.create_connection()
-        try:
-            connection.request(method, path + '?' + self._process_args(args), body,
-                               headers if headers is not None else {})
-            return self.process_response(connection)
-        finally:
-            connection.close()
+                headers=None) -> Tuple[str, bool]:
+        """
+        Perform a request using the process-wide connection pool.
+
+        returns:
+        a 2-tuple (decoded response body, whether the response status is 2xx)
+        """
+        query = self._process_args(args)
+        status, data = get_pool().request(
+            self._ssl, self._server, self._port, method, path + '?' + query if query else path, body, headers,
+            timeout=self._timeout)
+        if self._is_valid_response(status):
+            logging.getLogger(__name__).debug('HTTP client response status: {0}'.format(status))
+            return data.decode('utf-8'), self._is_found(status)
+        else:
+            raise HTTPClientException('HTTP client response error {0}'.format(status))
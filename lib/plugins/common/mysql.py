@@ -16,8 +16,34 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
-import mysql.connector
+"""
+A MySQL/MariaDB access shared by mysql_* plug-ins.
+
+MySQLOps maintains a pool of connections. A connection is checked out
+for the current thread once a cursor is created (or a transaction is started)
+and it is checked back in once all the thread's cursors are closed (or garbage
+collected) and the transaction (if any) is finished. This means that concurrent
+requests in a multi-threaded deployment use different connections while code
+within a single thread works with a single connection (e.g. to see its own
+uncommitted changes).
+"""
+
+import os
+import time
+import threading
 import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+import mysql.connector
+from mysql.connector.errors import OperationalError, PoolError
+
+DEFAULT_POOL_TIMEOUT = 10
+
+DEFAULT_HEALTH_CHECK_INTERVAL = 30
+
+MAX_PREPARED_PER_CONNECTION = 64
 
 
 class MySQLConf(object):
@@ -32,39 +58,252 @@ class MySQLConf(object):
         self.pool_size = int(conf['mysql_pool_size'])
         self.conn_retry_delay = int(conf['mysql_retry_delay'])
         self.conn_retry_attempts = int(conf['mysql_retry_attempts'])
+        self.pool_timeout = int(conf.get('mysql_pool_timeout', DEFAULT_POOL_TIMEOUT))
+        self.health_check_interval = int(conf.get('mysql_health_check_interval', DEFAULT_HEALTH_CHECK_INTERVAL))
 
     @property
     def conn_dict(self):
         return dict(host=self.host, database=self.database, user=self.user,
-                    password=self.password, pool_size=self.pool_size, pool_name=self.pool_name,
-                    autocommit=self.autocommit)
+                    password=self.password, autocommit=self.autocommit)
+
+
+class PooledConnection(object):
+    """
+    A connection along with its cache of prepared statements
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.last_used = time.time()
+        self._prepared = OrderedDict()
+
+    def prepared_cursor(self, sql: str):
+        """
+        Return a pair (sql, cursor) for a prepared statement. Please note that
+        the returned 'sql' object must be passed to cursor.execute() as
+        mysql.connector re-prepares the statement in case a different
+        string object is passed.
+        """
+        item = self._prepared.get(sql)
+        if item is None:
+            item = (sql, self.conn.cursor(prepared=True, dictionary=True))
+            self._prepared[sql] = item
+            if len(self._prepared) > MAX_PREPARED_PER_CONNECTION:
+                _, (_, old_cursor) = self._prepared.popitem(last=False)
+                old_cursor.close()
+        else:
+            self._prepared.move_to_end(sql)
+        return item
+
+    def reset_prepared(self):
+        """
+        Forget all the prepared statements (to be used once the connection is re-established)
+        """
+        self._prepared = OrderedDict()
+
+
+class MySQLConnectionPool(object):
+
+    def __init__(self, mysql_conf: MySQLConf):
+        self._conf = mysql_conf
+        self._idle: List[PooledConnection] = []
+        self._slots = threading.BoundedSemaphore(mysql_conf.pool_size)
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._num_created = 0
+        self._num_checkouts = 0
+        self._num_waits = 0
+        self._num_reconnects = 0
+        self._num_discarded = 0
+        self._in_use = 0
+        self._peak_in_use = 0
+
+    def _check_fork(self):
+        if os.getpid() != self._pid:
+            # connections inherited from a parent process must not be used
+            with self._lock:
+                self._pid = os.getpid()
+                self._idle = []
+                self._slots = threading.BoundedSemaphore(self._conf.pool_size)
+                self._in_use = 0
+
+    def reconnect(self, pconn: PooledConnection):
+        logging.getLogger(__name__).warning('Lost connection to MySQL server - reconnecting')
+        pconn.conn.reconnect(delay=self._conf.conn_retry_delay, attempts=self._conf.conn_retry_attempts)
+        pconn.reset_prepared()
+        with self._lock:
+            self._num_reconnects += 1
+
+    def checkout(self) -> PooledConnection:
+        self._check_fork()
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            with self._lock:
+                self._num_waits += 1
+            if not slots.acquire(timeout=self._conf.pool_timeout):
+                raise PoolError(f'Failed to obtain a MySQL connection within {self._conf.pool_timeout} s')
+        try:
+            with self._lock:
+                pconn = self._idle.pop() if len(self._idle) > 0 else None
+            if pconn is None:
+                pconn = PooledConnection(mysql.connector.connect(**self._conf.conn_dict))
+                with self._lock:
+                    self._num_created += 1
+            elif time.time() - pconn.last_used > self._conf.health_check_interval:
+                if not pconn.conn.is_connected():
+                    self.reconnect(pconn)
+        except Exception:
+            slots.release()
+            raise
+        with self._lock:
+            self._num_checkouts += 1
+            self._in_use += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+        return pconn
+
+    def checkin(self, pconn: PooledConnection):
+        if os.getpid() != self._pid:
+            return
+        try:
+            if pconn.conn.unread_result:
+                pconn.conn.consume_results()
+            if pconn.conn.in_transaction:
+                pconn.conn.rollback()
+            pconn.last_used = time.time()
+            reusable = True
+        except Exception as ex:
+            logging.getLogger(__name__).warning(f'Discarding a broken MySQL connection: {ex}')
+            reusable = False
+        with self._lock:
+            self._in_use -= 1
+            if reusable:
+                self._idle.append(pconn)
+            else:
+                self._num_discarded += 1
+        self._slots.release()
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Return pool utilization metrics
+        """
+        with self._lock:
+            return dict(
+                pool_size=self._conf.pool_size, in_use=self._in_use, idle=len(self._idle),
+                peak_in_use=self._peak_in_use, created=self._num_created, checkouts=self._num_checkouts,
+                waits=self._num_waits, reconnects=self._num_reconnects, discarded=self._num_discarded)
+
+
+class _Lease(object):
+
+    def __init__(self, thread_id: int, pconn: PooledConnection):
+        self.thread_id = thread_id
+        self.pconn = pconn
+        self.refs = 0
+        self.transaction = False
+
+
+class PooledCursor(object):
+    """
+    A cursor wrapper returning its connection to the pool once
+    the cursor is closed (or garbage collected).
+    """
+
+    def __init__(self, cursor, on_close):
+        self._cursor = cursor
+        self._on_close = on_close
+
+    def __getattr__(self, item):
+        return getattr(self._cursor, item)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def close(self):
+        if self._on_close is not None:
+            on_close, self._on_close = self._on_close, None
+            try:
+                self._cursor.close()
+            finally:
+                on_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __del__(self):
+        self.close()
 
 
 class MySQLOps(object):
     """
-    A simple wrapper for mysql.connector with ability
-    to reconnect.
+    A wrapper for mysql.connector with a connection pool
+    and ability to reconnect.
     """
 
-    def __init__(self, mysql_conf):
-        self._conn = mysql.connector.connect(**mysql_conf.conn_dict)
-        self._conn_retry_delay = mysql_conf.conn_retry_delay
-        self._conn_retry_attempts = mysql_conf.conn_retry_attempts
+    def __init__(self, mysql_conf: MySQLConf):
+        self._pool = MySQLConnectionPool(mysql_conf)
+        self._leases: Dict[int, _Lease] = {}
+        self._lock = threading.Lock()
+
+    def _acquire(self) -> _Lease:
+        thread_id = threading.get_ident()
+        with self._lock:
+            lease = self._leases.get(thread_id)
+        if lease is None:
+            lease = _Lease(thread_id, self._pool.checkout())
+            with self._lock:
+                self._leases[thread_id] = lease
+        lease.refs += 1
+        return lease
+
+    def _release(self, lease: _Lease):
+        lease.refs -= 1
+        if lease.refs == 0:
+            with self._lock:
+                self._leases.pop(lease.thread_id, None)
+            self._pool.checkin(lease.pconn)
+
+    def _current_lease(self) -> Optional[_Lease]:
+        with self._lock:
+            return self._leases.get(threading.get_ident())
+
+    @contextmanager
+    def _leased(self):
+        lease = self._acquire()
+        try:
+            yield lease.pconn
+        finally:
+            self._release(lease)
 
     def cursor(self, dictionary=True, buffered=False):
+        lease = self._acquire()
         try:
-            return self._conn.cursor(dictionary=dictionary, buffered=buffered)
-        except mysql.connector.errors.OperationalError as ex:
-            if 'MySQL Connection not available' in ex.msg:
-                logging.getLogger(__name__).warning(
-                    'Lost connection to MySQL server - reconnecting')
-                self._conn.reconnect(delay=self._conn_retry_delay,
-                                     attempts=self._conn_retry_attempts)
-                return self._conn.cursor(dictionary=dictionary, buffered=buffered)
+            try:
+                cursor = lease.pconn.conn.cursor(dictionary=dictionary, buffered=buffered)
+            except OperationalError as ex:
+                if 'MySQL Connection not available' not in ex.msg:
+                    raise
+                self._pool.reconnect(lease.pconn)
+                cursor = lease.pconn.conn.cursor(dictionary=dictionary, buffered=buffered)
+        except Exception:
+            self._release(lease)
+            raise
+        return PooledCursor(cursor, lambda: self._release(lease))
 
     @property
     def connection(self):
-        return self._conn
+        """
+        Return a raw connection bound to the current thread. Please note that
+        the connection is never returned to the pool so cursor() should be
+        preferred.
+        """
+        return self._acquire().pconn.conn
+
+    @property
+    def pool_metrics(self) -> Dict[str, Any]:
+        return self._pool.metrics()
 
     def execute(self, sql, args):
         cursor = self.cursor()
@@ -76,8 +315,44 @@ class MySQLOps(object):
         cursor.executemany(sql, args_rows)
         return cursor
 
+    def execute_prepared(self, sql: str, args=()) -> List[Dict[str, Any]]:
+        """
+        Execute a query as a server-side prepared statement and return all the rows
+        (as dicts). Prepared statements are cached per connection so this is intended
+        for frequently used queries.
+        """
+        with self._leased() as pconn:
+            stored_sql, cursor = pconn.prepared_cursor(sql)
+            cursor.execute(stored_sql, tuple(args))
+            return cursor.fetchall()
+
+    def start_transaction(self, isolation_level=None):
+        """
+        Start a transaction. The current thread keeps its connection
+        until commit() or rollback() is called.
+        """
+        lease = self._acquire()
+        try:
+            lease.pconn.conn.start_transaction(isolation_level=isolation_level)
+        except Exception:
+            self._release(lease)
+            raise
+        lease.transaction = True
+
+    def _finish_transaction(self, commit: bool):
+        lease = self._current_lease()
+        if lease is None:
+            return  # nothing to do as the connections use autocommit
+        if commit:
+            lease.pconn.conn.commit()
+        else:
+            lease.pconn.conn.rollback()
+        if lease.transaction:
+            lease.transaction = False
+            self._release(lease)
+
     def commit(self):
-        self._conn.commit()
+        self._finish_transaction(True)
 
     def rollback(self):
-        self._conn.rollback()
+        self._finish_transaction(False)
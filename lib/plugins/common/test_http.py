@@ -0,0 +1,98 @@
+# Copyright (c) 2021 Charles University, Faculty of Arts,
+#                    Institute of the Czech National Corpus
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 2
+# dated June, 1991.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from plugins.common.http import HTTPConnectionPool, HTTPClientException
+
+
+class MockHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        status = 404 if self.path.startswith('/missing') else 200
+        body = f'path: {self.path}'.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        if self.path.startswith('/close'):
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+        if self.path.startswith('/close') or self.path.startswith('/drop'):
+            # in case of '/drop' the client is not notified
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+class HTTPConnectionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), MockHandler)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.pool = HTTPConnectionPool(max_connections_per_host=2)
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def request(self, path):
+        return self.pool.request(False, '127.0.0.1', self.port, 'GET', path, timeout=5)
+
+    def test_keep_alive(self):
+        for i in range(5):
+            self.assertEqual((200, f'path: /foo{i}'.encode('utf-8')), self.request(f'/foo{i}'))
+        metrics = self.pool.metrics()
+        self.assertEqual(5, metrics['requests'])
+        self.assertEqual(1, metrics['created'])
+        self.assertEqual(4, metrics['reused'])
+        self.assertEqual(1, metrics['idle'])
+
+    def test_connection_close(self):
+        self.request('/close')
+        self.request('/close')
+        self.assertEqual(2, self.pool.metrics()['created'])
+        self.assertEqual(0, self.pool.metrics()['idle'])
+
+    def test_status(self):
+        self.assertEqual(404, self.request('/missing')[0])
+
+    def test_stale_connection_retry(self):
+        self.request('/drop')
+        self.assertEqual(1, self.pool.metrics()['idle'])
+        self.assertEqual(200, self.request('/foo')[0])
+        metrics = self.pool.metrics()
+        self.assertEqual(1, metrics['retries'])
+        self.assertEqual(0, metrics['failures'])
+
+    def test_connection_error(self):
+        pool = HTTPConnectionPool(max_retries=1, retry_backoff=0.01)
+        self.server.shutdown()
+        self.server.server_close()
+        self.assertRaises(HTTPClientException, lambda: pool.request(
+            False, '127.0.0.1', self.port, 'GET', '/foo', timeout=1))
+        self.assertEqual(1, pool.metrics()['retries'])
+        self.assertEqual(1, pool.metrics()['failures'])
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), MockHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+if __name__ == '__main__':
+    unittest.main()
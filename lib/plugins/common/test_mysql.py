@@ -0,0 +1,140 @@
+# Copyright (c) 2021 Charles University, Faculty of Arts,
+#                    Institute of the Czech National Corpus
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 2
+# dated June, 1991.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+import threading
+import unittest
+
+from mysql.connector.errors import PoolError
+
+from plugins.common import mysql
+
+
+class MockCursor(object):
+
+    def __init__(self, conn, prepared=False, **kwargs):
+        self.conn = conn
+        self.prepared = prepared
+
+    def execute(self, sql, args=()):
+        if self.prepared:
+            self.conn.num_prepared_exec += 1
+
+    def fetchall(self):
+        return [dict(id=1)]
+
+    def close(self):
+        pass
+
+
+class MockConnection(object):
+
+    def __init__(self, **kwargs):
+        self.unread_result = False
+        self.in_transaction = False
+        self.num_prepared_cursors = 0
+        self.num_prepared_exec = 0
+
+    def cursor(self, **kwargs):
+        if kwargs.get('prepared'):
+            self.num_prepared_cursors += 1
+        return MockCursor(self, **kwargs)
+
+    def is_connected(self):
+        return True
+
+    def start_transaction(self, isolation_level=None):
+        self.in_transaction = True
+
+    def commit(self):
+        self.in_transaction = False
+
+    def rollback(self):
+        self.in_transaction = False
+
+
+class MySQLOpsTest(unittest.TestCase):
+
+    def setUp(self):
+        self._orig_connect = mysql.mysql.connector.connect
+        mysql.mysql.connector.connect = MockConnection
+        self.ops = mysql.MySQLOps(mysql.MySQLConf(dict(
+            mysql_host='localhost', mysql_db='kontext', mysql_user='kontext', mysql_passwd='', mysql_pool_size=2,
+            mysql_retry_delay=1, mysql_retry_attempts=1, mysql_pool_timeout=1)))
+
+    def tearDown(self):
+        mysql.mysql.connector.connect = self._orig_connect
+
+    def test_thread_shares_connection(self):
+        c1 = self.ops.cursor()
+        c2 = self.ops.cursor()
+        self.assertIs(c1.conn, c2.conn)
+        self.assertEqual(1, self.ops.pool_metrics['in_use'])
+        c1.close()
+        c2.close()
+        self.assertEqual(0, self.ops.pool_metrics['in_use'])
+        self.assertEqual(1, self.ops.pool_metrics['idle'])
+
+    def test_threads_use_different_connections(self):
+        conns = []
+
+        def fn():
+            with self.ops.cursor() as cursor:
+                conns.append(cursor.conn)
+                barrier.wait()
+
+        barrier = threading.Barrier(2)
+        threads = [threading.Thread(target=fn) for _ in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertIsNot(conns[0], conns[1])
+        self.assertEqual(2, self.ops.pool_metrics['created'])
+
+    def test_pool_exhausted(self):
+        cursor = self.ops.cursor()
+        holder = self.ops._pool.checkout()
+        errors = []
+
+        def fn():
+            try:
+                self.ops.cursor()
+            except PoolError as ex:
+                errors.append(ex)
+
+        t = threading.Thread(target=fn)
+        t.start()
+        t.join()
+        self.ops._pool.checkin(holder)
+        cursor.close()
+        self.assertEqual(1, len(errors))
+        self.assertEqual(1, self.ops.pool_metrics['waits'])
+        self.assertEqual(0, self.ops.pool_metrics['in_use'])
+
+    def test_transaction_keeps_connection(self):
+        self.ops.start_transaction()
+        self.ops.cursor().close()
+        self.assertEqual(1, self.ops.pool_metrics['in_use'])
+        self.ops.commit()
+        self.assertEqual(0, self.ops.pool_metrics['in_use'])
+
+    def test_prepared_statements_cached(self):
+        for i in range(3):
+            self.assertEqual([dict(id=1)], self.ops.execute_prepared('SELECT id FROM t WHERE id = %s', (i,)))
+        conn = self.ops._pool._idle[0].conn
+        self.assertEqual(1, conn.num_prepared_cursors)
+        self.assertEqual(3, conn.num_prepared_exec)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -36,8 +36,9 @@ class SignUpToken(AbstractSignUpToken[KeyValueStorage]):
     def save(self, db):
         rec = dict(value=self.value, user=self.user, created=self.created, label=self.label)
         k = self._mk_key()
-        db.set(k, rec)
-        db.set_ttl(k, self.ttl)
+        with db.pipeline() as pipe:
+            pipe.set(k, rec)
+            pipe.set_ttl(k, self.ttl)
         self.bound = True
 
     def load(self, db):
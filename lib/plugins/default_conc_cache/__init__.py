@@ -27,12 +27,30 @@ element conc_cache {
   element cache_dir {
     { text }
   }
+  element layout {
+    "hash" | "sharded"  # optional, default is "hash"
+  }?
+  element eviction_policy {
+    "age" | "value"  # optional, default is "age"
+  }?
 }
 
+Layouts:
+hash -- all the entries of a corpus are stored within a single hash 'conc_cache:[corpname]'
+sharded -- each entry is stored under its own key along with a secondary index
+           of entries derived from the same base query (see ShardedCacheMapping);
+           to convert existing data, please use the 'migrate_sharded.py' script
+
+Eviction policies (used by the conc_cache_monitor task):
+age -- the oldest (and largest) files are removed first
+value -- cache usage and calculation times are tracked in an eviction index
+         and files with the lowest value per byte are removed first (see eviction.py)
 """
 import os
 import hashlib
-from typing import Union, Tuple, Optional
+import uuid
+from collections import defaultdict
+from typing import Union, Tuple, Optional, List, Dict
 import logging
 
 import plugins
@@ -40,6 +58,7 @@ from plugins.abstract.conc_cache import AbstractConcCache, AbstractCacheMappingF
 from plugins import inject
 from plugins.abstract.general_storage import KeyValueStorage
 from corplib.corpus import KCorpus
+from .eviction import EvictionIndex
 
 
 def _uniqname(subchash: Optional[str], query: Tuple[str, ...]):
@@ -69,19 +88,54 @@ class DefaultCacheMapping(AbstractConcCache):
 
     KEY_TEMPLATE = 'conc_cache:%s'
 
-    def __init__(self, cache_dir: str, corpus: KCorpus, db: KeyValueStorage):
+    CHANNEL_TEMPLATE = 'conc_cache_status:%s:%s'
+
+    LOCK_KEY_TEMPLATE = 'conc_cache_lock:%s:%s'
+
+    def __init__(self, cache_dir: str, corpus: KCorpus, db: KeyValueStorage,
+                 eviction_index: Optional[EvictionIndex] = None):
         self._cache_root_dir = cache_dir
         self._corpus = corpus
         self._db = db
+        self._lock_tokens = {}
+        self._eviction_index = eviction_index
 
-    def _get_entry(self, subchash, q) -> Union[ConcCacheStatus, None]:
-        val = self._db.hash_get(self._mk_key(), _uniqname(subchash, q))
+    @staticmethod
+    def _status_from_stored(val) -> Union[ConcCacheStatus, None]:
+        """
+        Convert a stored value into a status. This must be used for all the stored
+        values as some DB plug-ins attach their own meta-data to dict values
+        (e.g. sqlite3_db's '__timestamp__' and '__key__').
+        """
         if val and type(val) is dict:
-            return ConcCacheStatus.from_storage(**val)
+            return ConcCacheStatus.from_storage(**dict((k, v) for k, v in val.items() if not k.startswith('__')))
         return None
 
+    @staticmethod
+    def remove_stored_entry(db: KeyValueStorage, corpus_id: str, entry_key: str):
+        """
+        Remove an entry identified by its hash (= cache file name without suffix)
+        without need to instantiate the mapping (used by clean-up tasks)
+        """
+        db.hash_del(DefaultCacheMapping.KEY_TEMPLATE % corpus_id, entry_key)
+
+    def _get_entry(self, subchash, q) -> Union[ConcCacheStatus, None]:
+        return self._status_from_stored(self._db.hash_get(self._mk_key(), _uniqname(subchash, q)))
+
     def _set_entry(self, subchash, q, data: ConcCacheStatus):
         self._db.hash_set(self._mk_key(), _uniqname(subchash, q), data.to_dict())
+        self._notify(_uniqname(subchash, q))
+
+    def _set_entries(self, subchash, items: List[Tuple[Tuple[str, ...], ConcCacheStatus]]):
+        self._db.hash_set_map(self._mk_key(), dict((_uniqname(subchash, q), data.to_dict()) for q, data in items))
+        for q, _ in items:
+            self._notify(_uniqname(subchash, q))
+
+    def _notify(self, entry_key: str):
+        self._db.publish(self._mk_channel(entry_key), entry_key)
+
+    def _mk_channel(self, entry_key: str) -> str:
+        return DefaultCacheMapping.CHANNEL_TEMPLATE % (self._corpus.corpname, entry_key)
 
     def _mk_key(self) -> str:
         return DefaultCacheMapping.KEY_TEMPLATE % self._corpus.corpname
@@ -129,28 +183,198 @@ class DefaultCacheMapping(AbstractConcCache):
     def get_calc_status(self, subchash: Optional[str], query: Tuple[str, ...]) -> Union[ConcCacheStatus, None]:
         return self._get_entry(subchash, query)
 
+    def get_calc_statuses(self, subchash: Optional[str], queries: List[Tuple[str, ...]]
+                          ) -> List[Union[ConcCacheStatus, None]]:
+        values = self._db.hash_mget(self._mk_key(), [_uniqname(subchash, q) for q in queries])
+        return [self._status_from_stored(val) for val in values]
+
+    def add_to_map_many(self, subchash: Optional[str], items: List[Tuple[Tuple[str, ...], ConcCacheStatus]],
+                        overwrite: bool = False) -> List[ConcCacheStatus]:
+        if overwrite:
+            prev_statuses = [None] * len(items)
+        else:
+            prev_statuses = self.get_calc_statuses(subchash, [query for query, _ in items])
+        ans = []
+        to_store = []
+        for (query, calc_status), prev_status in zip(items, prev_statuses):
+            if prev_status:
+                ans.append(prev_status)
+                continue
+            calc_status.q0hash = _uniqname(subchash, query[:1])
+            calc_status.cachefile = self._create_cache_file_path(subchash, query)
+            to_store.append((query, calc_status))
+            ans.append(calc_status)
+        if len(to_store) > 0:
+            self._set_entries(subchash, to_store)
+        return ans
+
     def update_calc_status(self, subchash: Optional[str], query: Tuple[str, ...], **kw):
         stored_data = self._get_entry(subchash, query)
         if stored_data:
             stored_data.update(**kw)
             self._set_entry(subchash, query, stored_data)
+            if self._eviction_index and kw.get('finished') is True and os.path.isfile(stored_data.cachefile):
+                self._eviction_index.register(
+                    self._corpus.corpname, _uniqname(subchash, query), stored_data.cachefile,
+                    size=os.path.getsize(stored_data.cachefile), cost=stored_data.last_upd - stored_data.created)
+
+    def mark_access(self, subchash, query):
+        if self._eviction_index:
+            self._eviction_index.record_access(self._corpus.corpname, _uniqname(subchash, query))
+
+    def _mk_lock_key(self, entry_key: str) -> str:
+        return DefaultCacheMapping.LOCK_KEY_TEMPLATE % (self._corpus.corpname, entry_key)
+
+    def acquire_calc_lock(self, subchash, query, ttl):
+        entry_key = _uniqname(subchash, query)
+        token = uuid.uuid4().hex
+        if self._db.set_if_absent(self._mk_lock_key(entry_key), token, ttl):
+            self._lock_tokens[entry_key] = token
+            return True
+        return False
+
+    def release_calc_lock(self, subchash, query):
+        entry_key = _uniqname(subchash, query)
+        token = self._lock_tokens.pop(entry_key, None)
+        if token is not None and self._db.get(self._mk_lock_key(entry_key)) == token:
+            self._db.remove(self._mk_lock_key(entry_key))
+
+    def watch_calc_status(self, subchash, query):
+        return self._db.subscribe(self._mk_channel(_uniqname(subchash, query)))
 
     def del_entry(self, subchash: Optional[str], q: Tuple[str, ...]):
         self._db.hash_del(self._mk_key(), _uniqname(subchash, q))
+        self._notify(_uniqname(subchash, q))
+        if self._eviction_index:
+            self._eviction_index.remove(self._corpus.corpname, _uniqname(subchash, q))
 
     def del_full_entry(self, subchash: Optional[str], q: Tuple[str, ...]):
+        removed = []
         for k, stored in self._db.hash_get_all(self._mk_key()).items():
             if stored:
                 if type(stored) is not dict:
                     logging.getLogger(__name__).warning(
                         'Removed unsupported conc cache value: {}'.format(stored))
                     self._db.hash_del(self._mk_key(), k)
+                    removed.append(k)
                 else:
-                    status = ConcCacheStatus.from_storage(**stored)
+                    status = self._status_from_stored(stored)
                     if _uniqname(subchash, q[:1]) == status.q0hash:
                         # original record's key must be used (k ~ entry_key match can be partial)
                         # must use direct access here (no del_entry())
                         self._db.hash_del(self._mk_key(), k)
+                        self._notify(k)
+                        removed.append(k)
+        if self._eviction_index and len(removed) > 0:
+            self._eviction_index.remove_many(self._corpus.corpname, removed)
+
+
+class ShardedCacheMapping(DefaultCacheMapping):
+    """
+    This class provides the same mapping as DefaultCacheMapping but each entry
+    is stored under its own key. Entries derived from the same base query
+    (i.e. sharing q0hash) are tracked by a secondary index so removing all
+    of them costs O(related entries) instead of O(all corpus entries).
+
+    Mapping looks like this:
+    conc_cache:[corpname]:md5(subchash, q) => calc_status
+    conc_cache_q0:[corpname]:md5(subchash, q[0]) => {md5(subchash, q): true, ...}
+    conc_cache_keys:[corpname] => {md5(subchash, q): md5(subchash, q[0]), ...}
+
+    The last key (a registry of all the corpus entry keys) is used only by the clean-up
+    task to find records with no respective cache files.
+    """
+
+    ENTRY_KEY_TEMPLATE = 'conc_cache:%s:%s'
+
+    INDEX_KEY_TEMPLATE = 'conc_cache_q0:%s:%s'
+
+    REGISTRY_KEY_TEMPLATE = 'conc_cache_keys:%s'
+
+    @staticmethod
+    def remove_stored_entry(db, corpus_id, entry_key):
+        key = ShardedCacheMapping.ENTRY_KEY_TEMPLATE % (corpus_id, entry_key)
+        status = DefaultCacheMapping._status_from_stored(db.get(key))
+        db.remove(key)
+        db.hash_del(ShardedCacheMapping.REGISTRY_KEY_TEMPLATE % corpus_id, entry_key)
+        if status and status.q0hash:
+            db.hash_del(ShardedCacheMapping.INDEX_KEY_TEMPLATE % (corpus_id, status.q0hash), entry_key)
+
+    @staticmethod
+    def get_stored_entries(db: KeyValueStorage, corpus_id: str, chunk_size: int = 500
+                           ) -> Dict[str, Optional[ConcCacheStatus]]:
+        """
+        Return all the registered entries of a corpus (used by clean-up tasks).
+        Registered keys with missing records are returned with None status.
+        """
+        entry_keys = list(db.hash_get_all(ShardedCacheMapping.REGISTRY_KEY_TEMPLATE % corpus_id).keys())
+        ans = {}
+        for i in range(0, len(entry_keys), chunk_size):
+            chunk = entry_keys[i:i + chunk_size]
+            values = db.mget([ShardedCacheMapping.ENTRY_KEY_TEMPLATE % (corpus_id, k) for k in chunk])
+            for entry_key, val in zip(chunk, values):
+                ans[entry_key] = DefaultCacheMapping._status_from_stored(val)
+        return ans
+
+    def _mk_entry_key(self, entry_key: str) -> str:
+        return ShardedCacheMapping.ENTRY_KEY_TEMPLATE % (self._corpus.corpname, entry_key)
+
+    def _mk_index_key(self, q0hash: str) -> str:
+        return ShardedCacheMapping.INDEX_KEY_TEMPLATE % (self._corpus.corpname, q0hash)
+
+    def _mk_registry_key(self) -> str:
+        return ShardedCacheMapping.REGISTRY_KEY_TEMPLATE % self._corpus.corpname
+
+    def _get_entry(self, subchash, q):
+        return self._status_from_stored(self._db.get(self._mk_entry_key(_uniqname(subchash, q))))
+
+    def _set_entry(self, subchash, q, data):
+        self._set_entries(subchash, [(q, data)])
+
+    def _set_entries(self, subchash, items):
+        index_updates = defaultdict(dict)
+        registry_updates = {}
+        with self._db.pipeline() as pipe:
+            for q, data in items:
+                entry_key = _uniqname(subchash, q)
+                pipe.set(self._mk_entry_key(entry_key), data.to_dict())
+                index_updates[_uniqname(subchash, q[:1])][entry_key] = True
+                registry_updates[entry_key] = _uniqname(subchash, q[:1])
+            for q0hash, fields in index_updates.items():
+                pipe.hash_set_map(self._mk_index_key(q0hash), fields)
+            pipe.hash_set_map(self._mk_registry_key(), registry_updates)
+        for q, _ in items:
+            self._notify(_uniqname(subchash, q))
+
+    def get_calc_statuses(self, subchash, queries):
+        values = self._db.mget([self._mk_entry_key(_uniqname(subchash, q)) for q in queries])
+        return [self._status_from_stored(val) for val in values]
+
+    def del_entry(self, subchash, q):
+        entry_key = _uniqname(subchash, q)
+        self._db.remove(self._mk_entry_key(entry_key))
+        self._db.hash_del(self._mk_index_key(_uniqname(subchash, q[:1])), entry_key)
+        self._db.hash_del(self._mk_registry_key(), entry_key)
+        self._notify(entry_key)
+        if self._eviction_index:
+            self._eviction_index.remove(self._corpus.corpname, entry_key)
+
+    def del_full_entry(self, subchash, q):
+        index_key = self._mk_index_key(_uniqname(subchash, q[:1]))
+        entry_keys = list(self._db.hash_get_all(index_key).keys())
+        for entry_key in entry_keys:
+            self._db.remove(self._mk_entry_key(entry_key))
+            self._db.hash_del(self._mk_registry_key(), entry_key)
+            self._notify(entry_key)
+        self._db.remove(index_key)
+        if self._eviction_index and len(entry_keys) > 0:
+            self._eviction_index.remove_many(self._corpus.corpname, entry_keys)
+
+
+LAYOUTS = {
+    'hash': DefaultCacheMapping,
+    'sharded': ShardedCacheMapping
+}
 
 
 class CacheMappingFactory(AbstractCacheMappingFactory):
@@ -160,24 +384,45 @@ class CacheMappingFactory(AbstractCacheMappingFactory):
     cache-control object.
     """
 
-    def __init__(self, cache_dir, db):
+    def __init__(self, cache_dir, db, layout='hash', eviction_policy='age'):
         self._cache_dir = cache_dir
         self._db = db
+        if layout not in LAYOUTS:
+            raise ValueError(f'Unknown conc. cache layout: {layout}')
+        self._layout = layout
+        self._mapping_class = LAYOUTS[layout]
+        if eviction_policy not in ('age', 'value'):
+            raise ValueError(f'Unknown conc. cache eviction policy: {eviction_policy}')
+        self._eviction_index = EvictionIndex(db) if eviction_policy == 'value' else None
 
     def get_mapping(self, corpus):
-        return DefaultCacheMapping(self._cache_dir, corpus, self._db)
+        return self._mapping_class(self._cache_dir, corpus, self._db, eviction_index=self._eviction_index)
+
+    def _remove_stored_entry(self, corpus_id, entry_key):
+        self._mapping_class.remove_stored_entry(self._db, corpus_id, entry_key)
+        if self._eviction_index:
+            self._eviction_index.remove(corpus_id, entry_key)
+
+    def _get_stored_entries(self, corpus_id):
+        return ShardedCacheMapping.get_stored_entries(self._db, corpus_id)
 
     def export_tasks(self):
         """
         Export tasks for Celery worker(s)
         """
-        from .cleanup import run as run_cleanup
+        from .cleanup import run as run_cleanup, run_sharded as run_sharded_cleanup
         from .monitor import run as run_monitor
 
         def conc_cache_cleanup(ttl, subdir, dry_run, corpus_id=None):
+            if self._layout == 'sharded':
+                return run_sharded_cleanup(root_dir=self._cache_dir,
+                                           corpus_id=corpus_id, ttl=ttl, subdir=subdir, dry_run=dry_run,
+                                           entry_remover=self._remove_stored_entry,
+                                           entries_getter=self._get_stored_entries)
             return run_cleanup(root_dir=self._cache_dir,
                                corpus_id=corpus_id, ttl=ttl, subdir=subdir, dry_run=dry_run,
-                               db_plugin=self._db, entry_key_gen=lambda c: DefaultCacheMapping.KEY_TEMPLATE % c)
+                               db_plugin=self._db, entry_key_gen=lambda c: DefaultCacheMapping.KEY_TEMPLATE % c,
+                               eviction_index=self._eviction_index)
 
         def conc_cache_monitor(min_file_age, free_capacity_goal, free_capacity_trigger, elastic_conf):
             """
@@ -192,8 +437,8 @@ class CacheMappingFactory(AbstractCacheMappingFactory):
             elastic_conf -- a tuple (URL, index, type) containing ElasticSearch server, index and document type
                             configuration for storing monitoring info; if None then the function is disabled
             """
-            return run_monitor(root_dir=self._cache_dir, db_plugin=self._db,
-                               entry_key_gen=lambda c: DefaultCacheMapping.KEY_TEMPLATE % c,
+            return run_monitor(root_dir=self._cache_dir, entry_remover=self._remove_stored_entry,
+                               eviction_index=self._eviction_index,
                                min_file_age=min_file_age, free_capacity_goal=free_capacity_goal,
                                free_capacity_trigger=free_capacity_trigger, elastic_conf=elastic_conf)
 
@@ -202,4 +447,6 @@ class CacheMappingFactory(AbstractCacheMappingFactory):
 
 @inject(plugins.runtime.DB)
 def create_instance(settings, db):
-    return CacheMappingFactory(cache_dir=settings.get('plugins', 'conc_cache')['cache_dir'], db=db)
+    conf = settings.get('plugins', 'conc_cache')
+    return CacheMappingFactory(cache_dir=conf['cache_dir'], db=db, layout=conf.get('layout', 'hash'),
+                               eviction_policy=conf.get('eviction_policy', 'age'))
@@ -87,14 +87,20 @@ class CacheFiles(object):
 
 class CacheCleanup(CacheFiles):
 
-    def __init__(self, db, root_path, corpus, ttl, subdir, entry_key_gen):
+    def __init__(self, db, root_path, corpus, ttl, subdir, entry_key_gen, eviction_index=None):
         super(CacheCleanup, self).__init__(root_path, subdir, corpus)
         self._db = db
+        self._eviction_index = eviction_index
         self._ttl = ttl
         self._entry_key_gen = entry_key_gen
         self._num_processed = 0
         self._num_removed = 0
 
+    def _remove_entry(self, corpus_id, cache_key, item_hash):
+        self._db.hash_del(cache_key, item_hash)
+        if self._eviction_index:
+            self._eviction_index.remove(corpus_id, item_hash)
+
     @staticmethod
     def _log_stats(files):
         for k, v in list(files.items()):
@@ -154,18 +160,20 @@ class CacheCleanup(CacheFiles):
                         if item_hash in to_del:
                             if not dry_run:
                                 os.unlink(to_del[item_hash])
-                                self._db.hash_del(cache_key, item_hash)
+                                self._remove_entry(corpus_id, cache_key, item_hash)
                             else:
                                 del to_del[item_hash]
                             num_deleted += 1
                         elif item_hash not in real_file_hashes:
                             if not dry_run:
-                                self._db.hash_del(cache_key, item_hash)
+                                self._remove_entry(corpus_id, cache_key, item_hash)
                             logging.getLogger().warn(
                                 'deleted stale cache map entry [%s][%s]' % (cache_key, item_hash))
                 except Exception as ex:
                     logging.getLogger().warn('Failed to process cache map file (will be deleted): %s' % (ex,))
                     self._db.remove(cache_key)
+                    if self._eviction_index:
+                        self._eviction_index.remove_corpus(corpus_id)
             else:
                 logging.getLogger().error('Cache map [%s] not found' % cache_key)
                 for item_hash, unbound_file in list(to_del.items()):
@@ -181,7 +189,70 @@ class CacheCleanup(CacheFiles):
         return ans
 
 
-def run(root_dir, corpus_id, ttl, subdir, dry_run, db_plugin, entry_key_gen):
+class ShardedCacheCleanup(CacheFiles):
+    """
+    A clean-up for the 'sharded' cache layout where each entry is stored
+    under its own key. Entries of files older than TTL are removed along with
+    the files. Stale records (i.e. records of finished calculations without files
+    and records of calculations not updated for longer than TTL) are removed too.
+    """
+
+    def __init__(self, root_path, corpus, ttl, subdir, entry_remover, entries_getter):
+        super(ShardedCacheCleanup, self).__init__(root_path, subdir, corpus)
+        self._ttl = ttl
+        self._entry_remover = entry_remover
+        self._entries_getter = entries_getter
+
+    def _is_stale(self, status):
+        if status is None or status.finished or status.error:
+            return True
+        return status.last_upd is None or self._ttl < (self._curr_time - status.last_upd) / 60.
+
+    def run(self, dry_run=False):
+        """
+        arguments:
+        dry_run -- if True then no actual writing/deleting is performed
+        """
+        num_deleted = 0
+        num_processed = 0
+
+        cache_files = self.list_dir()
+        CacheCleanup._log_stats(cache_files)
+        for corpus_id, corpus_cache_files in list(cache_files.items()):
+            real_file_hashes = set()
+            for cache_entry in corpus_cache_files:
+                num_processed += 1
+                item_key = os.path.basename(cache_entry[0]).rsplit('.conc')[0]
+                if self._ttl < cache_entry[1] / 60.:
+                    if not dry_run:
+                        self._entry_remover(corpus_id, item_key)
+                        try:
+                            os.unlink(cache_entry[0])
+                        except OSError as ex:
+                            logging.getLogger().warning('Failed to remove file %s: %s' % (cache_entry[0], ex))
+                    num_deleted += 1
+                else:
+                    real_file_hashes.add(item_key)
+
+            for item_key, status in self._entries_getter(corpus_id).items():
+                if item_key not in real_file_hashes and self._is_stale(status):
+                    if not dry_run:
+                        self._entry_remover(corpus_id, item_key)
+                    logging.getLogger().warning(
+                        'deleted stale cache map entry [%s][%s]' % (corpus_id, item_key))
+
+        ans = {'type': 'summary', 'processed': num_processed, 'deleted': num_deleted}
+        logging.getLogger(__name__).info(json.dumps(ans))
+        return ans
+
+
+def run_sharded(root_dir, corpus_id, ttl, subdir, dry_run, entry_remover, entries_getter):
+    proc = ShardedCacheCleanup(root_path=root_dir, corpus=corpus_id, ttl=ttl, subdir=subdir,
+                               entry_remover=entry_remover, entries_getter=entries_getter)
+    return proc.run(dry_run=dry_run)
+
+
+def run(root_dir, corpus_id, ttl, subdir, dry_run, db_plugin, entry_key_gen, eviction_index=None):
     proc = CacheCleanup(db=db_plugin, root_path=root_dir, corpus=corpus_id, ttl=ttl, subdir=subdir,
-                        entry_key_gen=entry_key_gen)
+                        entry_key_gen=entry_key_gen, eviction_index=eviction_index)
     return proc.run(dry_run=dry_run)
@@ -0,0 +1,248 @@
+# Copyright (c) 2021 Charles University - Faculty of Arts,
+#                    Institute of the Czech National Corpus
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 2
+# dated June, 1991.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+"""
+A persistent eviction index for concordance cache files. For each
+finished cache file, the index keeps its size, the time needed to
+calculate it (i.e. the cost of a recalculation), the time of the last
+access and the number of hits. Once the disk space is needed, files with
+the lowest value per byte are removed first - i.e. cheap and cold
+concordances go before expensive and hot ones.
+
+The index is stored via the DB plug-in:
+
+conc_cache_eviction:[corpus_id] => {entry_key: {cachefile, size, cost, created}, ...}
+conc_cache_eviction_hits:[corpus_id] => {entry_key: hits, ...}
+conc_cache_eviction_atime:[corpus_id] => {entry_key: atime, ...}
+conc_cache_eviction_corpora => {corpus_id: true, ...}
+
+To avoid a write per cache hit, accesses are buffered in-process and written
+(using atomic increments of hit counters) at most once per ACCESS_FLUSH_INTERVAL.
+Pending accesses are also written before eviction candidates are searched for
+and when the process exits.
+"""
+
+import os
+import time
+import atexit
+import weakref
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Any, List, Tuple
+
+from plugins.abstract.general_storage import KeyValueStorage
+
+# a minimal recalculation cost (in seconds) we attribute to any file
+MIN_RECALC_COST = 0.1
+
+# an idle time (in seconds) which halves the estimated access frequency of an entry
+ACCESS_HALF_LIFE = 3600
+
+# a max. time (in seconds) buffered accesses wait before they are written to the index
+ACCESS_FLUSH_INTERVAL = 30
+
+
+def entry_value(rec: Dict[str, Any], curr_time: float) -> float:
+    """
+    Estimate a value per byte of a cache entry. The value grows with the number
+    of hits and with the calculation time and it decreases with the time elapsed since
+    the last access and with the file size.
+    """
+    idle = max(0, curr_time - rec['atime'])
+    frequency = (1 + rec['hits']) / (1 + idle / ACCESS_HALF_LIFE)
+    return frequency * max(rec['cost'], MIN_RECALC_COST) / max(rec['size'], 1)
+
+
+_indices = weakref.WeakSet()
+_indices_lock = threading.Lock()
+
+
+class EvictionIndex(object):
+
+    KEY_TEMPLATE = 'conc_cache_eviction:%s'
+
+    HITS_KEY_TEMPLATE = 'conc_cache_eviction_hits:%s'
+
+    ATIME_KEY_TEMPLATE = 'conc_cache_eviction_atime:%s'
+
+    CORPORA_KEY = 'conc_cache_eviction_corpora'
+
+    def __init__(self, db: KeyValueStorage, flush_interval: float = ACCESS_FLUSH_INTERVAL):
+        self._db = db
+        self._flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending = defaultdict(dict)  # corpus_id => {entry_key: [hits, atime]}
+        self._last_flush = time.time()
+        with _indices_lock:
+            _indices.add(self)
+
+    def _mk_key(self, corpus_id: str) -> str:
+        return EvictionIndex.KEY_TEMPLATE % corpus_id
+
+    def _mk_hits_key(self, corpus_id: str) -> str:
+        return EvictionIndex.HITS_KEY_TEMPLATE % corpus_id
+
+    def _mk_atime_key(self, corpus_id: str) -> str:
+        return EvictionIndex.ATIME_KEY_TEMPLATE % corpus_id
+
+    def register(self, corpus_id: str, entry_key: str, cachefile: str, size: int, cost: float):
+        """
+        Register a finished cache file. Possible previous access stats are preserved
+        (a re-registered file keeps also its creation time).
+
+        arguments:
+        corpus_id -- a corpus the file belongs to
+        entry_key -- conc. cache entry key (= file name without suffix)
+        cachefile -- a path to the file
+        size -- file size in bytes
+        cost -- time in seconds needed to calculate the concordance
+        """
+        rec = self._db.hash_get(self._mk_key(corpus_id), entry_key)
+        if not rec:
+            rec = dict(created=time.time())
+            self._db.hash_set(EvictionIndex.CORPORA_KEY, corpus_id, True)
+        rec.update(cachefile=cachefile, size=size, cost=cost)
+        self._db.hash_set(self._mk_key(corpus_id), entry_key, rec)
+
+    def record_access(self, corpus_id: str, entry_key: str):
+        """
+        Record an access to a registered file. The access is buffered and written
+        along with other accesses once the flush interval elapses (see flush()).
+        Accesses to unregistered files are ignored.
+        """
+        curr_time = time.time()
+        with self._lock:
+            item = self._pending[corpus_id].setdefault(entry_key, [0, curr_time])
+            item[0] += 1
+            item[1] = curr_time
+            if curr_time - self._last_flush < self._flush_interval:
+                return
+            pending = self._pending
+            self._pending = defaultdict(dict)
+            self._last_flush = curr_time
+        self._write_accesses(pending)
+
+    def flush(self):
+        """
+        Write all the buffered accesses to the index
+        """
+        with self._lock:
+            pending = self._pending
+            self._pending = defaultdict(dict)
+            self._last_flush = time.time()
+        self._write_accesses(pending)
+
+    def _write_accesses(self, pending: Dict[str, Dict[str, List]]):
+        for corpus_id, items in pending.items():
+            entry_keys = list(items.keys())
+            registered = self._db.hash_mget(self._mk_key(corpus_id), entry_keys)
+            with self._db.pipeline() as pipe:
+                atimes = {}
+                for entry_key, rec in zip(entry_keys, registered):
+                    if rec:
+                        hits, atime = items[entry_key]
+                        pipe.hash_incr(self._mk_hits_key(corpus_id), entry_key, hits)
+                        atimes[entry_key] = atime
+                if len(atimes) > 0:
+                    pipe.hash_set_map(self._mk_atime_key(corpus_id), atimes)
+
+    def remove(self, corpus_id: str, entry_key: str):
+        self.remove_many(corpus_id, [entry_key])
+
+    def remove_many(self, corpus_id: str, entry_keys: List[str]):
+        with self._db.pipeline() as pipe:
+            for entry_key in entry_keys:
+                pipe.hash_del(self._mk_key(corpus_id), entry_key)
+                pipe.hash_del(self._mk_hits_key(corpus_id), entry_key)
+                pipe.hash_del(self._mk_atime_key(corpus_id), entry_key)
+
+    def remove_corpus(self, corpus_id: str):
+        """
+        Remove all the records of a corpus
+        """
+        with self._db.pipeline() as pipe:
+            pipe.remove(self._mk_key(corpus_id))
+            pipe.remove(self._mk_hits_key(corpus_id))
+            pipe.remove(self._mk_atime_key(corpus_id))
+            pipe.hash_del(EvictionIndex.CORPORA_KEY, corpus_id)
+
+    def get_records(self) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Return all the registered files as a list of tuples (corpus_id, entry_key, record)
+        where record contains also access stats (atime, hits)
+        """
+        ans = []
+        for corpus_id in self._db.hash_get_all(EvictionIndex.CORPORA_KEY).keys():
+            hits = self._db.hash_get_all(self._mk_hits_key(corpus_id))
+            atimes = self._db.hash_get_all(self._mk_atime_key(corpus_id))
+            for entry_key, rec in self._db.hash_get_all(self._mk_key(corpus_id)).items():
+                if rec and type(rec) is dict:
+                    rec['hits'] = hits.get(entry_key, 0)
+                    rec['atime'] = atimes.get(entry_key, rec['created'])
+                    ans.append((corpus_id, entry_key, rec))
+        return ans
+
+    def find_eviction_candidates(self, min_file_age: int) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Return registered files older than min_file_age (in seconds) sorted
+        by their value per byte (the least valuable first)
+        """
+        self.flush()
+        curr_time = time.time()
+        items = [item for item in self.get_records() if curr_time - item[2]['created'] > min_file_age]
+        return sorted(items, key=lambda item: entry_value(item[2], curr_time))
+
+
+@atexit.register
+def flush_all():
+    """
+    Write buffered accesses of all the existing eviction indices
+    """
+    with _indices_lock:
+        indices = list(_indices)
+    for index in indices:
+        try:
+            index.flush()
+        except Exception as ex:
+            logging.getLogger(__name__).warning(f'Failed to flush conc. cache eviction index: {ex}')
+
+
+def evict(index: EvictionIndex, entry_remover, min_file_age: int, free_capacity_goal: int) -> Dict[str, Any]:
+    """
+    Remove the least valuable cache files until free_capacity_goal (in bytes) is reached.
+
+    arguments:
+    index -- an eviction index
+    entry_remover -- a function (corpus_id, entry_key) removing a respective conc. cache entry
+    min_file_age -- a minimum age a cache file must be of to be deletable (in seconds)
+    free_capacity_goal -- a minimum capacity to free up (in bytes)
+    """
+    total = 0
+    num_removed = 0
+    errors = []
+    for corpus_id, entry_key, rec in index.find_eviction_candidates(min_file_age):
+        if total >= free_capacity_goal:
+            break
+        try:
+            entry_remover(corpus_id, entry_key)
+            index.remove(corpus_id, entry_key)
+            os.unlink(rec['cachefile'])
+            total += rec['size']
+            num_removed += 1
+        except FileNotFoundError:
+            logging.getLogger(__name__).warning(f'Removed stale eviction record {corpus_id}:{entry_key}')
+        except Exception as ex:
+            errors.append(ex)
+    return dict(num_removed=num_removed, bytes_removed=total, num_errors=len(errors),
+                first_error=errors[0] if len(errors) > 0 else None)
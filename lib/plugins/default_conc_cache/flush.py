@@ -21,20 +21,43 @@ import sys
 
 sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(__file__), '../..')))
 sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(__file__), '../../../scripts')))
-import autoconf
-import plugins
-import initializer
-initializer.init_plugin('db')
-initializer.init_plugin('conc_cache')
 from plugins.default_conc_cache import cleanup
-from plugins.default_conc_cache import DefaultCacheMapping
+from plugins.default_conc_cache import DefaultCacheMapping, ShardedCacheMapping
+
+
+def mk_key(corpus_id):
+    return DefaultCacheMapping.KEY_TEMPLATE % corpus_id
+
+
+def flush(db, root_dir, layout, corpus_id, ttl, subdir, dry_run):
+    """
+    Run the clean-up matching a configured cache layout
+
+    arguments:
+    db -- a KeyValueStorage instance
+    root_dir -- cache root directory
+    layout -- 'hash' or 'sharded'
+    corpus_id -- a concrete corpus to be processed (None for all the corpora)
+    ttl -- how old files (in minutes) will be preserved yet
+    subdir -- a subdirectory of root_dir to be processed (or None)
+    dry_run -- if True then no actual writing/deleting is performed
+    """
+    if layout == 'sharded':
+        return cleanup.run_sharded(root_dir=root_dir, corpus_id=corpus_id, ttl=ttl, subdir=subdir,
+                                   dry_run=dry_run,
+                                   entry_remover=lambda c, k: ShardedCacheMapping.remove_stored_entry(db, c, k),
+                                   entries_getter=lambda c: ShardedCacheMapping.get_stored_entries(db, c))
+    return cleanup.run(root_dir=root_dir, corpus_id=corpus_id, ttl=ttl, subdir=subdir,
+                       dry_run=dry_run, db_plugin=db, entry_key_gen=mk_key)
 
 
 if __name__ == '__main__':
     import argparse
-
-    def mk_key(corpus_id):
-        return DefaultCacheMapping.KEY_TEMPLATE % corpus_id
+    import autoconf
+    import plugins
+    import initializer
+    initializer.init_plugin('db')
+    initializer.init_plugin('conc_cache')
 
     parser = argparse.ArgumentParser(description='A script to control UCNK concordance cache')
     parser.add_argument('--dry-run', '-d', action='store_true',
@@ -57,7 +80,6 @@ if __name__ == '__main__':
     autoconf.setup_logger(log_path=args.log_path,
                           logger_name='conc_cache_cleanup',
                           logging_level=autoconf.LOG_LEVELS[args.log_level])
-    root_dir = autoconf.settings.get('plugins', 'conc_cache')['cache_dir']
-
-    cleanup.run(root_dir=root_dir, corpus_id=args.corpus, ttl=args.ttl, subdir=args.subdir,
-                dry_run=args.dry_run, db_plugin=plugins.runtime.DB.instance, entry_key_gen=mk_key)
+    conf = autoconf.settings.get('plugins', 'conc_cache')
+    flush(db=plugins.runtime.DB.instance, root_dir=conf['cache_dir'], layout=conf.get('layout', 'hash'),
+          corpus_id=args.corpus, ttl=args.ttl, subdir=args.subdir, dry_run=args.dry_run)
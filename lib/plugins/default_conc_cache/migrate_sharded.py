@@ -0,0 +1,91 @@
+# Copyright (c) 2021 Charles University in Prague, Faculty of Arts,
+#                    Institute of the Czech National Corpus
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 2
+# dated June, 1991.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+"""
+A script for converting concordance cache records from the 'hash'
+layout (a single hash per corpus) to the 'sharded' layout (a key per entry
+plus a secondary index of entries derived from the same base query).
+
+Please run the script with KonText stopped (or with the 'sharded' layout
+already configured) as records written in the meantime via the old layout
+would be lost.
+"""
+
+import os
+import sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(__file__), '../..')))
+sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(__file__), '../../../scripts')))
+import autoconf
+import plugins
+import initializer
+initializer.init_plugin('db')
+from plugins.default_conc_cache import DefaultCacheMapping, ShardedCacheMapping
+
+
+def migrate_corpus(db, corpus_id, dry_run):
+    """
+    Convert all the entries of a single corpus.
+
+    returns:
+    number of converted entries
+    """
+    old_key = DefaultCacheMapping.KEY_TEMPLATE % corpus_id
+    index_updates = defaultdict(dict)
+    registry = {}
+    num_entries = 0
+    for entry_key, stored in db.hash_get_all(old_key).items():
+        status = DefaultCacheMapping._status_from_stored(stored)
+        if status is None or not status.q0hash:
+            print(f'skipping unsupported record {old_key}[{entry_key}]')
+            continue
+        if not dry_run:
+            db.set(ShardedCacheMapping.ENTRY_KEY_TEMPLATE % (corpus_id, entry_key), status.to_dict())
+        index_updates[status.q0hash][entry_key] = True
+        registry[entry_key] = status.q0hash
+        num_entries += 1
+    if not dry_run:
+        for q0hash, fields in index_updates.items():
+            db.hash_set_map(ShardedCacheMapping.INDEX_KEY_TEMPLATE % (corpus_id, q0hash), fields)
+        if len(registry) > 0:
+            db.hash_set_map(ShardedCacheMapping.REGISTRY_KEY_TEMPLATE % corpus_id, registry)
+        db.remove(old_key)
+    return num_entries
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Convert concordance cache records to the "sharded" layout')
+    parser.add_argument('--dry-run', '-d', action='store_true',
+                        help='Just analyze, do not modify anything')
+    parser.add_argument('--corpus', '-c', type=str, help='A concrete corpus to be processed')
+    parser.add_argument('--subdir', '-s', type=str, default=None,
+                        help='Search for corpora will be performed in [cache_dir]/[subdir]')
+    args = parser.parse_args()
+
+    root_dir = autoconf.settings.get('plugins', 'conc_cache')['cache_dir']
+    if args.corpus:
+        corpora = [args.corpus]
+    else:
+        path = os.path.join(root_dir, args.subdir) if args.subdir else root_dir
+        corpora = [os.path.join(args.subdir, d) if args.subdir else d
+                   for d in os.listdir(path) if os.path.isdir(os.path.join(path, d))]
+    total = 0
+    for corpus_id in corpora:
+        num = migrate_corpus(plugins.runtime.DB.instance, corpus_id, args.dry_run)
+        print(f'{corpus_id}: {num} entries converted')
+        total += num
+    print(f'Finished converting {total} entries{" (dry run)" if args.dry_run else ""}')
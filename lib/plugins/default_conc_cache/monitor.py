@@ -22,6 +22,7 @@ try:
     from elasticsearch import Elasticsearch
 except ImportError:
     from .es_dummy import Elasticsearch
+from .eviction import evict
 
 
 def get_disk_free_space(path):
@@ -39,27 +40,28 @@ class Record(object):
 
 class Monitor(object):
 
-    def __init__(self, root_dir, db_plugin, entry_key_gen, min_file_age, free_capacity_goal, free_capacity_trigger,
-                 elastic_conf):
+    def __init__(self, root_dir, entry_remover, min_file_age, free_capacity_goal, free_capacity_trigger,
+                 elastic_conf, eviction_index=None):
         """
         arguments:
             root_dir -- cache root directory
-            db_plugin -- KonText database plug-in
-            entry_key_gen -- a function generating first level key for 
-                             a specific corpus cache entries within key-value database 
+            entry_remover -- a function (corpus_id, entry_key) removing a specific cache entry
+                             from the key-value database
             min_file_age -- a minimum age a cache file must be of to be deletable (in seconds) 
             free_capacity_goal -- a minimum capacity the task will try to free up in a single run (in bytes)
             free_capacity_trigger -- a maximum disk free capacity which triggers file removal process
             elastic_conf -- a tuple (URL, index, type) containing ElasticSearch server, index and document type
                             configuration for storing monitoring info; if None then the function is disabled
+            eviction_index -- an optional EvictionIndex; if set, then the cache directory is not
+                              searched and the least valuable files (instead of the oldest ones) are removed
         """
         self._root_dir = root_dir
-        self.db_plugin = db_plugin
-        self.entry_key_gen = entry_key_gen
+        self.entry_remover = entry_remover
         self.min_file_age = min_file_age
         self.free_capacity_goal = free_capacity_goal
         self.free_capacity_trigger = free_capacity_trigger
         self.elastic_conf = elastic_conf
+        self.eviction_index = eviction_index
         self._data = []
         self._time = None
 
@@ -74,6 +76,10 @@ class Monitor(object):
             else:
                 self._data.append(self.create_record(abs_path))
 
+    def analyze_index(self):
+        for _, _, rec in self.eviction_index.get_records():
+            self._data.append(Record(rec['cachefile'], round(self._time - rec['created']), rec['size']))
+
     @staticmethod
     def create_doc_hash(doc):
         return sha1(json.dumps(doc).encode('utf-8')).hexdigest()
@@ -81,7 +87,10 @@ class Monitor(object):
     def run(self):
         self._time = time.time()
         self._data = []
-        self.analyze_directory(self._root_dir)
+        if self.eviction_index:
+            self.analyze_index()
+        else:
+            self.analyze_directory(self._root_dir)
         free_sp = get_disk_free_space(self._root_dir)
         top_10 = self.get_10_largest_items_size()
         total_files = len(self._data)
@@ -107,9 +116,12 @@ class Monitor(object):
         return sum(x.size for x in sorted(self._data, key=lambda x: x.size, reverse=True)[:10])
 
     def parse_conc_code(self, path):
-        return self.entry_key_gen(os.path.basename(os.path.dirname(path))), os.path.basename(path)[:-len('.conc')]
+        return os.path.basename(os.path.dirname(path)), os.path.basename(path)[:-len('.conc')]
 
     def find_rm_candidates(self):
+        if self.eviction_index:
+            return evict(self.eviction_index, self.entry_remover, min_file_age=self.min_file_age,
+                         free_capacity_goal=self.free_capacity_goal)
         rmlist = sorted([v for v in self._data if v.age > self.min_file_age],
                         key=lambda v: v.size * v.age, reverse=True)
         total = 0
@@ -117,8 +129,8 @@ class Monitor(object):
         errors = []
         while i < len(rmlist) and total < self.free_capacity_goal:
             try:
-                key, key2 = self.parse_conc_code(rmlist[i].path)
-                self.db_plugin.hash_del(key, key2)
+                corpus_id, entry_key = self.parse_conc_code(rmlist[i].path)
+                self.entry_remover(corpus_id, entry_key)
                 os.unlink(rmlist[i].path)
                 total += rmlist[i].size
                 i += 1
@@ -131,12 +143,12 @@ class Monitor(object):
         pass
 
 
-def run(db_plugin, entry_key_gen, root_dir, min_file_age, free_capacity_goal, free_capacity_trigger,
-        elastic_conf=None):
+def run(entry_remover, root_dir, min_file_age, free_capacity_goal, free_capacity_trigger,
+        elastic_conf=None, eviction_index=None):
     """
     See Monitor.__init__() for arguments. 
     """
-    monitor = Monitor(root_dir=root_dir, db_plugin=db_plugin, entry_key_gen=entry_key_gen,
+    monitor = Monitor(root_dir=root_dir, entry_remover=entry_remover, eviction_index=eviction_index,
                       min_file_age=min_file_age, free_capacity_goal=free_capacity_goal,
                       free_capacity_trigger=free_capacity_trigger, elastic_conf=elastic_conf)
     return monitor.run()
@@ -0,0 +1,65 @@
+# Copyright (c) 2021 Charles University, Faculty of Arts,
+#                    Institute of the Czech National Corpus
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 2
+# dated June, 1991.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from collections import namedtuple
+
+from plugins.abstract.conc_cache import ConcCacheStatus
+from plugins.sqlite3_db.native import NativeDb
+from plugins.default_conc_cache import ShardedCacheMapping
+from plugins.default_conc_cache.flush import flush
+
+Corpus = namedtuple('Corpus', ['corpname'])
+
+
+class ShardedFlushTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp_dir, 'cache')
+        os.makedirs(os.path.join(self.cache_dir, 'susanne'))
+        self.db = NativeDb(dict(db_path=os.path.join(self.tmp_dir, 'test.db')))
+        self.mapping = ShardedCacheMapping(self.cache_dir, Corpus('susanne'), self.db)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_sharded_flush(self):
+        old_q, fresh_q, stale_q = ('aword,[lemma="a"]',), ('aword,[lemma="b"]',), ('aword,[lemma="c"]',)
+        old, fresh, _ = self.mapping.add_to_map_many(
+            None, [(q, ConcCacheStatus(finished=True)) for q in (old_q, fresh_q, stale_q)])
+        for status in (old, fresh):
+            with open(status.cachefile, 'w') as fw:
+                fw.write('data')
+        past = time.time() - 3600
+        os.utime(old.cachefile, (past, past))
+
+        ans = flush(self.db, self.cache_dir, 'sharded', corpus_id=None, ttl=30, subdir=None, dry_run=False)
+
+        self.assertEqual(1, ans['deleted'])
+        self.assertFalse(os.path.exists(old.cachefile))
+        self.assertTrue(os.path.exists(fresh.cachefile))
+        self.assertIsNone(self.mapping.get_calc_status(None, old_q))
+        self.assertIsNotNone(self.mapping.get_calc_status(None, fresh_q))
+        # a finished calculation without a file is a stale record
+        self.assertIsNone(self.mapping.get_calc_status(None, stale_q))
+        fresh_key = os.path.basename(fresh.cachefile).rsplit('.conc')[0]
+        self.assertEqual([fresh_key], list(ShardedCacheMapping.get_stored_entries(self.db, 'susanne').keys()))
+
+
+if __name__ == '__main__':
+    unittest.main()
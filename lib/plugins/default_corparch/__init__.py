@@ -105,8 +105,8 @@ element corpus {
 
 from collections import OrderedDict
 import copy
+import os
 import re
-from functools import reduce
 import logging
 try:
     from markdown import markdown
@@ -127,6 +127,7 @@ from corplib.fallback import EmptyCorpus
 from controller.plg import PluginCtx
 from translation import ugettext as _
 from settings import import_bool
+from plugins.default_corparch.search_index import CorplistSearchIndex, IndexedCorpus, iter_bits
 
 DEFAULT_LANG = 'en'
 
@@ -213,37 +214,11 @@ class DefaultCorplistProvider(CorplistProvider):
             right_lim = None
         return new_res, right_lim
 
-    @staticmethod
-    def matches_all(d):
-        return reduce(lambda prev, curr: prev and curr, d, True)
-
-    @staticmethod
-    def matches_size(d, min_size, max_size):
-        item_size = d.get('size', None)
-        return (item_size is not None and
-                (not min_size or int(item_size) >= int(min_size)) and
-                (not max_size or int(item_size) <= int(max_size)))
-
-    def sort(self, plugin_ctx, data, *fields):
-        def corp_cmp_key(c):
-            return c.get('name') if c.get('name') is not None else ''
-        return l10n.sort(data, loc=plugin_ctx.user_lang, key=corp_cmp_key)
-
-    def should_fetch_next(self, ans, offset, limit):
-        """
-        This quite artificial function can be used to optimize loading of a long list.
-        It is expected to depend on how the sort() function is implemented.
-        In case there is no sorting involved it is probably OK to skip loading
-        whole list once all the 'to be displayed' data is ready.
-        """
-        return True
-
     def search(self, plugin_ctx, query, offset=0, limit=None, filter_dict=None):
         if query is False:  # False means 'use default values'
             query = ''
         ans = {'rows': []}
         permitted_corpora = self._auth.permitted_corpora(plugin_ctx.user_dict)
-        used_keywords = set()
         all_keywords_map = dict(self._corparch.all_keywords(plugin_ctx))
         if filter_dict.get('minSize'):
             min_size = l10n.desimplify_num(filter_dict.get('minSize'), strict=False)
@@ -268,62 +243,64 @@ class DefaultCorplistProvider(CorplistProvider):
         else:
             limit = int(limit)
 
-        user_items = self._corparch.user_items.get_user_items(plugin_ctx)
-
-        def fav_id(corpus_id):
-            for item in user_items:
-                if item.is_single_corpus and item.main_corpus_id == corpus_id:
-                    return item.ident
-            return None
+        fav_ids = {}
+        for item in self._corparch.user_items.get_user_items(plugin_ctx):
+            if item.is_single_corpus and item.main_corpus_id not in fav_ids:
+                fav_ids[item.main_corpus_id] = item.ident
 
         query_substrs, query_keywords = parse_query(self._tag_prefix, query)
-
         normalized_query_substrs = [s.lower() for s in query_substrs]
-        for corp in self._corparch.get_list(plugin_ctx, permitted_corpora):
-            full_data = self._corparch.get_corpus_info(plugin_ctx, corp['id'])
-            if not isinstance(full_data, BrokenCorpusInfo):
-                if favourite_only and fav_id(corp['id']) is None:
-                    continue
 
-                keywords = [k for k, _ in full_data.metadata.keywords]
-                tests = []
-                found_in = []
-
-                tests.extend([k in keywords for k in query_keywords])
-                for s in normalized_query_substrs:
-                    # the name must be tested first to prevent the list 'found_in'
-                    # to be filled in case item matches both name and description
-                    if s in corp['name'].lower():
-                        tests.append(True)
-                    elif s in (corp['desc'].lower() if corp['desc'] else ''):
-                        tests.append(True)
-                        found_in.append('defaultCorparch__found_in_desc')
-                    else:
-                        tests.append(False)
-                tests.append(self.matches_size(corp, min_size, max_size))
-                tests.append(self._corparch.custom_filter(
-                    self._plugin_ctx, full_data, permitted_corpora))
-
-                if self.matches_all(tests):
-                    corp['size'] = corp['size']
-                    corp['size_info'] = l10n.simplify_num(corp['size']) if corp['size'] else None
-                    corp['keywords'] = []
-                    for k in keywords:
-                        if k not in all_keywords_map:
-                            logging.getLogger(__name__).warning(f'Undefined search keyword {k} (corpus {corp["id"]}')
-                            continue
-                        corp['keywords'].append((k, all_keywords_map[k]))
-                    corp['found_in'] = found_in
-                    corp['fav_id'] = fav_id(corp['id'])
-                    # because of client-side fav/feat/search items compatibility
-                    corp['corpus_id'] = corp['id']
-                    ans['rows'].append(corp)
-                    used_keywords.update(keywords)
-                    if not self.should_fetch_next(ans, offset, limit):
-                        break
-        ans['rows'], ans['nextOffset'] = self.cut_result(
-            self.sort(plugin_ctx, ans['rows']), offset, limit)
-        ans['keywords'] = l10n.sort(used_keywords, loc=plugin_ctx.user_lang)
+        index = self._corparch.search_index(plugin_ctx)
+        candidates = (index.from_ids(permitted_corpora) & index.with_keywords(query_keywords) &
+                      index.with_size(min_size, max_size) & index.containing(normalized_query_substrs))
+        if favourite_only:
+            candidates &= index.from_ids(fav_ids)
+
+        matched = []
+        found_in = {}
+        matched_bits = 0
+        for pos in iter_bits(candidates):
+            item = index[pos]
+            item_found_in = []
+            for s in normalized_query_substrs:
+                match = index.matches_substr(pos, s)
+                if match is None:
+                    break
+                elif match == 'desc':
+                    item_found_in.append('defaultCorparch__found_in_desc')
+            else:
+                if self._corparch.custom_filter(
+                        self._plugin_ctx, self._corparch.get_raw_corpus_info(plugin_ctx, item.id),
+                        permitted_corpora):
+                    matched.append(pos)
+                    matched_bits |= 1 << pos
+                    found_in[pos] = item_found_in
+
+        page, ans['nextOffset'] = self.cut_result(
+            index.sort_by_name(matched, plugin_ctx.user_lang), offset, limit)
+        for pos in page:
+            item = index[pos]
+            keywords = []
+            for k in item.keywords:
+                if k not in all_keywords_map:
+                    logging.getLogger(__name__).warning(f'Undefined search keyword {k} (corpus {item.id}')
+                    continue
+                keywords.append((k, all_keywords_map[k]))
+            ans['rows'].append({
+                'id': item.id,
+                'name': item.name,
+                'desc': item.desc,
+                'size': item.size,
+                'path': item.path,
+                'size_info': l10n.simplify_num(item.size) if item.size else None,
+                'keywords': keywords,
+                'found_in': found_in[pos],
+                'fav_id': fav_ids.get(item.id),
+                # because of client-side fav/feat/search items compatibility
+                'corpus_id': item.id
+            })
+        ans['keywords'] = l10n.sort(index.used_keywords(matched_bits), loc=plugin_ctx.user_lang)
         ans['query'] = query
         ans['current_keywords'] = query_keywords
         ans['filters'] = dict(filter_dict)
@@ -356,6 +333,8 @@ class CorpusArchive(AbstractSearchableCorporaArchive):
         self._auth: AbstractAuth = auth
         self._user_items = user_items
         self._corplist = None
+        self._corplist_mtime = None
+        self._search_index = None
         self.file_path = file_path
         self.root_xpath = root_xpath
         self._tag_prefix = tag_prefix
@@ -658,12 +637,44 @@ class CorpusArchive(AbstractSearchableCorporaArchive):
         else:
             return BrokenCorpusInfo()
 
+    def get_raw_corpus_info(self, plugin_ctx: PluginCtx, corpus_id):
+        """
+        Returns a non-localized corpus info as loaded from the corplist
+        (or None if the corpus is not defined there)
+        """
+        return self._raw_list(plugin_ctx).get(corpus_id)
+
+    def search_index(self, plugin_ctx: PluginCtx) -> CorplistSearchIndex:
+        """
+        Returns a search index of the whole corplist. The index is built on the first
+        access and rebuilt each time the corplist file changes.
+        """
+        corplist = self._raw_list(plugin_ctx)
+        index = self._search_index
+        if index is None:
+            items = []
+            for corp_id, item in corplist.items():
+                try:
+                    corp_info = plugin_ctx.corpus_manager.get_info(corp_id)
+                    name, desc, size = corp_info.name, corp_info.description, corp_info.size
+                except Exception as e:
+                    logging.getLogger(__name__).warning(
+                        'Failed to fetch info about %s with error %s (%r)' % (corp_id, type(e).__name__, e))
+                    name, desc, size = corp_id, '', None
+                items.append(IndexedCorpus(id=item['id'], name=name, desc=desc, size=size, path=item['path'],
+                                           keywords=[k for k, _ in item.metadata.keywords]))
+            index = CorplistSearchIndex(items)
+            if corplist is self._corplist:
+                self._search_index = index
+        return index
+
     def _load(self, plugin_ctx: PluginCtx):
         """
         Loads data from a configuration file
         """
         data = []
         self._keywords = OrderedDict()
+        self._corplist_mtime = os.path.getmtime(self.file_path)
         with open(self.file_path) as f:
             xml = etree.parse(f)
             root = xml.find(self.root_xpath)
@@ -674,12 +685,13 @@ class CorpusArchive(AbstractSearchableCorporaArchive):
         def identity(s): return s
         name_mod = lowercase if self._auth.ignores_corpora_names_case() else identity
         self._corplist = OrderedDict([(name_mod(item['id']), item) for item in data])
+        self._search_index = None
 
     def _raw_list(self, plugin_ctx: PluginCtx):
         """
         Returns list of all defined corpora including all lang. variants of labels etc.
         """
-        if self._corplist is None:
+        if self._corplist is None or os.path.getmtime(self.file_path) != self._corplist_mtime:
             self._load(plugin_ctx)
         return self._corplist
 
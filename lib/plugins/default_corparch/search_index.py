@@ -0,0 +1,161 @@
+# Copyright (c) 2021 Charles University, Faculty of Arts,
+#                    Institute of the Czech National Corpus
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 2
+# dated June, 1991.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+"""
+An in-memory search index for the corpus list. Corpora are identified by their
+position within the corplist and sets of corpora are represented by bitsets
+(plain Python integers) so filtering by keywords, size, permissions or favorite
+items becomes a sequence of bitwise operations.
+
+Substring search on names and descriptions uses trigram bitsets to obtain
+a (typically very small) set of candidates which are then verified
+by an actual substring test.
+"""
+
+import bisect
+import threading
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+import l10n
+
+NGRAM_SIZE = 3
+
+
+class IndexedCorpus(NamedTuple):
+    id: str
+    name: str
+    desc: str
+    size: Optional[int]
+    path: str
+    keywords: List[str]
+
+
+def _ngrams(s: str) -> Iterator[str]:
+    for i in range(len(s) - NGRAM_SIZE + 1):
+        yield s[i:i + NGRAM_SIZE]
+
+
+def iter_bits(bits: int) -> Iterator[int]:
+    """
+    Yield positions of set bits in ascending order
+    """
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class CorplistSearchIndex(object):
+
+    def __init__(self, items: Iterable[IndexedCorpus]):
+        self._items: List[IndexedCorpus] = list(items)
+        self._positions: Dict[str, int] = dict((item.id, i) for i, item in enumerate(self._items))
+        self._names = [(item.name or '').lower() for item in self._items]
+        self._descs = [(item.desc or '').lower() for item in self._items]
+        self._all = (1 << len(self._items)) - 1
+        self._keywords: Dict[str, int] = {}
+        self._ngrams: Dict[str, int] = {}
+        sized = []
+        for i, item in enumerate(self._items):
+            bit = 1 << i
+            for k in item.keywords:
+                self._keywords[k] = self._keywords.get(k, 0) | bit
+            for ng in set(_ngrams(self._names[i])) | set(_ngrams(self._descs[i])):
+                self._ngrams[ng] = self._ngrams.get(ng, 0) | bit
+            if item.size is not None:
+                sized.append((int(item.size), i))
+        sized.sort()
+        self._sizes = [s for s, _ in sized]
+        self._size_order = [i for _, i in sized]
+        self._with_size = sum(1 << i for i in self._size_order)
+        self._name_ranks: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, pos: int) -> IndexedCorpus:
+        return self._items[pos]
+
+    @property
+    def all(self) -> int:
+        return self._all
+
+    def from_ids(self, corpus_ids: Iterable[str]) -> int:
+        ans = 0
+        for corpus_id in corpus_ids:
+            pos = self._positions.get(corpus_id)
+            if pos is not None:
+                ans |= 1 << pos
+        return ans
+
+    def with_keywords(self, keywords: Iterable[str]) -> int:
+        ans = self._all
+        for k in keywords:
+            ans &= self._keywords.get(k, 0)
+        return ans
+
+    def with_size(self, min_size: Optional[int], max_size: Optional[int]) -> int:
+        """
+        Return corpora with a known size within [min_size, max_size]
+        (an empty value means the respective limit is not applied)
+        """
+        if not min_size and not max_size:
+            return self._with_size
+        left = bisect.bisect_left(self._sizes, int(min_size)) if min_size else 0
+        right = bisect.bisect_right(self._sizes, int(max_size)) if max_size else len(self._sizes)
+        ans = 0
+        for pos in self._size_order[left:right]:
+            ans |= 1 << pos
+        return ans
+
+    def containing(self, substrs: List[str]) -> int:
+        """
+        Return candidates possibly containing all the (lowercase) substrings
+        in their name or description. The result must be verified via matches_substr().
+        """
+        ans = self._all
+        for s in substrs:
+            for ng in _ngrams(s):
+                ans &= self._ngrams.get(ng, 0)
+                if not ans:
+                    return 0
+        return ans
+
+    def matches_substr(self, pos: int, substr: str) -> Optional[str]:
+        """
+        Test whether a corpus contains a (lowercase) substring.
+
+        returns:
+        'name', 'desc' or None (no match); name is tested first
+        """
+        if substr in self._names[pos]:
+            return 'name'
+        if substr in self._descs[pos]:
+            return 'desc'
+        return None
+
+    def used_keywords(self, bits: int) -> List[str]:
+        return [k for k, kbits in self._keywords.items() if kbits & bits]
+
+    def sort_by_name(self, positions: List[int], loc: str) -> List[int]:
+        with self._lock:
+            ranks = self._name_ranks.get(loc)
+            if ranks is None:
+                key = l10n.sort_key(loc)
+                order = sorted(range(len(self._items)), key=lambda i: key(self._items[i].name or ''))
+                ranks = [0] * len(order)
+                for rank, pos in enumerate(order):
+                    ranks[pos] = rank
+                self._name_ranks[loc] = ranks
+        return sorted(positions, key=ranks.__getitem__)
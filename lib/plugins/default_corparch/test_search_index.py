@@ -0,0 +1,59 @@
+# Copyright (c) 2021 Charles University, Faculty of Arts,
+#                    Institute of the Czech National Corpus
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 2
+# dated June, 1991.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+import unittest
+
+from plugins.default_corparch.search_index import CorplistSearchIndex, IndexedCorpus, iter_bits
+
+
+class CorplistSearchIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = CorplistSearchIndex([
+            IndexedCorpus('syn2015', 'SYN2015', 'A synchronic corpus of written Czech', 100_000_000, '/', ['written']),
+            IndexedCorpus('oral', 'ORAL', 'Spoken Czech', 5_000_000, '/', ['spoken']),
+            IndexedCorpus('intercorp', 'InterCorp', 'Parallel corpus', 1_500_000_000, '/', ['written', 'parallel']),
+            IndexedCorpus('broken', 'broken', '', None, '/', []),
+        ])
+
+    def ids(self, bits):
+        return [self.index[pos].id for pos in iter_bits(bits)]
+
+    def test_keywords(self):
+        self.assertEqual(['syn2015', 'intercorp'], self.ids(self.index.with_keywords(['written'])))
+        self.assertEqual(['intercorp'], self.ids(self.index.with_keywords(['written', 'parallel'])))
+        self.assertEqual([], self.ids(self.index.with_keywords(['foo'])))
+
+    def test_size(self):
+        self.assertEqual(['syn2015', 'oral', 'intercorp'], self.ids(self.index.with_size(0, None)))
+        self.assertEqual(['syn2015', 'oral'], self.ids(self.index.with_size(None, 100_000_000)))
+        self.assertEqual(['syn2015'], self.ids(self.index.with_size(10_000_000, 100_000_000)))
+
+    def test_substrings(self):
+        candidates = self.index.containing(['czech'])
+        self.assertEqual(['syn2015', 'oral'], self.ids(candidates))
+        self.assertEqual('desc', self.index.matches_substr(0, 'czech'))
+        self.assertEqual('name', self.index.matches_substr(2, 'corp'))
+        self.assertIsNone(self.index.matches_substr(1, 'parallel'))
+        # short substrings cannot be filtered by the index
+        self.assertEqual(self.index.all, self.index.containing(['or']))
+        self.assertEqual(0, self.index.containing(['xyz']))
+
+    def test_ids_and_used_keywords(self):
+        bits = self.index.from_ids({'oral': None, 'intercorp': None, 'unknown': None})
+        self.assertEqual(['oral', 'intercorp'], self.ids(bits))
+        self.assertEqual({'written', 'spoken', 'parallel'}, set(self.index.used_keywords(bits)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -24,9 +24,16 @@ from plugins.abstract.kwic_connect import AbstractKwicConnect
 from plugins.default_token_connect import setup_providers
 import plugins
 import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from actions import concordance
 from controller import exposed
-from multiprocessing.pool import ThreadPool
+
+# a max. number of lemmas fetched concurrently (per process)
+DEFAULT_MAX_FETCH_WORKERS = 16
+
+# a max. number of lemmas fetched concurrently within a single request
+DEFAULT_MAX_FETCH_FAN_OUT = 4
 
 
 def merge_results(curr, new, word):
@@ -40,20 +47,13 @@ def merge_results(curr, new, word):
         return curr
 
 
-def handle_word_req(args):
-    word, corpora, providers, ui_lang = args
-    with plugins.runtime.KWIC_CONNECT as kc:
-        return word, kc.fetch_data(providers, corpora, word, ui_lang)
-
-
 @exposed(return_type='json')
 def fetch_external_kwic_info(self, request):
     words = request.args.getlist('w')
-    with plugins.runtime.CORPARCH as ca:
+    with plugins.runtime.CORPARCH as ca, plugins.runtime.KWIC_CONNECT as kc:
         corpus_info = ca.get_corpus_info(self._plugin_ctx, self.corp.corpname)
-        args = [(w, [self.corp.corpname] + self.args.align, corpus_info.kwic_connect.providers, self.ui_lang)
-                for w in words]
-        results = ThreadPool(len(words)).imap_unordered(handle_word_req, args)
+        results = kc.fetch_words(corpus_info.kwic_connect.providers, [self.corp.corpname] + self.args.align,
+                                 words, self.ui_lang)
         provider_all = []
         for word, res in results:
             provider_all = merge_results(provider_all, res, word)
@@ -78,10 +78,13 @@ def get_corpus_kc_providers(self, _):
 
 class DefaultKwicConnect(AbstractKwicConnect):
 
-    def __init__(self, providers, corparch, max_kwic_words, load_chunk_size):
+    def __init__(self, providers, corparch, max_kwic_words, load_chunk_size,
+                 max_fetch_workers=DEFAULT_MAX_FETCH_WORKERS, max_fetch_fan_out=DEFAULT_MAX_FETCH_FAN_OUT):
         self._corparch = corparch
         self._max_kwic_words = max_kwic_words
         self._load_chunk_size = load_chunk_size
+        self._executor = ThreadPoolExecutor(max_workers=max_fetch_workers, thread_name_prefix='kwic_connect')
+        self._max_fetch_fan_out = max_fetch_fan_out
 
         self._providers = providers
         self._cache_path = None
@@ -124,13 +127,37 @@ class DefaultKwicConnect(AbstractKwicConnect):
                 raise ex
         return ans
 
+    def fetch_words(self, provider_ids, corpora, words, lang):
+        """
+        Fetch data for multiple words using the plug-in's shared thread pool.
+        Each distinct word is fetched just once and at most max_fetch_fan_out
+        words are processed concurrently.
+
+        returns:
+        a list of pairs (word, fetch_data result) in the order of the 'words' argument
+        """
+        pending = list(OrderedDict.fromkeys(words))
+        results = {}
+        running = {}
+        while len(pending) > 0 or len(running) > 0:
+            while len(pending) > 0 and len(running) < self._max_fetch_fan_out:
+                word = pending.pop(0)
+                running[self._executor.submit(self.fetch_data, provider_ids, corpora, word, lang)] = word
+            done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+        return [(word, results[word]) for word in words]
+
 
 @plugins.inject(plugins.runtime.CORPARCH)
 def create_instance(settings, corparch):
     providers, cache_path = setup_providers(settings.get('plugins', 'token_connect'))
     plg_conf = settings.get('plugins', 'kwic_connect')
-    kwic_conn = DefaultKwicConnect(providers, corparch, max_kwic_words=plg_conf['max_kwic_words'],
-                                   load_chunk_size=plg_conf['load_chunk_size'])
+    kwic_conn = DefaultKwicConnect(
+        providers, corparch, max_kwic_words=plg_conf['max_kwic_words'],
+        load_chunk_size=plg_conf['load_chunk_size'],
+        max_fetch_workers=int(plg_conf.get('max_fetch_workers', DEFAULT_MAX_FETCH_WORKERS)),
+        max_fetch_fan_out=int(plg_conf.get('max_fetch_fan_out', DEFAULT_MAX_FETCH_FAN_OUT)))
     if cache_path:
         kwic_conn.set_cache_path(cache_path)
     return kwic_conn
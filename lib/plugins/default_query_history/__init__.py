@@ -118,13 +118,14 @@ class QueryHistory(AbstractQueryHistory):
     def delete(self, user_id, query_id, created):
         k = self._mk_key(user_id)
         data = self.db.list_get(k)
-        self.db.remove(k)
         deleted = 0
-        for item in data:
-            if item.get('query_id') != query_id or item.get('created', 0) != created:
-                self.db.list_append(k, item)
-            else:
-                deleted += 1
+        with self.db.pipeline() as pipe:
+            pipe.remove(k)
+            for item in data:
+                if item.get('query_id') != query_id or item.get('created', 0) != created:
+                    pipe.list_append(k, item)
+                else:
+                    deleted += 1
         return deleted
 
     def _is_paired_with_conc(self, data):
@@ -311,9 +312,13 @@ class QueryHistory(AbstractQueryHistory):
                                                                                       item['query_id']))
             elif int(curr_time - item.get('created', 0)) / 86400 < self.ttl_days:
                 new_list.append(item)
-        for item in new_list:
-            self.db.list_append(tmp_key, item)
-        self.db.rename(tmp_key, data_key)
+        with self.db.pipeline() as pipe:
+            for item in new_list:
+                pipe.list_append(tmp_key, item)
+            if len(new_list) > 0:
+                pipe.rename(tmp_key, data_key)
+            else:
+                pipe.remove(data_key)
 
     def export(self, plugin_ctx):
         return {'page_num_records': self._page_num_records}
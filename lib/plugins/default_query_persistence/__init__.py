@@ -260,8 +260,9 @@ class DefaultQueryPersistence(AbstractQueryPersistence):
                 curr_data['prev_id'] = prev_data['id']
             data_key = self._mk_key(data_id)
 
-            self._db.set(data_key, curr_data)
-            self._db.set_ttl(data_key, self._get_ttl_for(user_id))
+            with self._db.pipeline() as pipe:
+                pipe.set(data_key, curr_data)
+                pipe.set_ttl(data_key, self._get_ttl_for(user_id))
             latest_id = curr_data['id']
         else:
             latest_id = prev_data['id']
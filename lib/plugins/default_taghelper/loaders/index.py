@@ -0,0 +1,179 @@
+# Copyright (c) 2021 Charles University, Faculty of Arts,
+#                    Institute of the Czech National Corpus
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 2
+# dated June, 1991.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+"""
+An in-memory index of positional tag variants. For each tag position and
+each value found at the position, the index contains a bitset (a Python int)
+where the i-th bit is set if the i-th tag variant has the value at the position.
+
+A typical tag-builder query (i.e. a pattern where each position is either a wildcard,
+a value or a character class) is then evaluated as an AND of per-position unions
+of bitsets. Values available in the matching variants are obtained by testing
+the result against the bitsets of respective positions.
+"""
+
+import os
+import re
+import pickle
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+# increase in case the structure of the stored index changes
+INDEX_FORMAT_VERSION = 1
+
+# a position value used for variants shorter than a respective position
+MISSING_VALUE = ''
+
+_PATTERN_ELM = re.compile(r'\[(?:\\.|[^\]\\])+\]|\\.|.')
+
+_SINGLE_CHAR_ELM = re.compile(r'\[(?:\\.|[^\]\\])+\]|\\[^\w\s]|[^\\()|*+?{}$^\[]')
+
+
+def parse_pattern(pattern: str) -> Optional[List[str]]:
+    """
+    Split a tag pattern into a list of regular expressions, each matching exactly
+    one character (i.e. one tag position). A trailing '.*' (matching any suffix)
+    is removed.
+
+    returns:
+    a list of regular expressions or None if the pattern cannot be evaluated
+    position by position (e.g. it contains repetitions, groups etc.)
+    """
+    if pattern.endswith('.*'):
+        pattern = pattern[:-2]
+    elms = _PATTERN_ELM.findall(pattern)
+    if not all(_SINGLE_CHAR_ELM.fullmatch(e) for e in elms):
+        return None
+    return elms
+
+
+def mask_from_indices(indices: List[int], size: int) -> int:
+    """
+    Create a bitset with the bits at specified indices set
+    """
+    data = bytearray((size + 7) // 8)
+    for i in indices:
+        data[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(data, 'little')
+
+
+class PositionalTagIndex(object):
+
+    def __init__(self, tags: List[str], bitsets: List[Dict[str, int]], num_pos: int, src_stamp=None):
+        """
+        arguments:
+        tags -- all the tag variants (padded to num_pos by '-')
+        bitsets -- a list (= positions) of dicts value => bitset of variants
+        num_pos -- number of tagset positions
+        src_stamp -- an identification of the source file version the index was built from
+        """
+        self.tags = tags
+        self.bitsets = bitsets
+        self.num_pos = num_pos
+        self.src_stamp = src_stamp
+        self.all_mask = (1 << len(tags)) - 1
+
+    @staticmethod
+    def file_stamp(path: str):
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    @staticmethod
+    def build(variants_path: str, num_pos: int) -> 'PositionalTagIndex':
+        """
+        Create the index from a file containing one tag variant per line
+        """
+        tags = []
+        with open(variants_path) as fr:
+            for line in fr:
+                line = line.strip()
+                tags.append(line + (num_pos - len(line)) * '-')
+        width = max([num_pos] + [len(t) for t in tags])
+        bitsets = []
+        for pos in range(width):
+            indices = defaultdict(list)
+            for i, tag in enumerate(tags):
+                indices[tag[pos] if pos < len(tag) else MISSING_VALUE].append(i)
+            bitsets.append(dict((v, mask_from_indices(idx, len(tags))) for v, idx in indices.items()))
+        return PositionalTagIndex(tags, bitsets, num_pos, PositionalTagIndex.file_stamp(variants_path))
+
+    @staticmethod
+    def load_or_build(variants_path: str, num_pos: int, cache_path: str) -> 'PositionalTagIndex':
+        """
+        Load the index stored in 'cache_path'. In case there is no stored index or the index
+        is outdated (the variants file has changed), a new one is built and stored.
+        """
+        stamp = PositionalTagIndex.file_stamp(variants_path)
+        try:
+            with open(cache_path, 'rb') as fr:
+                data = pickle.load(fr)
+            if data['version'] == INDEX_FORMAT_VERSION and data['src_stamp'] == stamp and \
+                    data['num_pos'] == num_pos:
+                return PositionalTagIndex(data['tags'], data['bitsets'], num_pos, stamp)
+        except FileNotFoundError:
+            pass
+        except Exception as ex:
+            logging.getLogger(__name__).warning(f'Failed to load tag index {cache_path}: {ex}')
+        index = PositionalTagIndex.build(variants_path, num_pos)
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as fw:
+            pickle.dump(dict(version=INDEX_FORMAT_VERSION, src_stamp=index.src_stamp, num_pos=num_pos,
+                             tags=index.tags, bitsets=index.bitsets), fw, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+        return index
+
+    def match_elements(self, elms: List[str]) -> int:
+        """
+        Return a bitset of variants matching a pattern split into per-position
+        regular expressions (see parse_pattern)
+        """
+        if len(elms) > len(self.bitsets):
+            return 0
+        mask = self.all_mask
+        for pos, elm in enumerate(elms):
+            values = self.bitsets[pos]
+            allowed = [v for v in values if re.fullmatch(elm, v)]
+            if len(allowed) < len(values):
+                pos_mask = 0
+                for v in allowed:
+                    pos_mask |= values[v]
+                mask &= pos_mask
+                if mask == 0:
+                    break
+        return mask
+
+    def match(self, pattern: str) -> int:
+        """
+        Return a bitset of variants matching a regular expression (from the beginning
+        of a variant). Patterns which cannot be evaluated via the index are matched
+        against all the variants.
+        """
+        elms = parse_pattern(pattern)
+        if elms is not None:
+            return self.match_elements(elms)
+        patt = re.compile(pattern)
+        return mask_from_indices([i for i, tag in enumerate(self.tags) if patt.match(tag)], len(self.tags))
+
+    def values_at(self, pos: int, mask: int) -> List[str]:
+        """
+        Return values found at a position within variants specified by a bitset
+        """
+        if pos >= len(self.bitsets):
+            return []
+        return [v for v, bits in self.bitsets[pos].items() if v != MISSING_VALUE and bits & mask]
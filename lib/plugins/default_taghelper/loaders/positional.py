@@ -19,13 +19,19 @@
 import os
 import time
 import json
+import threading
 from collections import defaultdict
 import re
 from lxml import etree
 from plugins.abstract.taghelper import AbstractTagsetInfoLoader
+from plugins.default_taghelper.loaders.index import PositionalTagIndex
 from translation import ugettext as _
 from typing import DefaultDict, Set, List, Union
 
+# parsed tagset descriptions: (taglist path, tagset name, lang) => (taglist file stamp, descriptions)
+_tag_descriptions = {}
+_tag_descriptions_lock = threading.Lock()
+
 
 class PositionalTagVariantLoader(AbstractTagsetInfoLoader):
     """
@@ -33,6 +39,10 @@ class PositionalTagVariantLoader(AbstractTagsetInfoLoader):
     Please note that values in config.xml/corpora/tags_cache_dir are cached without
     specific expiration time. It means that any data update must be followed by
     manual cache clean-up.
+
+    Tag variants are searched using a PositionalTagIndex which is kept in memory
+    and stored in the cache directory (the stored index is rebuilt automatically
+    once the variants file changes).
     """
 
     SPEC_CHAR_REPLACEMENTS = (
@@ -55,6 +65,8 @@ class PositionalTagVariantLoader(AbstractTagsetInfoLoader):
         self.cache_clear_interval = cache_clear_interval
         self.taglist_path = taglist_path
         self.initial_values = {}
+        self._index = None
+        self._index_lock = threading.Lock()
 
     def get_variant(self, user_selection, lang):
         """
@@ -70,6 +82,18 @@ class PositionalTagVariantLoader(AbstractTagsetInfoLoader):
 
         return self.initial_values[lang]
 
+    def _get_index(self, num_pos):
+        """
+        Return an index of tag variants. The index is reloaded in case
+        the variants file has changed.
+        """
+        stamp = PositionalTagIndex.file_stamp(self.variants_file_path)
+        with self._index_lock:
+            if self._index is None or self._index.src_stamp != stamp or self._index.num_pos != num_pos:
+                self._index = PositionalTagIndex.load_or_build(
+                    self.variants_file_path, num_pos, os.path.join(self.cache_dir, 'variants-index.pickle'))
+            return self._index
+
     def is_available(self):
         return os.path.exists(self.variants_file_path) and len(self.get_initial_values('en_US')) > 0
 
@@ -113,18 +137,15 @@ class PositionalTagVariantLoader(AbstractTagsetInfoLoader):
                 tst_path += '%s/' % s
                 if not os.path.exists(tst_path):
                     os.mkdir(tst_path, 0o775)
+            index = self._get_index(tagset['num_pos'])
             ans = [set() for _ in range(tagset['num_pos'])]
-            with open(self.variants_file_path) as fr:
-                for line in fr:
-                    line = line.strip() + (tagset['num_pos'] - len(line.strip())) * '-'
-                    for i in range(tagset['num_pos']):
-                        value = ''.join([char_replac_tab.get(x, x) for x in line[i]])
-                        if line[i] == '-':
-                            ans[i].add(('-', ''))
-                        elif i < len(tagset['values']):
-                            if line[i] in translation_table[i]:
-                                ans[i].add((value, '%s - %s' %
-                                            (line[i], translation_table[i][line[i]])))
+            for i in range(tagset['num_pos']):
+                for item in index.values_at(i, index.all_mask):
+                    if item == '-':
+                        ans[i].add(('-', ''))
+                    elif item in translation_table[i]:
+                        ans[i].add((char_replac_tab.get(item, item),
+                                    '%s - %s' % (item, translation_table[i][item])))
 
             ans_sorted = []
             for i in range(len(ans)):
@@ -157,34 +178,29 @@ class PositionalTagVariantLoader(AbstractTagsetInfoLoader):
         tagset = self._load_tag_descriptions(self.tagset_name, lang)
         required_pattern = required_pattern.replace('-', '.')
         char_replac_tab = dict(self.__class__.SPEC_CHAR_REPLACEMENTS)
-        patt = re.compile(required_pattern)
-        matching_tags = []
-        with open(self.variants_file_path) as fr:
-            for line in fr:
-                line = line.strip() + (tagset['num_pos'] - len(line.strip())) * '-'
-                if patt.match(line):
-                    matching_tags.append(line)
+        index = self._get_index(tagset['num_pos'])
+        mask = index.match(required_pattern)
 
         ans: DefaultDict[int, Union[Set, List]] = defaultdict(lambda: set())
-        if required_pattern in ('.*', '.+'):
-            tag_elms = ['.' for _ in range(tagset['num_pos'])]
+        if required_pattern in ('.*', '.+') or required_pattern.endswith('.*'):
+            num_elms = tagset['num_pos']
         else:
-            tag_elms = re.findall(r'\[[^\]]+\]|.', required_pattern)
+            num_elms = len(re.findall(r'\[[^\]]+\]|\\.|.', required_pattern))
         import logging
         logging.getLogger(__name__).debug(
-            'required_pattern: {}, tag_elms: {}'.format(required_pattern, tag_elms))
-        translation_tables = [dict(tagset['values'][i]) for i in range(len(tag_elms))]
-
-        for item in matching_tags:
-            for i in range(len(tag_elms)):
-                value = ''.join(
-                    [char_replac_tab[x] if x in char_replac_tab else x for x in item[i]])
-                if item[i] == '-':
+            'required_pattern: {}, num. of positions: {}'.format(required_pattern, num_elms))
+        translation_tables = [dict(tagset['values'][i]) if i < len(tagset['values']) else {}
+                              for i in range(num_elms)]
+
+        for i in range(num_elms if mask else 0):
+            for item in index.values_at(i, mask):
+                value = char_replac_tab.get(item, item)
+                if item == '-':
                     ans[i].add(('-', ''))
-                elif item[i] in translation_tables[i]:
-                    ans[i].add((value, '%s - %s' % (item[i], translation_tables[i][item[i]])))
+                elif item in translation_tables[i]:
+                    ans[i].add((value, '%s - %s' % (item, translation_tables[i][item])))
                 else:
-                    ans[i].add((value, '%s - %s' % (item[i], item[i])))
+                    ans[i].add((value, '%s - %s' % (item, item)))
 
         for key in ans:
             used_keys = [x[0] for x in ans[key]]
@@ -212,6 +228,18 @@ class PositionalTagVariantLoader(AbstractTagsetInfoLoader):
           * 'num_pos' : [number of tagset positions]
         """
         lang = lang.split('_')[0]
+        stamp = PositionalTagIndex.file_stamp(self.taglist_path)
+        cache_key = (self.taglist_path, tagset_name, lang)
+        with _tag_descriptions_lock:
+            cached = _tag_descriptions.get(cache_key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        ans = self._parse_tag_descriptions(tagset_name, lang)
+        with _tag_descriptions_lock:
+            _tag_descriptions[cache_key] = (stamp, ans)
+        return ans
+
+    def _parse_tag_descriptions(self, tagset_name, lang):
         with open(self.taglist_path) as fr:
             xml = etree.parse(fr)
         root = xml.find(f'/tagsets/tagset[@ident="{tagset_name}"]')
@@ -0,0 +1,64 @@
+# Copyright (c) 2021 Charles University, Faculty of Arts,
+#                    Institute of the Czech National Corpus
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 2
+# dated June, 1991.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+from plugins.default_taghelper.loaders.index import PositionalTagIndex, parse_pattern
+
+VARIANTS = ['NNMS1', 'NNFS2', 'AAMS1', 'AAFP4', 'VB-S', 'Z:', 'C*MS1']
+
+
+class PositionalTagIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.variants_path = os.path.join(self.tmp_dir, 'variants')
+        with open(self.variants_path, 'w') as fw:
+            fw.write('\n'.join(VARIANTS) + '\n')
+        self.index = PositionalTagIndex.build(self.variants_path, 5)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def matching(self, mask):
+        return [t for i, t in enumerate(self.index.tags) if mask & (1 << i)]
+
+    def test_parse_pattern(self):
+        self.assertEqual(['N', '.', '[MF]', '\\*'], parse_pattern('N.[MF]\\*.*'))
+        self.assertIsNone(parse_pattern('N+'))
+
+    def test_match_as_regexp(self):
+        for pattern in ('N', '[NA].M', '..[MF]S', '.*', 'C\\*', '[^N].F', '.+', 'VB.S', 'Z:...', 'NNMS1.'):
+            patt = re.compile(pattern)
+            self.assertEqual([t for t in self.index.tags if patt.match(t)],
+                             self.matching(self.index.match(pattern)), pattern)
+
+    def test_values_at(self):
+        mask = self.index.match('.A')
+        self.assertEqual(['F', 'M'], sorted(self.index.values_at(2, mask)))
+        self.assertEqual([], self.index.values_at(10, mask))
+
+    def test_stored_index(self):
+        cache_path = os.path.join(self.tmp_dir, 'cache', 'index.pickle')
+        index = PositionalTagIndex.load_or_build(self.variants_path, 5, cache_path)
+        self.assertTrue(os.path.exists(cache_path))
+        loaded = PositionalTagIndex.load_or_build(self.variants_path, 5, cache_path)
+        self.assertEqual(index.bitsets, loaded.bitsets)
+
+
+if __name__ == '__main__':
+    unittest.main()
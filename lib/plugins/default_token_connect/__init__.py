@@ -34,6 +34,8 @@ Required XML configuration: please see config.rng
 
 import json
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 import manatee
 
 import plugins
@@ -119,12 +121,22 @@ def add_structattr_support(corp: KCorpus, attrs, token_id):
     return decorator
 
 
+# a max. time (in seconds) we wait for a provider
+DEFAULT_FETCH_TIMEOUT = 15
+
+# a max. number of providers fetched concurrently (per process)
+DEFAULT_MAX_FETCH_WORKERS = 8
+
+
 class DefaultTokenConnect(AbstractTokenConnect):
 
-    def __init__(self, providers, corparch):
+    def __init__(self, providers, corparch, fetch_timeout=DEFAULT_FETCH_TIMEOUT,
+                 max_fetch_workers=DEFAULT_MAX_FETCH_WORKERS):
         self._corparch = corparch
         self._providers = providers
         self._cache_path = None
+        self._fetch_timeout = fetch_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_fetch_workers, thread_name_prefix='token_connect')
 
     def map_providers(self, providers):
         return [self._providers[ident] + (is_kwic_view,) for ident, is_kwic_view in providers]
@@ -150,23 +162,36 @@ class DefaultTokenConnect(AbstractTokenConnect):
         def fetch_any_attr(corp, att, t_id, num_t):
             return fetch_posattr(corp, att, t_id, num_t)
 
+        # providers are fetched concurrently, each of them is given the same deadline
+        # and the ones not finished in time (or failed) are reported as failed
+        # without affecting results of the other providers
+        jobs = []
         for backend, frontend, is_kwic_view in self.map_providers(providers):
+            args = {}
+            for attr in backend.get_required_attrs():
+                v = fetch_any_attr(corpus, attr, token_id, num_tokens)
+                if '.' in attr:
+                    s, sa = attr.split('.')
+                    if s not in args:
+                        args[s] = {}
+                    args[s][sa] = v
+                else:
+                    args[attr] = v
+            future = self._executor.submit(
+                backend.fetch, corpora, corpus, token_id, num_tokens, args, lang, context)
+            jobs.append((backend, frontend, is_kwic_view, future))
+
+        deadline = time.time() + self._fetch_timeout
+        for backend, frontend, is_kwic_view, future in jobs:
             try:
-                args = {}
-                for attr in backend.get_required_attrs():
-                    v = fetch_any_attr(corpus, attr, token_id, num_tokens)
-                    if '.' in attr:
-                        s, sa = attr.split('.')
-                        if s not in args:
-                            args[s] = {}
-                        args[s][sa] = v
-                    else:
-                        args[attr] = v
-                data, status = backend.fetch(
-                    corpora, corpus, token_id, num_tokens, args, lang, context)
+                data, status = future.result(timeout=max(0, deadline - time.time()))
                 ans.append(frontend.export_data(data, status, lang, is_kwic_view).to_dict())
-            except TypeError as ex:
-                logging.getLogger(__name__).error('TokenConnect backend error: {0}'.format(ex))
+            except Exception as ex:
+                if isinstance(ex, TimeoutError):
+                    future.cancel()
+                    ex = 'provider {0} did not respond in time'.format(backend.provider_id)
+                logging.getLogger(__name__).error('TokenConnect backend error: {0}: {1}'.format(
+                    backend.provider_id, ex))
                 err_frontend = ErrorFrontend(dict(heading=frontend.headings))
                 ans.append(err_frontend.export_data(
                     dict(error='{0}'.format(ex)), False, lang, is_kwic_view).to_dict())
@@ -224,7 +249,11 @@ def setup_providers(plg_conf):
 @plugins.inject(plugins.runtime.CORPARCH)
 def create_instance(settings, corparch):
     providers, cache_path = setup_providers(settings.get('plugins', 'token_connect'))
-    tok_det = DefaultTokenConnect(providers, corparch)
+    conf = settings.get('plugins', 'token_connect')
+    tok_det = DefaultTokenConnect(
+        providers, corparch,
+        fetch_timeout=float(conf.get('fetch_timeout', DEFAULT_FETCH_TIMEOUT)),
+        max_fetch_workers=int(conf.get('max_fetch_workers', DEFAULT_MAX_FETCH_WORKERS)))
     if cache_path:
         tok_det.set_cache_path(cache_path)
     return tok_det
@@ -17,13 +17,14 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
-import http.client
 import urllib.request
 import urllib.parse
 import urllib.error
 import logging
 import sqlite3
+import threading
 from plugins.default_token_connect.backends.cache import cached
+from plugins.common.http import HTTPClient
 
 from plugins.abstract.token_connect import AbstractBackend, BackendException
 
@@ -31,12 +32,20 @@ from plugins.abstract.token_connect import AbstractBackend, BackendException
 class SQLite3Backend(AbstractBackend):
     def __init__(self, conf, ident):
         super(SQLite3Backend, self).__init__(ident)
-        self._db = sqlite3.connect(conf['path'])
+        self._path = conf['path']
         self._query_tpl = conf['query']
+        # the backend is called from token_connect's worker threads
+        # so each thread uses its own connection
+        self._local = threading.local()
+
+    def _conn(self):
+        if not hasattr(self._local, 'conn'):
+            self._local.conn = sqlite3.connect(self._path)
+        return self._local.conn
 
     @cached
     def fetch(self, corpora, maincorp, token_id, num_tokens, query_args, lang):
-        cur = self._db.cursor()
+        cur = self._conn().cursor()
         cur.execute(self._query_tpl, (query_args['word'], query_args['lemma']))
         ans = cur.fetchone()
         if ans:
@@ -63,31 +72,8 @@ class HTTPBackend(AbstractBackend):
     def __init__(self, conf, ident):
         super(HTTPBackend, self).__init__(ident)
         self._conf = conf
-
-    @staticmethod
-    def _is_valid_response(response):
-        return response and (200 <= response.status < 300 or 400 <= response.status < 500)
-
-    @staticmethod
-    def _is_found(response):
-        return 200 <= response.status < 300
-
-    def create_connection(self):
-        if self._conf['ssl']:
-            return http.client.HTTPSConnection(
-                self._conf['server'], port=self._conf['port'], timeout=15)
-        else:
-            return http.client.HTTPConnection(
-                self._conf['server'], port=self._conf['port'], timeout=15)
-
-    def process_response(self, connection):
-        response = connection.getresponse()
-        if self._is_valid_response(response):
-            logging.getLogger(__name__).debug(
-                'HTTP Backend response status: {0}'.format(response.status))
-            return response.read().decode('utf-8'), self._is_found(response)
-        else:
-            raise Exception('Failed to load the data - error {0}'.format(response.status))
+        self._client = HTTPClient(
+            server=conf['server'], port=conf['port'], ssl=conf['ssl'], timeout=conf.get('timeout', 15))
 
     @staticmethod
     def enc_val(s):
@@ -105,22 +91,16 @@ class HTTPBackend(AbstractBackend):
 
     @cached
     def fetch(self, corpora, maincorp, token_id, num_tokens, query_args, lang, context=None):
-        connection = self.create_connection()
-        try:
-            args = dict(
-                ui_lang=self.enc_val(lang), corpus=self.enc_val(corpora[0]),
-                corpus2=self.enc_val(corpora[1] if len(corpora) > 1 else ''),
-                token_id=token_id, num_tokens=num_tokens,
-                **dict((k, dict((k2, self.enc_val(v2)) for k2, v2 in list(v.items())) if type(v) is dict else self.enc_val(v)
-                        ) for k, v in list(query_args.items())))
-            logging.getLogger(__name__).debug('HTTP Backend args: {0}'.format(args))
-
-            try:
-                query_string = self._conf['path'].format(**args)
-            except KeyError as ex:
-                raise BackendException('Failed to build query - value {0} not found'.format(ex))
+        args = dict(
+            ui_lang=self.enc_val(lang), corpus=self.enc_val(corpora[0]),
+            corpus2=self.enc_val(corpora[1] if len(corpora) > 1 else ''),
+            token_id=token_id, num_tokens=num_tokens,
+            **dict((k, dict((k2, self.enc_val(v2)) for k2, v2 in list(v.items())) if type(v) is dict else self.enc_val(v)
+                    ) for k, v in list(query_args.items())))
+        logging.getLogger(__name__).debug('HTTP Backend args: {0}'.format(args))
 
-            connection.request('GET', query_string)
-            return self.process_response(connection)
-        finally:
-            connection.close()
+        try:
+            query_string = self._conf['path'].format(**args)
+        except KeyError as ex:
+            raise BackendException('Failed to build query - value {0} not found'.format(ex))
+        return self._client.request('GET', query_string, {})
@@ -17,12 +17,30 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
+import atexit
+import threading
 import time
+import weakref
 import zlib
 import logging
 import sqlite3
+from collections import OrderedDict
 from functools import wraps
 from hashlib import md5
+from typing import Dict, Optional, Tuple
+
+# max. number of decoded items kept in memory (per backend)
+DEFAULT_MEMORY_CACHE_SIZE = 1000
+
+# max. time (in seconds) a decoded item is served from memory before it is validated
+# against the database again (the database rows may be removed by the 'clean_cache' task)
+DEFAULT_MEMORY_TTL = 60
+
+# how often (in seconds) we write collected last access times to the database
+ACCESS_FLUSH_INTERVAL = 30
+
+# max. number of collected last access times before they are written regardless of the interval
+ACCESS_FLUSH_MAX_ITEMS = 500
 
 
 def mk_token_connect_cache_key(provider_id, corpora, token_id, num_tokens, query_args, lang, context=None):
@@ -38,6 +56,137 @@ def mk_token_connect_cache_key(provider_id, corpora, token_id, num_tokens, query
     return md5(f'{provider_id}{corpora}{token_id}{num_tokens}{args}{lang}{context}'.encode('utf-8')).hexdigest()
 
 
+class TokenConnectCache(object):
+    """
+    A two-tier cache for backend results. Recently used items are kept decoded
+    in memory (LRU, each item for at most memory_ttl seconds so rows removed
+    from the database stop being served soon), the rest is read from the SQLite
+    database. Each thread
+    reuses its own database connection. Last access times are collected in
+    memory and written in batches so that cache hits do not cause
+    a database write each time.
+    """
+
+    def __init__(self, cache_path: str, memory_size: int = DEFAULT_MEMORY_CACHE_SIZE,
+                 memory_ttl: float = DEFAULT_MEMORY_TTL):
+        self._cache_path = cache_path
+        self._memory_size = memory_size
+        self._memory_ttl = memory_ttl
+        self._memory: OrderedDict = OrderedDict()  # key => (value, expiration time)
+        self._access_log: Dict[str, int] = {}
+        self._last_flush = time.time()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def cache_path(self) -> str:
+        return self._cache_path
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self._cache_path, isolation_level=None)
+            res = conn.execute('PRAGMA journal_mode=WAL').fetchone()
+            imode = res[0] if res else 'undefined'
+            if imode != 'wal':
+                logging.getLogger(__name__).warning(
+                    'Unable to set WAL mode for SQLite. Actual mode: {0}'.format(imode))
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: str, value: Tuple[str, bool]):
+        with self._lock:
+            self._memory[key] = (value, time.time() + self._memory_ttl)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self._memory_size:
+                self._memory.popitem(last=False)
+
+    def _log_access(self, key: str):
+        with self._lock:
+            self._access_log[key] = int(round(time.time()))
+            flush_required = (len(self._access_log) >= ACCESS_FLUSH_MAX_ITEMS or
+                              time.time() - self._last_flush >= ACCESS_FLUSH_INTERVAL)
+        if flush_required:
+            self.flush()
+
+    def get(self, key: str) -> Optional[Tuple[str, bool]]:
+        value = None
+        with self._lock:
+            item = self._memory.get(key)
+            if item is not None:
+                if item[1] > time.time():
+                    value = item[0]
+                    self._memory.move_to_end(key)
+                else:
+                    del self._memory[key]
+        if value is None:
+            res = self._conn().execute('SELECT data, found FROM cache WHERE key = ?', (key,)).fetchone()
+            if res is None:
+                return None
+            # unzip and decode the cached result, convert the "found" parameter value back to boolean
+            value = (zlib.decompress(res[0]).decode('utf-8'), res[1] == 1)
+            self._remember(key, value)
+        self._log_access(key)
+        return value
+
+    def put(self, key: str, provider_id: str, data: str, found: bool):
+        zipped = memoryview(zlib.compress(data.encode('utf-8')))
+        self._conn().execute(
+            'INSERT OR REPLACE INTO cache (key, provider, data, found, last_access) VALUES (?, ?, ?, ?, ?)',
+            (key, provider_id, zipped, 1 if found else 0, int(round(time.time()))))
+        self._remember(key, (data, bool(found)))
+
+    def flush(self):
+        """
+        Write collected last access times to the database
+        """
+        with self._lock:
+            items = [(t, k) for k, t in self._access_log.items()]
+            self._access_log = {}
+            self._last_flush = time.time()
+        if len(items) > 0:
+            # the connection is in the autocommit mode so the transaction must be explicit
+            conn = self._conn()
+            try:
+                conn.execute('BEGIN')
+                conn.executemany('UPDATE cache SET last_access = ? WHERE key = ?', items)
+                conn.execute('COMMIT')
+            except sqlite3.Error as ex:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                logging.getLogger(__name__).warning(f'Failed to update TC/KC cache access times: {ex}')
+
+
+_caches = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+
+def get_backend_cache(backend) -> Optional[TokenConnectCache]:
+    """
+    Return a cache instance of a backend (if caching is configured)
+    """
+    cache_path = backend.get_cache_path()
+    if not cache_path:
+        return None
+    with _caches_lock:
+        cache = _caches.get(backend)
+        if cache is None or cache.cache_path != cache_path:
+            cache = TokenConnectCache(cache_path)
+            _caches[backend] = cache
+        return cache
+
+
+@atexit.register
+def flush_all():
+    """
+    Write collected last access times of all the existing caches
+    """
+    with _caches_lock:
+        caches = list(_caches.values())
+    for cache in caches:
+        cache.flush()
+
+
 def cached(fn):
     """
     A decorator which tries to look for a key in cache before
@@ -52,39 +201,23 @@ def cached(fn):
         get full path to the cache_db_file using a method defined in the abstract class that reads the value from
         kontext's config.xml; if the cache path is not defined, do not use caching:
         """
-        cache_path = self.get_cache_path()
-        if cache_path:
+        cache = get_backend_cache(self)
+        if cache:
             key = mk_token_connect_cache_key(
                 self.provider_id, corpora, token_id, num_tokens, query_args, lang, context)
-            with sqlite3.connect(cache_path) as conn:
-                res = conn.execute('PRAGMA journal_mode=WAL').fetchone()
-                imode = res[0] if res else 'undefined'
-                if imode != 'wal':
-                    logging.getLogger(__name__).warning(
-                        'Unable to set WAL mode for SQLite. Actual mode: {0}'.format(imode))
-                curs = conn.cursor()
-                res = curs.execute("SELECT data, found FROM cache WHERE key = ?", (key,)).fetchone()
-                # if no result is found in the cache, call the backend function
-                if res is None:
-                    res = fn(self, corpora, maincorp, token_id, num_tokens, query_args, lang, context)
-                    # if a result is returned by the backend function, encode and zip its data part and store it in
-                    # the cache along with the "found" parameter
-                    if res:
-                        zipped = memoryview(zlib.compress(res[0].encode('utf-8')))
-                        curs.execute(
-                            "INSERT INTO cache (key, provider, data, found, last_access) VALUES (?, ?, ?, ?, ?)",
-                            (key, self.provider_id, zipped, 1 if res[1] else 0, int(round(time.time()))))
-                else:
-                    logging.getLogger(__name__).debug(
-                        'TC/KC cache hit, key prefix: {0} for token_id {1}, num_tokens: {2}, args {3}'.format(
-                            key[:6], token_id, num_tokens, query_args))
-                    # unzip and decode the cached result, convert the "found" parameter value back to boolean
-                    res = [zlib.decompress(res[0]).decode('utf-8'), res[1] == 1]
-                    # update last access
-                    curs.execute("UPDATE cache SET last_access = ? WHERE key = ?",
-                                 (int(round(time.time())), key))
-                curs.close()
-                # commited automatically via context manager
+            res = cache.get(key)
+            # if no result is found in the cache, call the backend function
+            if res is None:
+                res = fn(self, corpora, maincorp, token_id, num_tokens, query_args, lang, context)
+                # if a result is returned by the backend function, store its data part (encoded and zipped)
+                # in the cache along with the "found" parameter
+                if res:
+                    cache.put(key, self.provider_id, res[0], res[1])
+            else:
+                logging.getLogger(__name__).debug(
+                    'TC/KC cache hit, key prefix: {0} for token_id {1}, num_tokens: {2}, args {3}'.format(
+                        key[:6], token_id, num_tokens, query_args))
+                res = list(res)
         else:
             res = fn(self, corpora, maincorp, token_id, num_tokens, query_args, lang, context)
         return res if res else ('', False)
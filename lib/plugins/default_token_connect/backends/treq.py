@@ -127,19 +127,15 @@ class TreqBackend(HTTPBackend):
             treq_link = (self.mk_server_addr() + '/index.php', t_args)
             ta_args = self.mk_api_args(lang1=args['lang1'], lang2=args['lang2'], groups=args['groups'],
                                        lemma=args['lemma'])
-            connection = self.create_connection()
+            logging.getLogger(__name__).debug('Treq request args: {0}'.format(ta_args))
+            data, status = self._client.request('GET', self.mk_api_path(ta_args), {})
             try:
-                logging.getLogger(__name__).debug('Treq request args: {0}'.format(ta_args))
-                connection.request('GET', self.mk_api_path(ta_args))
-                data, status = self.process_response(connection)
                 data = json.loads(data)
                 max_items = self._conf.get('maxResultItems', self.DEFAULT_MAX_RESULT_LINES)
                 data['lines'] = data['lines'][:max_items]
             except ValueError:
                 logging.getLogger(__name__).error('Failed to parse response: {0}'.format(data))
                 data = dict(sum=0, lines=[])
-            finally:
-                connection.close()
         else:
             data = dict(sum=0, lines=[])
         return json.dumps(dict(treq_link=treq_link,
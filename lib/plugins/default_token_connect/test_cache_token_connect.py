@@ -22,7 +22,7 @@ import time
 import unittest
 
 from plugins.default_token_connect import DefaultTokenConnect, init_provider
-from plugins.default_token_connect.backends.cache import mk_token_connect_cache_key
+from plugins.default_token_connect.backends.cache import mk_token_connect_cache_key, flush_all, TokenConnectCache
 from plugins.default_token_connect.cache_man import CacheMan
 
 logging.basicConfig()
@@ -199,6 +199,17 @@ class CacheTest(unittest.TestCase):
         self.assertEqual(orig2[0].get('contents')[0][1][1],
                          cached2[0].get('contents')[0][1][1], True)
 
+    def test_memory_tier(self):
+        """
+        store an item, remove it from the cache db and check whether it is no more
+        served once its memory tier entry expires
+        """
+        cache = TokenConnectCache(self.cache_path, memory_ttl=0)
+        cache.put('key1', 'wiktionary_for_ic_9_en', 'data1', True)
+        self.assertEqual(('data1', True), cache.get('key1'))
+        self.cache_man.clear_extra_rows(0)
+        self.assertIsNone(cache.get('key1'))
+
     def test_backend_exception(self):
         self.assertRaises(Exception, self.raise_exc)
 
@@ -227,6 +238,7 @@ class CacheTest(unittest.TestCase):
         return res
 
     def get_last_access(self, key):
+        flush_all()  # last access times are written in batches
         conn = self.cache_man.conn
         c = conn.cursor()
         last_access = c.execute("SELECT last_access FROM cache WHERE key = ?", (key,)).fetchone()
@@ -22,9 +22,12 @@ free to be replaced/changed.
 """
 
 from translation import ugettext as _
-from typing import List, Any
+from typing import Iterable, Iterator, List, Any, Tuple, Union
 import abc
 
+# number of rows written between two attempts to obtain partial content of a writer
+DEFAULT_FLUSH_INTERVAL = 1000
+
 
 class ExportPluginException(Exception):
     pass
@@ -43,6 +46,46 @@ class AbstractExport(object):
     def raw_content(self) -> str:
         pass
 
+    def flush(self) -> Union[str, bytes, None]:
+        """
+        Return content written since the last call of the method (if the writer
+        is able to produce partial output). This allows streaming of large exports.
+        Any remaining content is returned by raw_content().
+        """
+        return None
+
+    def finish(self) -> Iterator[Union[str, bytes]]:
+        """
+        Finish the document and generate its remaining content. Writers producing
+        large final content (e.g. a zipped file) should generate it in chunks.
+        """
+        content = self.raw_content()
+        if content:
+            yield content
+
+    def stream_rows(self, rows: Iterable[Tuple[Any, ...]],
+                    flush_interval: int = DEFAULT_FLUSH_INTERVAL) -> Iterator[Union[str, bytes]]:
+        """
+        Write rows and generate exported content as soon as the writer provides it.
+        The returned generator can be used directly as a response body.
+
+        arguments:
+        rows -- tuples (line_num, *lang_rows) as expected by writerow(); please note
+                that the iterable is consumed lazily so it may also call other methods
+                of the writer (e.g. writeheading) between rows
+        flush_interval -- how often (in rows) partial content is fetched from the writer
+        """
+        for i, row in enumerate(rows, 1):
+            self.writerow(*row)
+            if i % flush_interval == 0:
+                content = self.flush()
+                if content:
+                    yield content
+        content = self.flush()
+        if content:
+            yield content
+        yield from self.finish()
+
     @abc.abstractmethod
     def writerow(self, line_num: int, *lang_rows: List[Any]):
         pass
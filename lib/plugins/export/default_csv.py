@@ -56,6 +56,11 @@ class CSVExport(AbstractExport):
     def raw_content(self):
         return ''.join(self.csv_buff.rows)
 
+    def flush(self):
+        ans = self.raw_content()
+        self.csv_buff.rows = []
+        return ans
+
     def write_ref_headings(self, data):
         self.csv_writer.writerow(data)
 
@@ -21,6 +21,7 @@ like data can be used) to XLSX (Office Open XML) format.
 Plug-in requires openpyxl library.
 """
 from io import BytesIO
+import tempfile
 from openpyxl import Workbook
 from openpyxl.cell import WriteOnlyCell
 
@@ -30,6 +31,8 @@ from translation import ugettext as _
 
 class XLSXExport(AbstractExport):
 
+    OUTPUT_CHUNK_SIZE = 65536
+
     def __init__(self, subtype):
         self._wb = Workbook(write_only=True)
         self._sheet = self._wb.create_sheet()
@@ -58,6 +61,18 @@ class XLSXExport(AbstractExport):
         self._wb.save(filename=output)
         return output.getvalue()
 
+    def finish(self):
+        # rows of a write-only workbook are spooled to a temporary file by openpyxl
+        # so we only have to avoid loading the final zipped document into memory
+        with tempfile.TemporaryFile() as output:
+            self._wb.save(filename=output)
+            output.seek(0)
+            while True:
+                chunk = output.read(self.OUTPUT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
     def writeheading(self, data):
         self._curr_line = 1
         if type(data) is dict:
@@ -18,6 +18,7 @@
 A plug-in allowing export of a concordance (in fact, any row/cell
 like data can be used) to XML format.
 """
+from io import BytesIO
 from lxml import etree
 import logging
 
@@ -25,10 +26,60 @@ from . import AbstractExport, ExportPluginException
 
 
 class GeneralDocument(object):
+    """
+    A document written incrementally - each added line is serialized
+    immediately and the produced content can be fetched via flush().
+    The heading is written along with the first line, any heading data
+    added after that are written as an additional heading element
+    at the current position within the document.
+    """
 
     def __init__(self, root_name):
-        self._root = etree.Element(root_name)
-        self._heading = etree.SubElement(self._root, 'heading')
+        self._root_name = root_name
+        self._heading = etree.Element('heading')
+        self._output = BytesIO()
+        self._xf_ctx = None
+        self._xf = None
+        self._open_elms = []
+        self._body_started = False
+
+    def _enter(self, name):
+        elm_ctx = self._xf.element(name)
+        elm_ctx.__enter__()
+        self._open_elms.append(elm_ctx)
+
+    def _leave(self):
+        self._open_elms.pop().__exit__(None, None, None)
+
+    def _start_body(self):
+        """
+        Open elements containing document lines
+        """
+        pass
+
+    def _ensure_body(self):
+        if self._xf is None:
+            self._xf_ctx = etree.xmlfile(self._output, encoding='UTF-8')
+            self._xf = self._xf_ctx.__enter__()
+            self._xf.write_declaration()
+            self._enter(self._root_name)
+        if not self._body_started:
+            self._body_started = True
+            self._xf.write(self._heading, pretty_print=True)
+            self._heading = None
+            self._start_body()
+        elif self._heading is not None:
+            self._xf.write(self._heading, pretty_print=True)
+            self._heading = None
+
+    def _get_heading(self):
+        if self._heading is None:
+            self._heading = etree.Element('heading')
+        return self._heading
+
+    def write(self, elm):
+        self._ensure_body()
+        self._xf.write(elm, pretty_print=True)
 
     @staticmethod
     def add_line_number(elm, num):
@@ -36,8 +87,24 @@ class GeneralDocument(object):
             line_num_elm = etree.SubElement(elm, 'num')
             line_num_elm.text = str(num)
 
+    def flush(self):
+        if self._xf is None:
+            return None
+        self._xf.flush()
+        ans = self._output.getvalue()
+        self._output.seek(0)
+        self._output.truncate()
+        return ans
+
     def tostring(self):
-        return etree.tostring(self._root, pretty_print=True, encoding='UTF-8')
+        """
+        Finish the document and return its remaining content
+        """
+        self._ensure_body()
+        while len(self._open_elms) > 0:
+            self._leave()
+        self._xf_ctx.__exit__(None, None, None)
+        return self._output.getvalue()
 
     def _auto_add_heading(self, data):
         if data is None:
@@ -46,9 +113,10 @@ class GeneralDocument(object):
             items = [('item', x) for x in data]
         else:
             items = list(data.items())
+        heading = self._get_heading()
         for k, v in items:
             elm = etree.Element(k)
-            self._heading.append(elm)
+            heading.append(elm)
             if type(v) is list or type(v) is tuple:
                 for item in v:
                     item_elm = etree.Element('item')
@@ -62,16 +130,18 @@ class CollDocument(GeneralDocument):
 
     def __init__(self):
         super(CollDocument, self).__init__('collocations')
-        self._items = etree.SubElement(self._root, 'items')
+
+    def _start_body(self):
+        self._enter('items')
 
     def add_heading(self, data):
-        scores_elm = etree.SubElement(self._heading, 'scores')
+        scores_elm = etree.SubElement(self._get_heading(), 'scores')
         for d in data:
             score_elm = etree.SubElement(scores_elm, 'score')
             score_elm.text = str(d)
 
     def add_line(self, data, line_num=None):
-        item_elm = etree.SubElement(self._items, 'item')
+        item_elm = etree.Element('item')
         self.add_line_number(item_elm, line_num)
         str_elm = etree.SubElement(item_elm, 'str')
         str_elm.text = data[0]
@@ -80,16 +150,19 @@ class CollDocument(GeneralDocument):
         for v in data[2:]:
             score_elm = etree.SubElement(item_elm, 'score')
             score_elm.text = str(v)
+        self.write(item_elm)
 
 
 class WordlistDocument(GeneralDocument):
 
     def __init__(self):
         super(WordlistDocument, self).__init__('word_list')
-        self._items = etree.SubElement(self._root, 'items')
+
+    def _start_body(self):
+        self._enter('items')
 
     def add_line(self, data, line_num=None):
-        item_elm = etree.SubElement(self._items, 'item')
+        item_elm = etree.Element('item')
         if line_num is not None:
             line_num_elm = etree.SubElement(item_elm, 'num')
             line_num_elm.text = str(line_num)
@@ -97,6 +170,7 @@ class WordlistDocument(GeneralDocument):
         str_elm.text = data[0]
         freq_elm = etree.SubElement(item_elm, 'freq')
         freq_elm.text = str(data[1])
+        self.write(item_elm)
 
     def add_heading(self, data):
         self._auto_add_heading(data)
@@ -106,18 +180,35 @@ class FreqDocument(GeneralDocument):
 
     def __init__(self):
         super(FreqDocument, self).__init__('frequency')
-        self._curr_items = None
+        self._pending_block = None
+        self._in_block = False
 
     def add_block(self, name):
-        curr_block = etree.SubElement(self._root, 'block')
-        name_elm = etree.SubElement(curr_block, 'name')
-        name_elm.text = name
-        self._curr_items = etree.SubElement(curr_block, 'items')
+        # the block is opened along with its first line so a heading
+        # provided after add_block() still precedes the block
+        self._pending_block = name
+
+    def _open_block(self):
+        if self._in_block:
+            self._leave()  # items
+            self._leave()  # block
+        else:
+            self._ensure_body()
+        self._enter('block')
+        self._ensure_body()  # a heading provided for the block (if any)
+        name_elm = etree.Element('name')
+        name_elm.text = self._pending_block
+        self._xf.write(name_elm, pretty_print=True)
+        self._enter('items')
+        self._in_block = True
+        self._pending_block = None
 
     def add_line(self, data, line_num=None):
-        if self._curr_items is None:
+        if self._pending_block is None and not self._in_block:
             self.add_block('')
-        item_elm = etree.SubElement(self._curr_items, 'item')
+        if self._pending_block is not None:
+            self._open_block()
+        item_elm = etree.Element('item')
 
         if line_num is not None:
             line_num_elm = etree.SubElement(item_elm, 'num')
@@ -131,6 +222,7 @@ class FreqDocument(GeneralDocument):
         if len(data) > 2:
             freq_pc_elm = etree.SubElement(item_elm, 'freq_pc')
             freq_pc_elm.text = data[-1]
+        self.write(item_elm)
 
     def add_heading(self, data):
         self._auto_add_heading(data)
@@ -140,8 +232,9 @@ class ConcDocument(GeneralDocument):
 
     def __init__(self):
         super(ConcDocument, self).__init__('concordance')
-        self._lines = etree.Element('lines')
-        self._root.append(self._lines)
+
+    def _start_body(self):
+        self._enter('lines')
 
     def _append_lang(self, elm, data):
         """
@@ -176,11 +269,12 @@ class ConcDocument(GeneralDocument):
         data -- a dictionary of key->value pairs to be converted into XML elements <key>value</key>
         line_num -- optional line number (if None, element is omitted)
         """
-        line_elm = etree.SubElement(self._lines, 'line')
+        line_elm = etree.Element('line')
         if line_num is not None:
             line_num_elm = etree.SubElement(line_elm, 'num')
             line_num_elm.text = str(line_num)
         self._append_lang(line_elm, data)
+        self.write(line_elm)
 
     def add_multilang_line(self, lang_rows, corpnames, line_num=None):
         """
@@ -192,7 +286,7 @@ class ConcDocument(GeneralDocument):
                      should describe 1st record in 'lang_rows')
         line_num -- optional line number (if None, element is omitted)
         """
-        line_elm = etree.SubElement(self._lines, 'parallel_lines')
+        line_elm = etree.Element('parallel_lines')
         if line_num is not None:
             line_num_elm = etree.SubElement(line_elm, 'num')
             line_num_elm.text = str(line_num)
@@ -204,16 +298,19 @@ class ConcDocument(GeneralDocument):
             else:
                 logging.getLogger(__name__).warning('Unable to fetch corpname for XML export')
             self._append_lang(parline_elm, lang_row)
+        self.write(line_elm)
 
 
 class PqueryDocument(GeneralDocument):
 
     def __init__(self):
         super(PqueryDocument, self).__init__('pquery_results')
-        self._items = etree.SubElement(self._root, 'items')
+
+    def _start_body(self):
+        self._enter('items')
 
     def add_line(self, data, line_num=None):
-        item_elm = etree.SubElement(self._items, 'item')
+        item_elm = etree.Element('item')
         if line_num is not None:
             line_num_elm = etree.SubElement(item_elm, 'num')
             line_num_elm.text = str(line_num)
@@ -221,6 +318,7 @@ class PqueryDocument(GeneralDocument):
         str_elm.text = data[0]
         freq_elm = etree.SubElement(item_elm, 'freq')
         freq_elm.text = str(data[1])
+        self.write(item_elm)
 
     def add_heading(self, data):
         self._auto_add_heading(data)
@@ -254,6 +352,9 @@ class XMLExport(AbstractExport):
     def raw_content(self):
         return self._document.tostring()
 
+    def flush(self):
+        return self._document.flush()
+
     def add_block(self, name):
         self._document.add_block(name)
 
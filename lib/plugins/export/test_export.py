@@ -0,0 +1,72 @@
+# Copyright (c) 2021 Charles University, Faculty of Arts,
+#                    Institute of the Czech National Corpus
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 2
+# dated June, 1991.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+"""
+Unittests for streaming of the export plug-in writers
+"""
+import unittest
+from io import BytesIO
+
+from lxml import etree
+from openpyxl import load_workbook
+
+from plugins.export import default_csv, default_xml, default_xlsx
+
+
+class StreamingExportTest(unittest.TestCase):
+
+    @staticmethod
+    def conc_rows(num):
+        for i in range(1, num + 1):
+            yield i, dict(ref=['doc%d' % i], left_context='left', kwic='kwic', right_context='right')
+
+    def test_csv(self):
+        writer = default_csv.create_instance('concordance')
+        chunks = list(writer.stream_rows(self.conc_rows(5), flush_interval=2))
+        self.assertEqual(3, len(chunks))
+        self.assertEqual('"5";"doc5";"left";"kwic";"right"\r\n', chunks[-1])
+
+    def test_xml_concordance(self):
+        writer = default_xml.create_instance('concordance')
+        writer.writeheading(dict(corpus='syn2015'))
+        chunks = list(writer.stream_rows(self.conc_rows(5), flush_interval=2))
+        self.assertTrue(len(chunks) > 1)
+        root = etree.fromstring(b''.join(chunks))
+        self.assertEqual('syn2015', root.findtext('heading/corpus'))
+        self.assertEqual(['1', '2', '3', '4', '5'], [e.text for e in root.findall('lines/line/num')])
+
+    def test_xml_freq_blocks(self):
+        writer = default_xml.create_instance('freq')
+
+        def rows():
+            for block in (('a', 'b'), ('c',)):
+                writer.add_block('')
+                writer.writeheading(['', 'word', 'freq', 'freq [%]'])
+                for i, word in enumerate(block, 1):
+                    yield i, [word, '10', '1.0']
+
+        root = etree.fromstring(b''.join(writer.stream_rows(rows(), flush_interval=1)))
+        self.assertEqual([['a', 'b'], ['c']],
+                         [[e.text for e in b.findall('items/item/str')] for b in root.findall('block')])
+
+    def test_xlsx(self):
+        writer = default_xlsx.create_instance('wordlist')
+        writer.set_col_types(int, str, float)
+        data = b''.join(writer.stream_rows((i, ('word%d' % i, str(i))) for i in range(1, 101)))
+        sheet = load_workbook(BytesIO(data)).active
+        self.assertEqual(100, sheet.max_row)
+        self.assertEqual('word100', sheet.cell(row=100, column=2).value)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -130,8 +130,7 @@ class MysqlAuthHandler(AbstractInternalAuth):
     def corpus_access(self, user_dict, corpus_name):
         if corpus_name == IMPLICIT_CORPUS:
             return False, True, ''
-        cursor = self.db.cursor()
-        cursor.execute(
+        rows = self.db.execute_prepared(
             'SELECT guaccess.name, MAX(guaccess.limited) AS limited '
             'FROM ' 
             '  (SELECT c.name, gr.limited '
@@ -146,14 +145,12 @@ class MysqlAuthHandler(AbstractInternalAuth):
             '   WHERE ucr.user_id = %s AND c.name = %s) AS guaccess '
             'GROUP BY guaccess.name',
             (user_dict['id'], corpus_name, user_dict['id'], corpus_name))
-        row = cursor.fetchone()
-        if row is not None:
+        if len(rows) > 0:
             return False, True, self._variant_prefix(corpus_name)
         return False, False, ''
 
     def permitted_corpora(self, user_dict):
-        cursor = self.db.cursor()
-        cursor.execute(
+        rows = self.db.execute_prepared(
             'SELECT guaccess.name, MAX(guaccess.limited) AS limited '
             'FROM '
             '  (SELECT c.name, gr.limited '
@@ -168,7 +165,7 @@ class MysqlAuthHandler(AbstractInternalAuth):
             '   WHERE ucr.user_id = %s) AS guaccess '
             'GROUP BY guaccess.name',
             (user_dict['id'], user_dict['id']))
-        corpora = [row['name'] for row in cursor.fetchall()]
+        corpora = [row['name'] for row in rows]
         if IMPLICIT_CORPUS not in corpora:
             corpora.append(IMPLICIT_CORPUS)
         return corpora
@@ -177,12 +174,11 @@ class MysqlAuthHandler(AbstractInternalAuth):
         return not self._case_sensitive_corpora_names
 
     def get_user_info(self, plugin_ctx):
-        cursor = self.db.cursor()
-        cursor.execute(
+        rows = self.db.execute_prepared(
             'SELECT id, username, firstname, lastname, email ' 
             'FROM kontext_user '
             'WHERE id = %s', (plugin_ctx.user_id, ))
-        return cursor.fetchone()
+        return rows[0] if len(rows) > 0 else None
 
     def is_administrator(self, user_id):
         """
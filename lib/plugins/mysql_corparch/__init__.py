@@ -21,7 +21,7 @@ import copy
 from collections import OrderedDict, defaultdict
 import os
 import logging
-from typing import Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 import json
 
 from controller import exposed
@@ -29,11 +29,12 @@ import actions.user
 import plugins
 from plugins import inject
 from plugins.abstract.corparch import (
-    AbstractSearchableCorporaArchive, BrokenCorpusInfo,
+    AbstractSearchableCorporaArchive, BrokenCorpusInfo, DictLike,
     TokenConnect, KwicConnect, QuerySuggest, TagsetInfo, CorpusInfo, CorpusListItem)
 from plugins.abstract.corparch.registry import RegModelSerializer, RegistryConf
 from plugins.mysql_corparch.backend import Backend
 from plugins.mysql_corparch.corplist import DefaultCorplistProvider, parse_query
+from plugins.mysql_corparch.cache import CorpusInfoCache, DEFAULT_MAX_SIZE, DEFAULT_CHECK_INTERVAL
 
 try:
     from markdown import markdown
@@ -41,6 +42,16 @@ except ImportError:
     def markdown(s): return s
 
 
+def _to_serializable(obj):
+    if isinstance(obj, DictLike):
+        return dict((k, _to_serializable(v)) for k, v in obj.__dict__.items())
+    elif isinstance(obj, (list, tuple)):
+        return [_to_serializable(v) for v in obj]
+    elif isinstance(obj, dict):
+        return dict((k, _to_serializable(v)) for k, v in obj.items())
+    return obj
+
+
 @exposed(return_type='json', access_level=1, skip_corpus_init=True)
 def get_favorite_corpora(ctrl, request):
     with plugins.runtime.CORPARCH as ca, plugins.runtime.USER_ITEMS as ui:
@@ -60,7 +71,12 @@ class MySQLCorparch(AbstractSearchableCorporaArchive):
 
     LABEL_OVERLAY_TRANSPARENCY = 0.20
 
-    def __init__(self, db_backend, user_items, tag_prefix, max_num_hints, max_page_size, registry_lang):
+    CORPUS_INFO_NESTED_ITEMS = ('citation_info', 'metadata', 'token_connect', 'kwic_connect', 'query_suggest',
+                                'manatee')
+
+    def __init__(self, db_backend, user_items, tag_prefix, max_num_hints, max_page_size, registry_lang,
+                 shared_db=None, corpus_info_cache_size=DEFAULT_MAX_SIZE,
+                 corpus_info_check_interval=DEFAULT_CHECK_INTERVAL):
         """
 
         arguments:
@@ -70,6 +86,9 @@ class MySQLCorparch(AbstractSearchableCorporaArchive):
             max_num_hints --
             max_page_size --
             registry_lang --
+            shared_db -- a key-value storage used as a shared corpus info cache (None = in-process cache only)
+            corpus_info_cache_size -- max. number of corpora cached within a process
+            corpus_info_check_interval -- how often (in seconds) cached corpora are tested for changes
         """
         self._backend = db_backend
         self._user_items = user_items
@@ -77,13 +96,12 @@ class MySQLCorparch(AbstractSearchableCorporaArchive):
         self._max_num_hints = int(max_num_hints)
         self._max_page_size = int(max_page_size)
         self._registry_lang = registry_lang
-        self._corpus_info_cache: Dict[str, CorpusInfo] = {}
+        self._corpus_info_cache = CorpusInfoCache(
+            load_versions=self._backend.load_corpora_versions, shared_db=shared_db,
+            max_size=int(corpus_info_cache_size), check_interval=int(corpus_info_check_interval))
         self._keywords = None  # keyword (aka tags) database for corpora; None = not loaded yet
         self._colors = {}
         self._tt_desc_i18n = defaultdict(lambda: {})
-        self._tc_providers = {}
-        self._kc_providers = {}
-        self._qs_providers = {}
 
     @property
     def max_page_size(self):
@@ -231,43 +249,104 @@ class MySQLCorparch(AbstractSearchableCorporaArchive):
         lang_key = self._get_iso639lang(lang)
         return self._keywords[lang_key]
 
-    def _get_tckcqs_providers(self, corpus_id):
-        if corpus_id not in self._tc_providers and corpus_id not in self._kc_providers:
-            self._tc_providers[corpus_id] = TokenConnect()
-            self._kc_providers[corpus_id] = KwicConnect()
-            self._qs_providers[corpus_id] = QuerySuggest()
-            data = self._backend.load_tckc_providers(corpus_id)
-            for row in data:
-                if row['type'] == 'tc':
-                    self._tc_providers[corpus_id].providers.append(
-                        (row['provider'], row['is_kwic_view']))
-                elif row['type'] == 'kc':
-                    self._kc_providers[corpus_id].providers.append(row['provider'])
-                elif row['type'] == 'qs':
-                    self._qs_providers[corpus_id].providers.append(row['provider'])
-        return self._tc_providers[corpus_id], self._kc_providers[corpus_id], self._qs_providers[corpus_id]
+    @staticmethod
+    def _tckcqs_providers_from_rows(rows):
+        tc, kc, qs = TokenConnect(), KwicConnect(), QuerySuggest()
+        for row in rows:
+            if row['type'] == 'tc':
+                tc.providers.append((row['provider'], row['is_kwic_view']))
+            elif row['type'] == 'kc':
+                kc.providers.append(row['provider'])
+            elif row['type'] == 'qs':
+                qs.providers.append(row['provider'])
+        return tc, kc, qs
+
+    def _load_corpora_info_data(self, corpus_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Load all the information about multiple corpora from the database using
+        a constant number of queries and return it in a serializable form
+        (see _decode_corpus_info_data). Unavailable corpora are not present
+        in the result.
+        """
+        rows = self._backend.load_corpora(corpus_ids)
+        corpus_ids = [c for c in corpus_ids if c in rows]
+        tagsets = self._backend.load_corpora_tagsets(corpus_ids)
+        articles = self._backend.load_corpora_articles(corpus_ids)
+        ttdescs = self._backend.load_ttdescs(
+            list(set(r['ttdesc_id'] for r in rows.values() if r['ttdesc_id'] is not None)))
+        sq_attrs = self._backend.load_corpora_simple_query_default_attrs(corpus_ids)
+        providers = self._backend.load_corpora_tckc_providers(corpus_ids)
+        interval_attrs = self._backend.load_corpora_interval_attrs(corpus_ids)
+        ans = {}
+        for corpus_id in corpus_ids:
+            row = rows[corpus_id]
+            corp = self._corp_info_from_row(row, None)
+            if corp is None:
+                continue
+            corp.tagsets = [TagsetInfo().from_dict(row2) for row2 in tagsets.get(corpus_id, [])]
+            for art in articles.get(corpus_id, []):
+                if art['role'] == 'default':
+                    corp.citation_info.default_ref = markdown(art['entry'])
+                elif art['role'] == 'standard':
+                    corp.citation_info.article_ref.append(markdown(art['entry']))
+                elif art['role'] == 'other':
+                    corp.citation_info.other_bibliography = markdown(art['entry'])
+            ttdesc = {}
+            for drow in ttdescs.get(row['ttdesc_id'], []):
+                ttdesc['cs'] = drow['text_cs']
+                ttdesc['en'] = drow['text_en']
+            corp.simple_query_default_attrs = sq_attrs.get(corpus_id, [])
+            corp.token_connect, corp.kwic_connect, corp.query_suggest = self._tckcqs_providers_from_rows(
+                providers.get(corpus_id, []))
+            corp.metadata.interval_attrs = interval_attrs.get(corpus_id, [])
+            ans[corpus_id] = dict(info=_to_serializable(corp), ttdesc=ttdesc)
+        return ans
+
+    def _load_corpus_info_data(self, corpus_id: str) -> Dict[str, Any]:
+        return self._load_corpora_info_data([corpus_id]).get(corpus_id)
+
+    def _decode_corpus_info_data(self, data: Dict[str, Any]) -> CorpusInfo:
+        info = dict(data['info'])
+        corp = self.create_corpus_info()
+        for item in self.CORPUS_INFO_NESTED_ITEMS:
+            getattr(corp, item).from_dict(info.pop(item))
+        corp.tagsets = [TagsetInfo().from_dict(t) for t in info.pop('tagsets')]
+        corp.from_dict(info)
+        # JSON does not preserve tuples
+        corp.token_connect.providers = [tuple(p) for p in corp.token_connect.providers]
+        corp.metadata.interval_attrs = [tuple(a) for a in corp.metadata.interval_attrs]
+        for lang, text in data['ttdesc'].items():
+            self._tt_desc_i18n[lang][corp.metadata.desc] = text
+        return corp
 
     def _fetch_corpus_info(self, corpus_id: str, user_lang: str):
-        if corpus_id not in self._corpus_info_cache:
-            row = self._backend.load_corpus(corpus_id)
-            corp = self._corp_info_from_row(row, user_lang)
-            if corp:
-                corp.tagsets = [TagsetInfo().from_dict(row2)
-                                for row2 in self._backend.load_corpus_tagsets(corpus_id)]
-                self._corpus_info_cache[corpus_id] = corp
-                for art in self._backend.load_corpus_articles(corpus_id):
-                    if art['role'] == 'default':
-                        corp.citation_info.default_ref = markdown(art['entry'])
-                    elif art['role'] == 'standard':
-                        corp.citation_info.article_ref.append(markdown(art['entry']))
-                    elif art['role'] == 'other':
-                        corp.citation_info.other_bibliography = markdown(art['entry'])
-                if row['ttdesc_id'] not in self._tt_desc_i18n:
-                    for drow in self._backend.load_ttdesc(row['ttdesc_id']):
-                        self._tt_desc_i18n['cs'][row['ttdesc_id']] = drow['text_cs']
-                        self._tt_desc_i18n['en'][row['ttdesc_id']] = drow['text_en']
-                corp.simple_query_default_attrs = self._backend.load_simple_query_default_attrs(corpus_id)
-        return self._corpus_info_cache.get(corpus_id, None)
+        return self._corpus_info_cache.get(
+            corpus_id, lambda: self._load_corpus_info_data(corpus_id), self._decode_corpus_info_data)
+
+    def invalidate_corpus_info(self, corpus_id: str):
+        """
+        Remove cached information about a corpus from all the cache tiers
+        (other processes will reload the information once they test
+        corpus version stamps).
+        """
+        self._corpus_info_cache.invalidate(corpus_id)
+
+    def preload_corpus_info(self, corpus_ids: Optional[List[str]] = None, chunk_size: int = 100) -> int:
+        """
+        Load information about multiple corpora (by default all the active ones)
+        into the corpus info cache. The data are loaded in chunks, each of them
+        requiring a constant number of database queries.
+
+        returns:
+        number of loaded corpora
+        """
+        if corpus_ids is None:
+            corpus_ids = sorted(self._backend.load_corpora_versions().keys())
+        total = 0
+        for i in range(0, len(corpus_ids), chunk_size):
+            total += self._corpus_info_cache.preload(
+                corpus_ids[i:i + chunk_size], self._load_corpora_info_data, self._decode_corpus_info_data)
+        return total
 
     def get_corpus_info(self, plugin_ctx, corp_name):
         """
@@ -284,9 +363,6 @@ class MySQLCorparch(AbstractSearchableCorporaArchive):
                     else:
                         ans = corp_info
                     ans.manatee = plugin_ctx.corpus_manager.get_info(corp_name)
-                    ans.token_connect, ans.kwic_connect, ans.query_suggest = self._get_tckcqs_providers(corp_name)
-                    ans.metadata.interval_attrs = self._backend.load_interval_attrs(corp_name)
-
                     return ans
                 return BrokenCorpusInfo(name=corp_name)
             except TypeError as ex:
@@ -364,8 +440,8 @@ class MySQLCorparch(AbstractSearchableCorporaArchive):
         )
 
 
-@inject(plugins.runtime.USER_ITEMS, plugins.runtime.INTEGRATION_DB)
-def create_instance(conf, user_items, integ_db):
+@inject(plugins.runtime.USER_ITEMS, plugins.runtime.INTEGRATION_DB, plugins.runtime.DB)
+def create_instance(conf, user_items, integ_db, db):
     plugin_conf = conf.get('plugins', 'corparch')
     if integ_db.is_active and 'mysql_host' not in plugin_conf:
         logging.getLogger(__name__).info(f'mysql_corparch uses integration_db[{integ_db.info}]')
@@ -383,4 +459,7 @@ def create_instance(conf, user_items, integ_db):
         tag_prefix=plugin_conf['tag_prefix'],
         max_num_hints=plugin_conf['max_num_hints'],
         max_page_size=plugin_conf.get('default_page_list_size', None),
-        registry_lang=conf.get('corpora', 'manatee_registry_locale', 'en_US'))
+        registry_lang=conf.get('corpora', 'manatee_registry_locale', 'en_US'),
+        shared_db=db,
+        corpus_info_cache_size=plugin_conf.get('corpus_info_cache_size', DEFAULT_MAX_SIZE),
+        corpus_info_check_interval=plugin_conf.get('corpus_info_check_interval', DEFAULT_CHECK_INTERVAL))
@@ -21,6 +21,8 @@ A corparch database backend for MySQL/MariaDB.
 
 --------
 """
+from collections import defaultdict
+
 from plugins.abstract.corparch.backend import DatabaseBackend
 
 
@@ -37,6 +39,17 @@ DFLT_USER_ACC_TABLE = 'kontext_user_access'
 DFLT_USER_ACC_CORP_ATTR = 'corpus_name'
 
 
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def _group_by(rows, key):
+    ans = defaultdict(list)
+    for row in rows:
+        ans[row[key]].append(row)
+    return ans
+
+
 class Backend(DatabaseBackend):
 
     def __init__(self, db, user_table: str = DFLT_USER_TABLE, corp_table: str = DFLT_CORP_TABLE,
@@ -65,6 +78,16 @@ class Backend(DatabaseBackend):
                        'WHERE ca.corpus_name = %s', (corpus_id,))
         return cursor.fetchall()
 
+    def load_corpora_articles(self, corpus_ids):
+        if len(corpus_ids) == 0:
+            return {}
+        cursor = self._db.cursor()
+        cursor.execute('SELECT ca.corpus_name, ca.role, a.entry '
+                       'FROM kontext_article AS a '
+                       'JOIN kontext_corpus_article AS ca ON ca.article_id = a.id '
+                       f'WHERE ca.corpus_name IN ({_placeholders(corpus_ids)})', corpus_ids)
+        return _group_by(cursor.fetchall(), 'corpus_name')
+
     def load_all_keywords(self):
         cursor = self._db.cursor()
         cursor.execute(
@@ -76,6 +99,14 @@ class Backend(DatabaseBackend):
         cursor.execute('SELECT text_cs, text_en FROM kontext_ttdesc WHERE id = %s', (desc_id,))
         return cursor.fetchall()
 
+    def load_ttdescs(self, desc_ids):
+        if len(desc_ids) == 0:
+            return {}
+        cursor = self._db.cursor()
+        cursor.execute(f'SELECT id, text_cs, text_en FROM kontext_ttdesc WHERE id IN ({_placeholders(desc_ids)})',
+                       desc_ids)
+        return _group_by(cursor.fetchall(), 'id')
+
     def load_corpora_descriptions(self, corp_ids, user_lang):
         if len(corp_ids) == 0:
             return {}
@@ -87,9 +118,8 @@ class Backend(DatabaseBackend):
                        f'WHERE name IN ({placeholders})', corp_ids)
         return dict((r['corpname'], r['contents']) for r in cursor.fetchall())
 
-    def load_corpus(self, corp_id):
-        cursor = self._db.cursor()
-        cursor.execute(
+    def _corpus_query(self, where):
+        return (
             'SELECT c.name as id, c.web, cs.name AS sentence_struct, c.collator_locale, '
             'IF (c.speaker_id_struct IS NOT NULL, CONCAT(c.speaker_id_struct, \'.\', c.speaker_id_attr), NULL) '
             '  AS speaker_id_attr, '
@@ -114,10 +144,30 @@ class Backend(DatabaseBackend):
             'LEFT JOIN registry_conf AS rc ON rc.corpus_name = c.name '
             'LEFT JOIN corpus_structure AS cs ON cs.corpus_name = kc.corpus_name '
             '  AND c.sentence_struct = cs.name '
-            'WHERE c.active = 1 AND c.name = %s '
-            'GROUP BY c.name ', (corp_id,))
+            f'WHERE c.active = 1 AND {where} '
+            'GROUP BY c.name ')
+
+    def load_corpus(self, corp_id):
+        cursor = self._db.cursor()
+        cursor.execute(self._corpus_query('c.name = %s'), (corp_id,))
         return cursor.fetchone()
 
+    def load_corpora(self, corp_ids):
+        if len(corp_ids) == 0:
+            return {}
+        cursor = self._db.cursor()
+        cursor.execute(self._corpus_query(f'c.name IN ({_placeholders(corp_ids)})'), corp_ids)
+        return dict((row['id'], row) for row in cursor.fetchall())
+
+    def load_corpora_versions(self):
+        """
+        Returns version stamps (= the 'info_version' column) of all the active corpora.
+        The column is incremented by triggers on any change of corpus information
+        (see scripts/schema.sql).
+        """
+        rows = self._db.execute_prepared(f'SELECT name, info_version FROM {self._corp_table} WHERE active = 1')
+        return dict((row['name'], str(row['info_version'])) for row in rows)
+
     def load_all_corpora(self, user_id, substrs=None, keywords=None, min_size=0, max_size=None, requestable=False,
                          offset=0, limit=10000000000, favourites=()):
         where_cond1 = ['c.active = %s', 'c.requestable = %s']
@@ -278,6 +328,21 @@ class Backend(DatabaseBackend):
         ans = cursor.fetchone()
         return (ans['n1'], ans['n2']) if ans is not None else (None, None)
 
+    def load_corpora_posattrs(self, corpus_ids):
+        if len(corpus_ids) == 0:
+            return {}
+        sql = ('SELECT {0}, r2.name AS fromattr, r3.name AS mapto '
+               'FROM corpus_posattr AS r1 '
+               'LEFT JOIN corpus_posattr AS r2 ON r2.corpus_name = r1.corpus_name AND r2.name = r1.fromattr '
+               'LEFT JOIN corpus_posattr AS r3 ON r3.corpus_name = r1.corpus_name AND r3.name = r1.mapto '
+               'WHERE r1.corpus_name IN ({1}) ORDER BY r1.corpus_name, r1.position').format(
+            ', '.join(['r1.corpus_name', 'r1.name', 'r1.position'] +
+                      ['r1.`{0}` AS `{1}`'.format(v, k) for k, v in list(self.POS_COLS_MAP.items())]),
+            _placeholders(corpus_ids))
+        cursor = self._db.cursor()
+        cursor.execute(sql, corpus_ids)
+        return _group_by(cursor.fetchall(), 'corpus_name')
+
     def load_corpus_alignments(self, corpus_id):
         cursor = self._db.cursor()
         cursor.execute('SELECT ca.corpus_name_2 AS id '
@@ -285,6 +350,18 @@ class Backend(DatabaseBackend):
                        'WHERE ca.corpus_name_1 = %s', (corpus_id,))
         return [row['id'] for row in cursor.fetchall()]
 
+    def load_corpora_alignments(self, corpus_ids):
+        if len(corpus_ids) == 0:
+            return {}
+        cursor = self._db.cursor()
+        cursor.execute('SELECT ca.corpus_name_1 AS corpus_name, ca.corpus_name_2 AS id '
+                       'FROM corpus_alignment AS ca '
+                       f'WHERE ca.corpus_name_1 IN ({_placeholders(corpus_ids)})', corpus_ids)
+        ans = defaultdict(list)
+        for row in cursor.fetchall():
+            ans[row['corpus_name']].append(row['id'])
+        return ans
+
     def load_corpus_structures(self, corpus_id):
         cols = ['name'] + ['`{0}` AS `{1}`'.format(v, k)
                            for k, v in list(self.STRUCT_COLS_MAP.items())]
@@ -293,6 +370,17 @@ class Backend(DatabaseBackend):
         cursor.execute(sql, (corpus_id,))
         return cursor.fetchall()
 
+    def load_corpora_structures(self, corpus_ids):
+        if len(corpus_ids) == 0:
+            return {}
+        cols = ['corpus_name', 'name'] + ['`{0}` AS `{1}`'.format(v, k)
+                                          for k, v in list(self.STRUCT_COLS_MAP.items())]
+        sql = 'SELECT {0} FROM corpus_structure WHERE corpus_name IN ({1})'.format(
+            ', '.join(cols), _placeholders(corpus_ids))
+        cursor = self._db.cursor()
+        cursor.execute(sql, corpus_ids)
+        return _group_by(cursor.fetchall(), 'corpus_name')
+
     def load_corpus_structattrs(self, corpus_id, structure_id):
         cursor = self._db.cursor()
         sql = 'SELECT {0} FROM corpus_structattr WHERE corpus_name = %s AND structure_name = %s'.format(
@@ -300,6 +388,20 @@ class Backend(DatabaseBackend):
         cursor.execute(sql, (corpus_id, structure_id))
         return cursor.fetchall()
 
+    def load_corpora_structattrs(self, corpus_ids):
+        if len(corpus_ids) == 0:
+            return {}
+        cursor = self._db.cursor()
+        sql = 'SELECT {0} FROM corpus_structattr WHERE corpus_name IN ({1})'.format(
+            ', '.join(['corpus_name', 'structure_name', 'name'] +
+                      ['`{0}` AS `{1}`'.format(v, k) for k, v in list(self.SATTR_COLS_MAP.items())]),
+            _placeholders(corpus_ids))
+        cursor.execute(sql, corpus_ids)
+        ans = defaultdict(lambda: defaultdict(list))
+        for row in cursor.fetchall():
+            ans[row['corpus_name']][row['structure_name']].append(row)
+        return ans
+
     def load_subcorpattrs(self, corpus_id):
         cursor = self._db.cursor()
         cursor.execute('SELECT cs.structure_name AS struct, cs.name AS structattr '
@@ -323,46 +425,56 @@ class Backend(DatabaseBackend):
             (corpus_id,))
         return cursor.fetchall()
 
-    def corpus_access(self, user_id, corpus_id):
+    def load_corpora_tckc_providers(self, corpus_ids):
+        if len(corpus_ids) == 0:
+            return {}
         cursor = self._db.cursor()
-        cursor.execute('SELECT %s AS user_id, c.name AS corpus_id, IF (ucp.limited = 1, \'omezeni\', NULL) AS variant '
-                       'FROM ( '
-                       f'  SELECT {self._user_acc_table}.{self._user_acc_corp_attr} AS corpus_id, '
-                       f'    {self._user_acc_table}.limited AS limited '
-                       f'  FROM {self._user_acc_table} WHERE ({self._user_acc_table}.user_id = %s) '
-                       '  UNION '
-                       f'  SELECT {self._group_acc_table}.{self._group_acc_corp_attr} AS corpus_id, '
-                       f'    {self._group_acc_table}.limited AS limited '
-                       f'  FROM {self._group_acc_table} '
-                       f'  WHERE ({self._group_acc_table}.{self._group_acc_group_attr} = '
-                       f'      (SELECT {self._user_table}.{self._group_acc_group_attr} '
-                       f'           FROM {self._user_table} WHERE ({self._user_table}.id = %s))) '
-                       ') as ucp '
-                       f'JOIN {self._corp_table} AS c ON ucp.corpus_id = c.id AND c.name = %s '
-                       'ORDER BY ucp.limited LIMIT 1',
-                       (user_id, user_id, user_id, corpus_id))
-        row = cursor.fetchone()
-        if not row:
+        cursor.execute(
+            'SELECT corpus_name, provider, type, is_kwic_view FROM kontext_tckc_corpus '
+            f'WHERE corpus_name IN ({_placeholders(corpus_ids)}) ORDER BY corpus_name, display_order', corpus_ids)
+        return _group_by(cursor.fetchall(), 'corpus_name')
+
+    def corpus_access(self, user_id, corpus_id):
+        rows = self._db.execute_prepared(
+            'SELECT %s AS user_id, c.name AS corpus_id, IF (ucp.limited = 1, \'omezeni\', NULL) AS variant '
+            'FROM ( '
+            f'  SELECT {self._user_acc_table}.{self._user_acc_corp_attr} AS corpus_id, '
+            f'    {self._user_acc_table}.limited AS limited '
+            f'  FROM {self._user_acc_table} WHERE ({self._user_acc_table}.user_id = %s) '
+            '  UNION '
+            f'  SELECT {self._group_acc_table}.{self._group_acc_corp_attr} AS corpus_id, '
+            f'    {self._group_acc_table}.limited AS limited '
+            f'  FROM {self._group_acc_table} '
+            f'  WHERE ({self._group_acc_table}.{self._group_acc_group_attr} = '
+            f'      (SELECT {self._user_table}.{self._group_acc_group_attr} '
+            f'           FROM {self._user_table} WHERE ({self._user_table}.id = %s))) '
+            ') as ucp '
+            f'JOIN {self._corp_table} AS c ON ucp.corpus_id = c.id AND c.name = %s '
+            'ORDER BY ucp.limited LIMIT 1',
+            (user_id, user_id, user_id, corpus_id))
+        if len(rows) == 0:
             return False, False, ''
+        row = rows[0]
         return False, True, row['variant'] if row['variant'] else ''
 
     def get_permitted_corpora(self, user_id):
-        cursor = self._db.cursor()
-        cursor.execute('SELECT %s AS user_id, c.name AS corpus_id, IF (ucp.limited = 1, \'omezeni\', NULL) AS variant '
-                       'FROM ( '
-                       f'  SELECT {self._user_acc_table}.{self._user_acc_corp_attr} AS corpus_id, '
-                       f'    {self._user_acc_table}.limited AS limited '
-                       f'  FROM {self._user_acc_table} WHERE ({self._user_acc_table}.user_id = %s) '
-                       '  UNION '
-                       f'  SELECT {self._group_acc_table}.{self._group_acc_corp_attr} AS corpus_id, '
-                       f'     {self._group_acc_table}.limited AS limited '
-                       f'  FROM {self._group_acc_table} '
-                       f'  WHERE ({self._group_acc_table}.{self._group_acc_group_attr} = '
-                       f'      (SELECT {self._user_table}.{self._group_acc_group_attr} '
-                       f'           FROM {self._user_table} WHERE ({self._user_table}.id = %s))) '
-                       ') as ucp '
-                       f'JOIN {self._corp_table} AS c ON ucp.corpus_id = c.id', (user_id, user_id, user_id))
-        return [r['corpus_id'] for r in cursor.fetchall()]
+        rows = self._db.execute_prepared(
+            'SELECT %s AS user_id, c.name AS corpus_id, IF (ucp.limited = 1, \'omezeni\', NULL) AS variant '
+            'FROM ( '
+            f'  SELECT {self._user_acc_table}.{self._user_acc_corp_attr} AS corpus_id, '
+            f'    {self._user_acc_table}.limited AS limited '
+            f'  FROM {self._user_acc_table} WHERE ({self._user_acc_table}.user_id = %s) '
+            '  UNION '
+            f'  SELECT {self._group_acc_table}.{self._group_acc_corp_attr} AS corpus_id, '
+            f'     {self._group_acc_table}.limited AS limited '
+            f'  FROM {self._group_acc_table} '
+            f'  WHERE ({self._group_acc_table}.{self._group_acc_group_attr} = '
+            f'      (SELECT {self._user_table}.{self._group_acc_group_attr} '
+            f'           FROM {self._user_table} WHERE ({self._user_table}.id = %s))) '
+            ') as ucp '
+            f'JOIN {self._corp_table} AS c ON ucp.corpus_id = c.id',
+            (user_id, user_id, user_id))
+        return [r['corpus_id'] for r in rows]
 
     def load_corpus_tagsets(self, corpus_id):
         cursor = self._db.cursor()
@@ -372,6 +484,16 @@ class Backend(DatabaseBackend):
                        'WHERE ct.corpus_name = %s', (corpus_id, ))
         return cursor.fetchall()
 
+    def load_corpora_tagsets(self, corpus_ids):
+        if len(corpus_ids) == 0:
+            return {}
+        cursor = self._db.cursor()
+        cursor.execute('SELECT ct.corpus_name, ct.pos_attr, ct.feat_attr, t.tagset_type, t.name AS tagset_name, '
+                       'ct.kontext_widget_enabled AS widget_enabled, t.doc_url_local, t.doc_url_en '
+                       'FROM tagset AS t JOIN corpus_tagset AS ct ON ct.tagset_name = t.name '
+                       f'WHERE ct.corpus_name IN ({_placeholders(corpus_ids)})', corpus_ids)
+        return _group_by(cursor.fetchall(), 'corpus_name')
+
     def load_interval_attrs(self, corpus_id):
         cursor = self._db.cursor()
         cursor.execute('SELECT interval_struct, interval_attr, widget '
@@ -379,8 +501,31 @@ class Backend(DatabaseBackend):
                        'WHERE corpus_name = %s', (corpus_id,))
         return [('{0}.{1}'.format(r['interval_struct'], r['interval_attr']), r['widget']) for r in cursor.fetchall()]
 
+    def load_corpora_interval_attrs(self, corpus_ids):
+        if len(corpus_ids) == 0:
+            return {}
+        cursor = self._db.cursor()
+        cursor.execute('SELECT corpus_name, interval_struct, interval_attr, widget '
+                       'FROM kontext_interval_attr '
+                       f'WHERE corpus_name IN ({_placeholders(corpus_ids)})', corpus_ids)
+        ans = defaultdict(list)
+        for r in cursor.fetchall():
+            ans[r['corpus_name']].append(('{0}.{1}'.format(r['interval_struct'], r['interval_attr']), r['widget']))
+        return ans
+
     def load_simple_query_default_attrs(self, corpus_id):
         cursor = self._db.cursor()
         cursor.execute('SELECT pos_attr FROM kontext_simple_query_default_attrs WHERE corpus_name = %s',
                        (corpus_id,))
         return [r['pos_attr'] for r in cursor.fetchall()]
+
+    def load_corpora_simple_query_default_attrs(self, corpus_ids):
+        if len(corpus_ids) == 0:
+            return {}
+        cursor = self._db.cursor()
+        cursor.execute('SELECT corpus_name, pos_attr FROM kontext_simple_query_default_attrs '
+                       f'WHERE corpus_name IN ({_placeholders(corpus_ids)})', corpus_ids)
+        ans = defaultdict(list)
+        for r in cursor.fetchall():
+            ans[r['corpus_name']].append(r['pos_attr'])
+        return ans
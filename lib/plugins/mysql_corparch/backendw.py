@@ -39,6 +39,10 @@ class WritableBackend(Backend):
         super().__init__(db, corp_table, group_acc_table, user_acc_table, user_acc_corp_attr, group_acc_corp_attr,
                          group_acc_group_attr)
         self.autocommit = False
+        self._modified_corpora = set()
+
+    def _mark_modified(self, corpus_id):
+        self._modified_corpora.add(corpus_id)
 
     def commit(self):
         """
@@ -47,8 +51,19 @@ class WritableBackend(Backend):
         has autocommit disabled so you have to
         use this method to make database changes
         permanent.
+
+        Corpora modified within the transaction get
+        their 'info_version' incremented so cached
+        corpus information becomes outdated.
         """
+        if len(self._modified_corpora) > 0:
+            t1 = datetime.datetime.now(tz=pytz.timezone('Europe/Prague')).strftime("%Y-%m-%dT%H:%M:%S%z")
+            cursor = self._db.cursor()
+            for corpus_id in sorted(self._modified_corpora):
+                cursor.execute(f'UPDATE {self._corp_table} SET info_version = info_version + 1, updated = %s '
+                               'WHERE name = %s', (t1, corpus_id))
         self._db.commit()
+        self._modified_corpora = set()
 
     def remove_corpus(self, corpus_id):
         cursor = self._db.cursor()
@@ -139,6 +154,7 @@ class WritableBackend(Backend):
                                (corpus_id, name))
 
     def save_corpus_config(self, install_json, registry_dir, corp_size):
+        self._mark_modified(install_json.ident)
         t1 = datetime.datetime.now(tz=pytz.timezone('Europe/Prague')
                                    ).strftime("%Y-%m-%dT%H:%M:%S%z")
         cursor = self._db.cursor()
@@ -226,7 +242,7 @@ class WritableBackend(Backend):
                        'speech_overlap_struct = %s, speech_overlap_attr = %s, '
                        'bib_label_struct = %s, bib_label_attr = %s, '
                        'bib_id_struct = %s, bib_id_attr = %s, '
-                       'text_types_db = %s, featured = %s, '
+                       'text_types_db = %s, featured = %s '
                        'WHERE name = %s',
                        (install_json.sentence_struct, sseg_struct, sseg_attr, spk_struct, spk_attr, spe_struct,
                         spe_attr, bla_struct, bla_attr, bli_struct, bli_attr, install_json.metadata.database,
@@ -239,6 +255,7 @@ class WritableBackend(Backend):
         return cursor.fetchone()['last_id']
 
     def attach_corpus_article(self, corpus_id, article_id, role):
+        self._mark_modified(corpus_id)
         cursor = self._db.cursor()
         cursor.execute('INSERT INTO kontext_corpus_article (corpus_name, article_id, role) '
                        'VALUES (%s, %s, %s)', (corpus_id, article_id, role))
@@ -262,6 +279,7 @@ class WritableBackend(Backend):
         return row['cnt'] == 1 if row else False
 
     def save_registry_table(self, corpus_id, variant, values):
+        self._mark_modified(corpus_id)
         values = dict(values)
         self._create_struct_if_none(corpus_id, values.get('DOCSTRUCTURE', None))
         cursor = self._db.cursor()
@@ -299,6 +317,7 @@ class WritableBackend(Backend):
     def save_corpus_posattr(self, corpus_id, name, position, values):
         """
         """
+        self._mark_modified(corpus_id)
         cols = ['corpus_name', 'name', 'position'] + [self.POS_COLS_MAP[k]
                                                       for k, v in values if k in self.POS_COLS_MAP]
         vals = [corpus_id, name, position] + [v for k, v in values if k in self.POS_COLS_MAP]
@@ -318,12 +337,14 @@ class WritableBackend(Backend):
         """
         both fromattr_id and mapto_id can be None
         """
+        self._mark_modified(corpus_id)
         cursor = self._db.cursor()
         cursor.execute('UPDATE corpus_posattr SET fromattr = %s, mapto = %s '
                        'WHERE corpus_name = %s AND name = %s',
                        (fromattr_id, mapto_id, corpus_id, posattr_id))
 
     def save_corpus_alignments(self, corpus_id, aligned_ids):
+        self._mark_modified(corpus_id)
         cursor = self._db.cursor()
         for aid in aligned_ids:
             try:
@@ -336,6 +357,7 @@ class WritableBackend(Backend):
                 raise ex
 
     def save_corpus_structure(self, corpus_id, name, values):
+        self._mark_modified(corpus_id)
         base_cols = [self.STRUCT_COLS_MAP[k] for k, v in values if k in self.STRUCT_COLS_MAP]
         base_vals = [v for k, v in values if k in self.STRUCT_COLS_MAP]
         cursor = self._db.cursor()
@@ -368,6 +390,7 @@ class WritableBackend(Backend):
     def save_corpus_structattr(self, corpus_id, struct_id, name, values):
         """
         """
+        self._mark_modified(corpus_id)
         if self._structattr_exists(corpus_id, struct_id, name):
             cols = [self.SATTR_COLS_MAP[k] for k, v in values if k in self.SATTR_COLS_MAP]
             if len(cols) > 0:
@@ -395,12 +418,14 @@ class WritableBackend(Backend):
             raise ex
 
     def save_subcorpattr(self, corpus_id, struct_name, attr_name, idx):
+        self._mark_modified(corpus_id)
         cursor = self._db.cursor()
         cursor.execute(
             'UPDATE corpus_structattr SET subcorpattrs_idx = %s '
             'WHERE corpus_name = %s AND structure_name = %s AND name = %s', (idx, corpus_id, struct_name, attr_name))
 
     def save_freqttattr(self, corpus_id, struct_name, attr_name, idx):
+        self._mark_modified(corpus_id)
         cursor = self._db.cursor()
         cursor.execute(
             'UPDATE corpus_structattr SET freqttattrs_idx = %s '
@@ -0,0 +1,189 @@
+# Copyright (c) 2021 Charles University, Faculty of Arts,
+#                    Institute of the Czech National Corpus
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 2
+# dated June, 1991.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+"""
+A two-tier cache of corpus information. The first tier is an in-process LRU
+of decoded objects, the second one is a serialized copy of the data stored
+in the 'db' plug-in (i.e. shared by all the web and worker processes).
+
+Each item is stamped with a version provided by the corpus database (see
+Backend.load_corpora_versions) combined with a shared cache generation. The versions
+are re-read (in bulk) at most once per 'check_interval' seconds and any item with
+a different stamp is considered outdated in both tiers. Changing the generation
+(see clear(shared=True)) makes all the items outdated in all the processes.
+"""
+
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from plugins.abstract.general_storage import KeyValueStorage
+
+DEFAULT_MAX_SIZE = 500
+
+DEFAULT_CHECK_INTERVAL = 30
+
+DEFAULT_SHARED_TTL = 3600 * 24
+
+SHARED_KEY_PREFIX = 'mysql_corparch:corpus_info:'
+
+SHARED_GENERATION_KEY = 'mysql_corparch:corpus_info_generation'
+
+
+class CorpusInfoCache(object):
+
+    def __init__(self, load_versions: Callable[[], Dict[str, str]], shared_db: Optional[KeyValueStorage] = None,
+                 max_size: int = DEFAULT_MAX_SIZE, check_interval: int = DEFAULT_CHECK_INTERVAL,
+                 shared_ttl: int = DEFAULT_SHARED_TTL):
+        """
+        arguments:
+        load_versions -- a function returning a dict corpus_id => version stamp
+                         (corpora missing in the dict are considered unavailable)
+        shared_db -- a KeyValueStorage instance for the shared tier (None disables the tier)
+        max_size -- max. number of items in the in-process tier
+        check_interval -- how often (in seconds) the version stamps are re-read
+        shared_ttl -- TTL of items stored in the shared tier
+        """
+        self._load_versions = load_versions
+        self._shared_db = shared_db
+        self._max_size = max_size
+        self._check_interval = check_interval
+        self._shared_ttl = shared_ttl
+        self._items: Dict[str, Any] = OrderedDict()  # corpus_id => (version, decoded value)
+        self._versions: Dict[str, str] = {}
+        self._versions_time = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    @staticmethod
+    def _mk_key(corpus_id: str) -> str:
+        return SHARED_KEY_PREFIX + corpus_id
+
+    def _current_versions(self) -> Dict[str, str]:
+        now = time.time()
+        if now - self._versions_time >= self._check_interval:
+            versions = self._load_versions()
+            if self._shared_db is not None:
+                generation = self._shared_db.get(SHARED_GENERATION_KEY)
+                if generation:
+                    versions = dict((k, f'{generation}:{v}') for k, v in versions.items())
+            with self._lock:
+                self._versions = versions
+                self._versions_time = now
+                for corpus_id in [k for k, (v, _) in self._items.items() if versions.get(k) != v]:
+                    del self._items[corpus_id]
+        return self._versions
+
+    def get(self, corpus_id: str, load: Callable[[], Optional[Dict[str, Any]]],
+            decode: Callable[[Dict[str, Any]], Any]) -> Any:
+        """
+        Return a cached value for a corpus. In case neither of the tiers contains
+        a valid item, the 'load' function is used to obtain serializable data which are
+        stored in the shared tier. The data are then transformed by the 'decode' function
+        to an actual value stored in the in-process tier.
+
+        returns:
+        a decoded value or None if the corpus is not available
+        """
+        version = self._current_versions().get(corpus_id)
+        if version is None:
+            return None
+        with self._lock:
+            item = self._items.get(corpus_id)
+            if item is not None and item[0] == version:
+                self._items.move_to_end(corpus_id)
+                return item[1]
+        data = None
+        if self._shared_db is not None:
+            shared = self._shared_db.get(self._mk_key(corpus_id))
+            if shared and shared.get('version') == version:
+                data = shared['data']
+        if data is None:
+            data = load()
+            if data is None:
+                return None
+            if self._shared_db is not None:
+                with self._shared_db.pipeline() as pipe:
+                    pipe.set(self._mk_key(corpus_id), dict(version=version, data=data))
+                    pipe.set_ttl(self._mk_key(corpus_id), self._shared_ttl)
+        value = decode(data)
+        self._put(corpus_id, version, value)
+        return value
+
+    def _put(self, corpus_id: str, version: str, value: Any):
+        with self._lock:
+            self._items[corpus_id] = (version, value)
+            self._items.move_to_end(corpus_id)
+            while len(self._items) > self._max_size:
+                self._items.popitem(last=False)
+
+    def preload(self, corpus_ids: List[str], load_many: Callable[[List[str]], Dict[str, Dict[str, Any]]],
+                decode: Callable[[Dict[str, Any]], Any]) -> int:
+        """
+        Make sure multiple corpora are present in both tiers. Items missing
+        in the shared tier are loaded at once via the 'load_many' function
+        (returning a dict corpus_id => serializable data).
+
+        returns:
+        number of available corpora
+        """
+        versions = self._current_versions()
+        corpus_ids = [c for c in corpus_ids if c in versions]
+        with self._lock:
+            missing = [c for c in corpus_ids if self._items.get(c, (None,))[0] != versions[c]]
+        found = {}
+        if self._shared_db is not None and len(missing) > 0:
+            for corpus_id, shared in zip(missing, self._shared_db.mget([self._mk_key(c) for c in missing])):
+                if shared and shared.get('version') == versions[corpus_id]:
+                    found[corpus_id] = shared['data']
+        to_load = [c for c in missing if c not in found]
+        if len(to_load) > 0:
+            loaded = load_many(to_load)
+            if self._shared_db is not None:
+                with self._shared_db.pipeline() as pipe:
+                    for corpus_id, data in loaded.items():
+                        pipe.set(self._mk_key(corpus_id), dict(version=versions[corpus_id], data=data))
+                        pipe.set_ttl(self._mk_key(corpus_id), self._shared_ttl)
+            found.update(loaded)
+        for corpus_id, data in found.items():
+            self._put(corpus_id, versions[corpus_id], decode(data))
+        return len(corpus_ids) - len(missing) + len(found)
+
+    def invalidate(self, corpus_id: str):
+        """
+        Remove a corpus from both tiers and force re-reading of version stamps
+        """
+        with self._lock:
+            self._items.pop(corpus_id, None)
+            self._versions_time = 0
+        if self._shared_db is not None:
+            self._shared_db.remove(self._mk_key(corpus_id))
+
+    def clear(self, shared: bool = False):
+        """
+        Clear the in-process tier
+
+        arguments:
+        shared -- if True then all the items of the shared tier are made outdated too
+                  (by changing the shared cache generation) so other processes drop
+                  their in-process items as well (within check_interval)
+        """
+        if shared and self._shared_db is not None:
+            self._shared_db.set(SHARED_GENERATION_KEY, uuid.uuid4().hex)
+        with self._lock:
+            self._items = OrderedDict()
+            self._versions_time = 0
@@ -31,6 +31,7 @@ CREATE TABLE kontext_corpus (
   version int(11) NOT NULL DEFAULT '1',
   created varchar(25),
   updated varchar(25),
+  info_version int(11) NOT NULL DEFAULT '1',
   active int(11) NOT NULL,
   web varchar(255),
   sentence_struct varchar(63),
@@ -280,6 +281,150 @@ CREATE TABLE registry_conf (
   CONSTRAINT registry_conf_wsattr_id_fkey FOREIGN KEY (corpus_name, wsattr) REFERENCES corpus_posattr (corpus_name, name)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8;
 
+-- ------------------- corpus info version (see kontext_corpus.info_version) --------------
+-- Any change of a corpus row or of a row the corpus information is loaded from
+-- increments the version so cached corpus information becomes outdated.
+
+DROP TRIGGER IF EXISTS kontext_corpus_info_version_upd;
+CREATE TRIGGER kontext_corpus_info_version_upd BEFORE UPDATE ON kontext_corpus
+FOR EACH ROW SET NEW.info_version = OLD.info_version + 1;
+
+DROP TRIGGER IF EXISTS kontext_corpus_article_info_version_ins;
+CREATE TRIGGER kontext_corpus_article_info_version_ins AFTER INSERT ON kontext_corpus_article
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = NEW.corpus_name;
+
+DROP TRIGGER IF EXISTS kontext_corpus_article_info_version_upd;
+CREATE TRIGGER kontext_corpus_article_info_version_upd AFTER UPDATE ON kontext_corpus_article
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = NEW.corpus_name;
+
+DROP TRIGGER IF EXISTS kontext_corpus_article_info_version_del;
+CREATE TRIGGER kontext_corpus_article_info_version_del AFTER DELETE ON kontext_corpus_article
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = OLD.corpus_name;
+
+DROP TRIGGER IF EXISTS kontext_keyword_corpus_info_version_ins;
+CREATE TRIGGER kontext_keyword_corpus_info_version_ins AFTER INSERT ON kontext_keyword_corpus
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = NEW.corpus_name;
+
+DROP TRIGGER IF EXISTS kontext_keyword_corpus_info_version_upd;
+CREATE TRIGGER kontext_keyword_corpus_info_version_upd AFTER UPDATE ON kontext_keyword_corpus
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = NEW.corpus_name;
+
+DROP TRIGGER IF EXISTS kontext_keyword_corpus_info_version_del;
+CREATE TRIGGER kontext_keyword_corpus_info_version_del AFTER DELETE ON kontext_keyword_corpus
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = OLD.corpus_name;
+
+DROP TRIGGER IF EXISTS kontext_tckc_corpus_info_version_ins;
+CREATE TRIGGER kontext_tckc_corpus_info_version_ins AFTER INSERT ON kontext_tckc_corpus
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = NEW.corpus_name;
+
+DROP TRIGGER IF EXISTS kontext_tckc_corpus_info_version_upd;
+CREATE TRIGGER kontext_tckc_corpus_info_version_upd AFTER UPDATE ON kontext_tckc_corpus
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = NEW.corpus_name;
+
+DROP TRIGGER IF EXISTS kontext_tckc_corpus_info_version_del;
+CREATE TRIGGER kontext_tckc_corpus_info_version_del AFTER DELETE ON kontext_tckc_corpus
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = OLD.corpus_name;
+
+DROP TRIGGER IF EXISTS kontext_simple_query_default_attrs_info_version_ins;
+CREATE TRIGGER kontext_simple_query_default_attrs_info_version_ins AFTER INSERT ON kontext_simple_query_default_attrs
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = NEW.corpus_name;
+
+DROP TRIGGER IF EXISTS kontext_simple_query_default_attrs_info_version_upd;
+CREATE TRIGGER kontext_simple_query_default_attrs_info_version_upd AFTER UPDATE ON kontext_simple_query_default_attrs
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = NEW.corpus_name;
+
+DROP TRIGGER IF EXISTS kontext_simple_query_default_attrs_info_version_del;
+CREATE TRIGGER kontext_simple_query_default_attrs_info_version_del AFTER DELETE ON kontext_simple_query_default_attrs
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = OLD.corpus_name;
+
+DROP TRIGGER IF EXISTS corpus_tagset_info_version_ins;
+CREATE TRIGGER corpus_tagset_info_version_ins AFTER INSERT ON corpus_tagset
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = NEW.corpus_name;
+
+DROP TRIGGER IF EXISTS corpus_tagset_info_version_upd;
+CREATE TRIGGER corpus_tagset_info_version_upd AFTER UPDATE ON corpus_tagset
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = NEW.corpus_name;
+
+DROP TRIGGER IF EXISTS corpus_tagset_info_version_del;
+CREATE TRIGGER corpus_tagset_info_version_del AFTER DELETE ON corpus_tagset
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = OLD.corpus_name;
+
+DROP TRIGGER IF EXISTS kontext_interval_attr_info_version_ins;
+CREATE TRIGGER kontext_interval_attr_info_version_ins AFTER INSERT ON kontext_interval_attr
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = NEW.corpus_name;
+
+DROP TRIGGER IF EXISTS kontext_interval_attr_info_version_upd;
+CREATE TRIGGER kontext_interval_attr_info_version_upd AFTER UPDATE ON kontext_interval_attr
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = NEW.corpus_name;
+
+DROP TRIGGER IF EXISTS kontext_interval_attr_info_version_del;
+CREATE TRIGGER kontext_interval_attr_info_version_del AFTER DELETE ON kontext_interval_attr
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = OLD.corpus_name;
+
+DROP TRIGGER IF EXISTS corpus_posattr_info_version_ins;
+CREATE TRIGGER corpus_posattr_info_version_ins AFTER INSERT ON corpus_posattr
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = NEW.corpus_name;
+
+DROP TRIGGER IF EXISTS corpus_posattr_info_version_upd;
+CREATE TRIGGER corpus_posattr_info_version_upd AFTER UPDATE ON corpus_posattr
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = NEW.corpus_name;
+
+DROP TRIGGER IF EXISTS corpus_posattr_info_version_del;
+CREATE TRIGGER corpus_posattr_info_version_del AFTER DELETE ON corpus_posattr
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = OLD.corpus_name;
+
+DROP TRIGGER IF EXISTS corpus_structure_info_version_ins;
+CREATE TRIGGER corpus_structure_info_version_ins AFTER INSERT ON corpus_structure
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = NEW.corpus_name;
+
+DROP TRIGGER IF EXISTS corpus_structure_info_version_upd;
+CREATE TRIGGER corpus_structure_info_version_upd AFTER UPDATE ON corpus_structure
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = NEW.corpus_name;
+
+DROP TRIGGER IF EXISTS corpus_structure_info_version_del;
+CREATE TRIGGER corpus_structure_info_version_del AFTER DELETE ON corpus_structure
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = OLD.corpus_name;
+
+DROP TRIGGER IF EXISTS corpus_structattr_info_version_ins;
+CREATE TRIGGER corpus_structattr_info_version_ins AFTER INSERT ON corpus_structattr
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = NEW.corpus_name;
+
+DROP TRIGGER IF EXISTS corpus_structattr_info_version_upd;
+CREATE TRIGGER corpus_structattr_info_version_upd AFTER UPDATE ON corpus_structattr
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = NEW.corpus_name;
+
+DROP TRIGGER IF EXISTS corpus_structattr_info_version_del;
+CREATE TRIGGER corpus_structattr_info_version_del AFTER DELETE ON corpus_structattr
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = OLD.corpus_name;
+
+DROP TRIGGER IF EXISTS kontext_article_info_version_upd;
+CREATE TRIGGER kontext_article_info_version_upd AFTER UPDATE ON kontext_article
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name IN (SELECT corpus_name FROM kontext_corpus_article WHERE article_id = NEW.id);
+
+DROP TRIGGER IF EXISTS kontext_ttdesc_info_version_upd;
+CREATE TRIGGER kontext_ttdesc_info_version_upd AFTER UPDATE ON kontext_ttdesc
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE ttdesc_id = NEW.id;
+
+DROP TRIGGER IF EXISTS kontext_keyword_info_version_upd;
+CREATE TRIGGER kontext_keyword_info_version_upd AFTER UPDATE ON kontext_keyword
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name IN (SELECT corpus_name FROM kontext_keyword_corpus WHERE keyword_id = NEW.id);
+
+DROP TRIGGER IF EXISTS tagset_info_version_upd;
+CREATE TRIGGER tagset_info_version_upd AFTER UPDATE ON tagset
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name IN (SELECT corpus_name FROM corpus_tagset WHERE tagset_name = NEW.name);
+
+DROP TRIGGER IF EXISTS registry_conf_info_version_ins;
+CREATE TRIGGER registry_conf_info_version_ins AFTER INSERT ON registry_conf
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = NEW.corpus_name;
+
+DROP TRIGGER IF EXISTS registry_conf_info_version_upd;
+CREATE TRIGGER registry_conf_info_version_upd AFTER UPDATE ON registry_conf
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = NEW.corpus_name;
+
+DROP TRIGGER IF EXISTS registry_conf_info_version_del;
+CREATE TRIGGER registry_conf_info_version_del AFTER DELETE ON registry_conf
+FOR EACH ROW UPDATE kontext_corpus SET info_version = info_version + 1 WHERE name = OLD.corpus_name;
+
 -- -------------------- susanne corpus
 
 INSERT INTO kontext_corpus (id, name, size, group_name, version, created, active, collator_locale)
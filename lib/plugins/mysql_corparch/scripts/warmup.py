@@ -0,0 +1,60 @@
+# Copyright (c) 2021 Charles University, Faculty of Arts,
+#                    Institute of the Czech National Corpus
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 2
+# dated June, 1991.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+"""
+This script preloads information about all the active corpora (or the ones
+specified via command line) into the shared corpus info cache of mysql_corparch
+(i.e. the 'db' plug-in) so web and worker processes do not have to query the
+corpus database after they (re)start.
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+import settings
+import initializer
+import plugins
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Preload corpus information of mysql_corparch into the shared cache')
+    parser.add_argument('conf_path', metavar='CONF_PATH', type=str, help='Path to KonText config.xml')
+    parser.add_argument('corpus_ids', metavar='CORPUS_ID', type=str, nargs='*',
+                        help='Corpora to be loaded (by default all the active ones)')
+    parser.add_argument('-c', '--chunk-size', type=int, default=100,
+                        help='Number of corpora loaded at once (default is 100)')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(name)s] %(levelname)s: %(message)s')
+
+    settings.load(args.conf_path)
+    initializer.init_plugin('db')
+    initializer.init_plugin('integration_db')
+    initializer.init_plugin('user_items')
+    initializer.init_plugin('corparch')
+    corparch = plugins.runtime.CORPARCH.instance
+    if not hasattr(corparch, 'preload_corpus_info'):
+        print('The configured corparch plug-in does not support preloading', file=sys.stderr)
+        sys.exit(1)
+    t0 = time.time()
+    num_loaded = corparch.preload_corpus_info(args.corpus_ids if args.corpus_ids else None,
+                                              chunk_size=args.chunk_size)
+    print('Loaded {0} corpora in {1:.2f}s'.format(num_loaded, time.time() - t0))
@@ -0,0 +1,135 @@
+# Copyright (c) 2021 Charles University, Faculty of Arts,
+#                    Institute of the Czech National Corpus
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 2
+# dated June, 1991.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+import sqlite3
+import unittest
+
+from plugins.mysql_corparch.backend import Backend
+
+SCHEMA = '''
+CREATE TABLE corpus_posattr (corpus_name TEXT, name TEXT, position INT, type TEXT, label TEXT, dynamic TEXT,
+    dynlib TEXT, arg1 TEXT, arg2 TEXT, fromattr TEXT, funtype TEXT, dyntype TEXT, transquery TEXT, mapto TEXT,
+    multivalue TEXT, multisep TEXT);
+CREATE TABLE corpus_structure (corpus_name TEXT, name TEXT, type TEXT, displaytag TEXT, displaybegin TEXT);
+CREATE TABLE corpus_structattr (corpus_name TEXT, structure_name TEXT, name TEXT, type TEXT, locale TEXT,
+    multivalue TEXT, multisep TEXT, maxlistsize INT, defaultvalue TEXT, attrdoc TEXT, attrdoclabel TEXT,
+    rnumeric TEXT);
+CREATE TABLE corpus_alignment (corpus_name_1 TEXT, corpus_name_2 TEXT);
+CREATE TABLE kontext_tckc_corpus (corpus_name TEXT, provider TEXT, type TEXT, display_order INT,
+    is_kwic_view INT);
+CREATE TABLE kontext_interval_attr (corpus_name TEXT, interval_struct TEXT, interval_attr TEXT, widget TEXT);
+CREATE TABLE kontext_simple_query_default_attrs (corpus_name TEXT, pos_attr TEXT);
+'''
+
+DATA = [
+    ('INSERT INTO corpus_posattr (corpus_name, name, position) VALUES (?, ?, ?)',
+     [('syn', 'word', 0), ('syn', 'lemma', 1), ('intercorp_en', 'word', 0)]),
+    ('INSERT INTO corpus_posattr (corpus_name, name, position, dynamic, fromattr) VALUES (?, ?, ?, ?, ?)',
+     [('syn', 'lc', 2, 'utf8lowercase', 'word')]),
+    ('INSERT INTO corpus_structure (corpus_name, name) VALUES (?, ?)',
+     [('syn', 'doc'), ('syn', 's'), ('intercorp_en', 'p')]),
+    ('INSERT INTO corpus_structattr (corpus_name, structure_name, name) VALUES (?, ?, ?)',
+     [('syn', 'doc', 'id'), ('syn', 'doc', 'year'), ('intercorp_en', 'p', 'id')]),
+    ('INSERT INTO corpus_alignment VALUES (?, ?)',
+     [('intercorp_en', 'intercorp_cs'), ('intercorp_en', 'intercorp_de')]),
+    ('INSERT INTO kontext_tckc_corpus VALUES (?, ?, ?, ?, ?)',
+     [('syn', 'wiktionary', 'tc', 2, 0), ('syn', 'treq', 'tc', 0, 1), ('syn', 'wiki', 'kc', 1, 0)]),
+    ('INSERT INTO kontext_interval_attr VALUES (?, ?, ?, ?)', [('syn', 'doc', 'year', 'years')]),
+    ('INSERT INTO kontext_simple_query_default_attrs VALUES (?, ?)', [('syn', 'word'), ('syn', 'lc')]),
+]
+
+
+class SQLiteCursor(object):
+    """
+    A MySQL-like cursor returning rows as dicts
+    """
+
+    def __init__(self, conn):
+        self._cursor = conn.cursor()
+
+    def execute(self, sql, args=()):
+        self._cursor.execute(sql.replace('%s', '?'), tuple(args))
+
+    def fetchall(self):
+        cols = [d[0] for d in self._cursor.description]
+        return [dict(zip(cols, row)) for row in self._cursor.fetchall()]
+
+    def fetchone(self):
+        ans = self.fetchall()
+        return ans[0] if len(ans) > 0 else None
+
+
+class SQLiteDb(object):
+
+    def __init__(self):
+        self._conn = sqlite3.connect(':memory:')
+        self._conn.executescript(SCHEMA)
+        for sql, rows in DATA:
+            self._conn.executemany(sql, rows)
+
+    def cursor(self):
+        return SQLiteCursor(self._conn)
+
+
+class BulkLoadingTest(unittest.TestCase):
+
+    CORPORA = ['syn', 'intercorp_en', 'missing']
+
+    def setUp(self):
+        self.backend = Backend(SQLiteDb())
+
+    def test_posattrs(self):
+        ans = self.backend.load_corpora_posattrs(self.CORPORA)
+        for corpus_id in self.CORPORA:
+            single = self.backend.load_corpus_posattrs(corpus_id)
+            bulk = ans.get(corpus_id, [])
+            self.assertEqual([x['name'] for x in single], [x['name'] for x in bulk])
+            for item in bulk:
+                self.assertEqual(
+                    self.backend.load_corpus_posattr_references(corpus_id, item['name']),
+                    (item['fromattr'], item['mapto']))
+
+    def test_structures(self):
+        structs = self.backend.load_corpora_structures(self.CORPORA)
+        sattrs = self.backend.load_corpora_structattrs(self.CORPORA)
+        for corpus_id in self.CORPORA:
+            single = self.backend.load_corpus_structures(corpus_id)
+            self.assertEqual([x['name'] for x in single], [x['name'] for x in structs.get(corpus_id, [])])
+            for struct in single:
+                self.assertEqual(
+                    [x['name'] for x in self.backend.load_corpus_structattrs(corpus_id, struct['name'])],
+                    [x['name'] for x in sattrs[corpus_id][struct['name']]])
+
+    def test_simple_relations(self):
+        pairs = [
+            (self.backend.load_corpora_alignments, self.backend.load_corpus_alignments),
+            (self.backend.load_corpora_interval_attrs, self.backend.load_interval_attrs),
+            (self.backend.load_corpora_simple_query_default_attrs, self.backend.load_simple_query_default_attrs),
+            (self.backend.load_corpora_tckc_providers,
+             lambda c: [dict(corpus_name=c, **x) for x in self.backend.load_tckc_providers(c)]),
+        ]
+        for bulk_fn, single_fn in pairs:
+            ans = bulk_fn(self.CORPORA)
+            for corpus_id in self.CORPORA:
+                self.assertEqual(sorted(map(repr, single_fn(corpus_id))),
+                                 sorted(map(repr, ans.get(corpus_id, []))))
+        self.assertEqual([x['provider'] for x in self.backend.load_tckc_providers('syn')],
+                         [x['provider'] for x in self.backend.load_corpora_tckc_providers(['syn'])['syn']])
+
+    def test_empty_input(self):
+        self.assertEqual({}, self.backend.load_corpora_posattrs([]))
+        self.assertEqual({}, self.backend.load_corpora_structattrs([]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -17,13 +17,11 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 
 from plugins.abstract.integration_db import IntegrationDatabase
+from plugins.common.mysql import MySQLOps, MySQLConf, DEFAULT_POOL_TIMEOUT, DEFAULT_HEALTH_CHECK_INTERVAL
 from mysql.connector.connection import MySQLConnection
 from mysql.connector.cursor import MySQLCursor
-from mysql.connector.errors import OperationalError
-from mysql.connector import connect
-import logging
 import time
-from typing import Dict, Optional
+from typing import Any, Dict, List
 
 
 class MySqlIntegrationDb(IntegrationDatabase[MySQLConnection, MySQLCursor]):
@@ -38,41 +36,32 @@ class MySqlIntegrationDb(IntegrationDatabase[MySQLConnection, MySQLCursor]):
     Please make sure scripts/schema.sql is applied to your database. Otherwise
     the plug-in fails to start. In case of a Dockerized installation, this
     is done automatically.
-    """
-
-    _conn: Optional[MySQLConnection]
 
-    _conn_args: Dict[str, str]
-
-    _retry_delay: int
+    Connections are pooled (see plugins.common.mysql.MySQLOps).
+    """
 
-    _retry_attempts: int
+    _ops: MySQLOps
 
     def __init__(self, host, database, user, password, pool_size, pool_name, autocommit, retry_delay, retry_attempts,
-                 environment_wait_sec: int):
-        self._conn_args = dict(
-            host=host, database=database, user=user, password=password, pool_size=pool_size,
-            pool_name=pool_name, autocommit=autocommit)
-        self._retry_delay = retry_delay
-        self._retry_attempts = retry_attempts
+                 environment_wait_sec: int, pool_timeout: int = DEFAULT_POOL_TIMEOUT,
+                 health_check_interval: int = DEFAULT_HEALTH_CHECK_INTERVAL):
+        conf = MySQLConf(dict(
+            mysql_host=host, mysql_db=database, mysql_user=user, mysql_passwd=password, mysql_pool_size=pool_size,
+            mysql_retry_delay=retry_delay, mysql_retry_attempts=retry_attempts, mysql_pool_timeout=pool_timeout,
+            mysql_health_check_interval=health_check_interval))
+        conf.pool_name = pool_name
+        conf.autocommit = autocommit
+        self._host = host
+        self._database = database
         self._environment_wait_sec = environment_wait_sec
-        self._conn = None
+        self._ops = MySQLOps(conf)
 
     @property
     def connection(self):
-        if self._conn is None:
-            self._conn = connect(**self._conn_args)
-        return self._conn
+        return self._ops.connection
 
     def cursor(self, dictionary=True, buffered=False):
-        try:
-            return self.connection.cursor(dictionary=dictionary, buffered=buffered)
-        except OperationalError as ex:
-            if 'MySQL Connection not available' in ex.msg:
-                logging.getLogger(__name__).warning(
-                    'Lost connection to MySQL server - reconnecting')
-                self.connection.reconnect(delay=self._retry_delay, attempts=self._retry_attempts)
-                return self.connection.cursor(dictionary=dictionary, buffered=buffered)
+        return self._ops.cursor(dictionary=dictionary, buffered=buffered)
 
     @property
     def is_active(self):
@@ -80,15 +69,19 @@ class MySqlIntegrationDb(IntegrationDatabase[MySQLConnection, MySQLCursor]):
 
     @property
     def info(self):
-        return f'{self.connection.server_host}/{self.connection.database}'
+        return f'{self._host}/{self._database}'
+
+    @property
+    def pool_metrics(self) -> Dict[str, Any]:
+        return self._ops.pool_metrics
 
     def wait_for_environment(self):
         t = time.time()
         while (time.time() - t) * 1000 < self._environment_wait_sec:
             try:
-                cursor = self.connection.cursor(dictionary=False, buffered=False)
-                cursor.execute('SELECT COUNT(*) FROM kontext_integration_env LIMIT 1')
-                row = cursor.fetchone()
+                with self.cursor(dictionary=False, buffered=False) as cursor:
+                    cursor.execute('SELECT COUNT(*) FROM kontext_integration_env LIMIT 1')
+                    row = cursor.fetchone()
                 if row and row[0] == 1:
                     return None
             except Exception:
@@ -97,23 +90,22 @@ class MySqlIntegrationDb(IntegrationDatabase[MySQLConnection, MySQLCursor]):
         return Exception('No confirmed environment installation. Please check table kontext_integration_env')
 
     def execute(self, sql, args):
-        cursor = self.cursor()
-        cursor.execute(sql, args)
-        return cursor
+        return self._ops.execute(sql, args)
 
     def executemany(self, sql, args_rows):
-        cursor = self.cursor()
-        cursor.executemany(sql, args_rows)
-        return cursor
+        return self._ops.executemany(sql, args_rows)
+
+    def execute_prepared(self, sql, args=()) -> List[Dict[str, Any]]:
+        return self._ops.execute_prepared(sql, args)
 
     def start_transaction(self, isolation_level=None):
-        return self.connection.start_transaction()
+        return self._ops.start_transaction(isolation_level)
 
     def commit(self):
-        self.connection.commit()
+        self._ops.commit()
 
     def rollback(self):
-        self.connection.rollback()
+        self._ops.rollback()
 
 
 def create_instance(conf):
@@ -122,4 +114,6 @@ def create_instance(conf):
         host=pconf['host'], database=pconf['db'], user=pconf['user'], password=pconf['passwd'],
         pool_size=int(pconf['pool_size']), pool_name='kontext_pool', autocommit=True,
         retry_delay=int(pconf['retry_delay']), retry_attempts=int(pconf['retry_attempts']),
-        environment_wait_sec=int(pconf['environment_wait_sec']))
+        environment_wait_sec=int(pconf['environment_wait_sec']),
+        pool_timeout=int(pconf.get('pool_timeout', DEFAULT_POOL_TIMEOUT)),
+        health_check_interval=int(pconf.get('health_check_interval', DEFAULT_HEALTH_CHECK_INTERVAL)))
@@ -145,5 +145,5 @@ def create_instance(settings, integ_db, auth):
         logging.getLogger(__name__).info(
             'mysql_user_items uses custom database configuration {}@{}'.format(
                 plugin_conf['mysql_user'], plugin_conf['mysql_host']))
-        db_backend = Backend(MySQLOps(MySQLConf(plugin_conf)).connection)
+        db_backend = Backend(MySQLOps(MySQLConf(plugin_conf)))
     return MySQLUserItems(settings, db_backend, auth)
@@ -23,12 +23,122 @@ and based on RedisDB in-memory database engine.
 
 This plug-in should be able to handle high-load installations without any problems.
 
+Values are serialized to JSON by default. With the optional 'serializer' set
+to 'msgpack' (requires the 'msgpack' package), values are written in the more
+compact MessagePack format which is also faster to decode. Already stored JSON
+values remain readable so the serializer can be switched on a running installation.
+
+All the instances connecting the same Redis database (with the same 'max_connections')
+share a single connection pool.
+
 required XML: please see config.rng
 """
 
+import copy
 import json
+import time
+import threading
+from functools import wraps
+from contextlib import contextmanager
+
 import redis
-from plugins.abstract.general_storage import KeyValueStorage
+from plugins.abstract.general_storage import KeyValueStorage, ChannelWatcher
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# a prefix distinguishing MessagePack-encoded values from JSON ones
+# (0xc1 is never used by MessagePack and it cannot start a UTF-8 encoded JSON)
+MSGPACK_MARKER = b'\xc1'
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(host, port, db, max_connections=None):
+    """
+    Return a connection pool shared by all the clients of a Redis database
+    requiring the same max. number of connections
+    """
+    with _pools_lock:
+        pool = _pools.get((host, port, db, max_connections))
+        if pool is None:
+            pool = redis.ConnectionPool(host=host, port=port, db=db, max_connections=max_connections)
+            _pools[(host, port, db, max_connections)] = pool
+        return pool
+
+
+def read_op(fn):
+    """
+    Mark a method returning data from the database. Such methods cannot be
+    used within a pipeline as the data are not available until the pipeline
+    is executed.
+    """
+    @wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        if self._in_pipeline:
+            raise RuntimeError(f'redis_db: {fn.__name__}() cannot be used within a pipeline')
+        return fn(self, *args, **kwargs)
+    return wrapper
+
+
+class JSONSerializer(object):
+
+    @staticmethod
+    def dumps(value):
+        return json.dumps(value)
+
+    @staticmethod
+    def loads(data):
+        return json.loads(data)
+
+
+class MsgpackSerializer(object):
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImportError('The msgpack serializer of redis_db requires the \'msgpack\' package')
+
+    @staticmethod
+    def dumps(value):
+        return MSGPACK_MARKER + msgpack.packb(value, use_bin_type=True)
+
+    @staticmethod
+    def loads(data):
+        if data[:1] == MSGPACK_MARKER:
+            return msgpack.unpackb(data[1:], raw=False, strict_map_key=False)
+        return json.loads(data)
+
+
+SERIALIZERS = {
+    'json': JSONSerializer,
+    'msgpack': MsgpackSerializer
+}
+
+
+class RedisChannelWatcher(ChannelWatcher):
+    """
+    A channel watcher based on Redis PUB/SUB
+    """
+
+    def __init__(self, conn: redis.StrictRedis, channel: str):
+        self._pubsub = conn.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(channel)
+
+    def wait(self, timeout):
+        deadline = time.time() + timeout
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            # please note that subscription confirmation is consumed here too (as None)
+            if self._pubsub.get_message(timeout=remaining) is not None:
+                return True
+
+    def close(self):
+        self._pubsub.close()
 
 
 class RedisDb(KeyValueStorage):
@@ -40,12 +150,19 @@ class RedisDb(KeyValueStorage):
         self._host = conf['host']
         self._port = int(conf['port'])
         self._db = int(conf['id'])
-        self.redis = redis.StrictRedis(host=self._host, port=self._port, db=self._db)
+        max_connections = int(conf['max_connections']) if conf.get('max_connections') else None
+        self.redis = redis.StrictRedis(connection_pool=get_pool(self._host, self._port, self._db, max_connections))
         self._scan_chunk_size = 50
+        serializer = conf.get('serializer', 'json')
+        if serializer not in SERIALIZERS:
+            raise ValueError(f'Unknown redis_db serializer: {serializer}')
+        self._serializer = SERIALIZERS[serializer]()
+        self._in_pipeline = False
 
     def rename(self, key, new_key):
         return self.redis.rename(key, new_key)
 
+    @read_op
     def list_get(self, key, from_idx=0, to_idx=-1):
         """
         Returns a stored list. If there is a non-list value stored with the passed key
@@ -57,7 +174,7 @@ class RedisDb(KeyValueStorage):
         to_idx -- optional (default is -1) end index (including, i.e. unlike Python);
         negative values are supported (-1 = last, -2 = penultimate,...)
         """
-        return [json.loads(s) for s in self.redis.lrange(key, from_idx, to_idx)]
+        return [self._serializer.loads(s) for s in self.redis.lrange(key, from_idx, to_idx)]
 
     def list_append(self, key, value):
         """
@@ -67,8 +184,9 @@ class RedisDb(KeyValueStorage):
         key -- data access key
         value -- value to be pushed
         """
-        self.redis.rpush(key, json.dumps(value))
+        self.redis.rpush(key, self._serializer.dumps(value))
 
+    @read_op
     def list_pop(self, key):
         """
         Removes and returns the first element of the list stored at key.
@@ -77,8 +195,9 @@ class RedisDb(KeyValueStorage):
         key -- list access key
         """
         tmp = self.redis.lpop(key)
-        return json.loads(tmp) if tmp is not None else None
+        return self._serializer.loads(tmp) if tmp is not None else None
 
+    @read_op
     def list_len(self, key):
         """
         Returns length of a list. If there is a non-list value stored with the passed key
@@ -98,7 +217,7 @@ class RedisDb(KeyValueStorage):
         idx -- a zero based index where the set should be performed
         value -- a JSON-serializable value to be inserted
         """
-        return self.redis.lset(key, idx, json.dumps(value))
+        return self.redis.lset(key, idx, self._serializer.dumps(value))
 
     def list_trim(self, key, keep_left, keep_right):
         """
@@ -112,6 +231,7 @@ class RedisDb(KeyValueStorage):
         """
         self.redis.ltrim(key, keep_left, keep_right)
 
+    @read_op
     def hash_get(self, key, field):
         """
         Gets a value from a hash table stored under the passed key
@@ -121,7 +241,7 @@ class RedisDb(KeyValueStorage):
         field -- hash table entry key
         """
         v = self.redis.hget(key, field)
-        return json.loads(v) if v else None
+        return self._serializer.loads(v) if v else None
 
     def hash_set(self, key, field, value):
         """
@@ -132,7 +252,29 @@ class RedisDb(KeyValueStorage):
         field -- hash table entry key
         value -- a value to be stored
         """
-        self.redis.hset(key, field, json.dumps(value))
+        self.redis.hset(key, field, self._serializer.dumps(value))
+
+    @read_op
+    def hash_mget(self, key, fields):
+        """
+        Gets multiple values from a hash table stored under the passed key
+        using a single HMGET command
+
+        arguments:
+        key -- data access key
+        fields -- a list of hash table entry keys
+        """
+        if len(fields) == 0:
+            return []
+        return [self._serializer.loads(v) if v else None for v in self.redis.hmget(key, fields)]
+
+    def hash_incr(self, key, field, amount=1):
+        """
+        Atomically increments an integer value within a hash (HINCRBY). Please note
+        that the value is stored as a plain integer which is readable by all
+        the serializers.
+        """
+        return self.redis.hincrby(key, field, amount)
 
     def hash_del(self, key, field):
         """
@@ -144,6 +286,7 @@ class RedisDb(KeyValueStorage):
         """
         self.redis.hdel(key, field)
 
+    @read_op
     def hash_get_all(self, key):
         """
         Returns a complete hash object (= Python dict) stored under the passed
@@ -152,8 +295,10 @@ class RedisDb(KeyValueStorage):
         arguments:
         key -- data access key
         """
-        return dict((k.decode('utf-8'), json.loads(v)) for k, v in list(self.redis.hgetall(key).items()))
+        return dict((k.decode('utf-8'), self._serializer.loads(v))
+                    for k, v in list(self.redis.hgetall(key).items()))
 
+    @read_op
     def get(self, key, default=None):
         """
         Gets a value stored with passed key and returns its JSON decoded form.
@@ -164,9 +309,21 @@ class RedisDb(KeyValueStorage):
         """
         data = self.redis.get(key)
         if data:
-            return json.loads(data)
+            return self._serializer.loads(data)
         return default
 
+    @read_op
+    def mget(self, keys):
+        """
+        Gets multiple values using a single MGET command
+
+        arguments:
+        keys -- a list of data access keys
+        """
+        if len(keys) == 0:
+            return []
+        return [self._serializer.loads(v) if v else None for v in self.redis.mget(keys)]
+
     def set(self, key, data):
         """
         Saves 'data' with 'key'.
@@ -175,7 +332,7 @@ class RedisDb(KeyValueStorage):
         key -- an access key
         data -- a dictionary containing data to be saved
         """
-        self.redis.set(key, json.dumps(data))
+        self.redis.set(key, self._serializer.dumps(data))
 
     def set_ttl(self, key, ttl):
         """
@@ -188,6 +345,7 @@ class RedisDb(KeyValueStorage):
         """
         self.redis.expire(key, ttl)
 
+    @read_op
     def get_ttl(self, key):
         return self.redis.ttl(key)
 
@@ -203,6 +361,7 @@ class RedisDb(KeyValueStorage):
         """
         self.redis.delete(key)
 
+    @read_op
     def exists(self, key):
         """
         Tests whether there is a value with the specified key
@@ -225,6 +384,7 @@ class RedisDb(KeyValueStorage):
         """
         return self.redis.setnx(key, value)
 
+    @read_op
     def getset(self, key, value):
         """
         An atomic operation which obtains current key first and then
@@ -246,13 +406,56 @@ class RedisDb(KeyValueStorage):
         """
         Set key to value within hash 'name' for each corresponding
         key and value from the 'mapping' dict.
-        Before setting, the values are json-serialized
+        Before setting, the values are serialized
         """
+        if len(mapping) == 0:
+            return True
         new_mapping = {}
         for name in mapping:
-            new_mapping[name] = json.dumps(mapping[name])
+            new_mapping[name] = self._serializer.dumps(mapping[name])
         return self.redis.hmset(key, new_mapping)
 
+    @read_op
+    def set_if_absent(self, key, data, ttl):
+        """
+        An atomic operation "set if not exists" with expiration
+        """
+        return bool(self.redis.set(key, self._serializer.dumps(data), nx=True, ex=ttl))
+
+    @contextmanager
+    def pipeline(self):
+        """
+        Provide a copy of the storage sending all the commands
+        at once using a (non-transactional) Redis pipeline. The commands
+        are sent once the context is left without an error.
+
+        Only write operations can be used within the pipeline
+        (read operations raise RuntimeError).
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        client = copy.copy(self)
+        client.redis = pipe
+        client._in_pipeline = True
+        try:
+            yield client
+            pipe.execute()
+        finally:
+            pipe.reset()
+
+    def publish(self, channel, message):
+        """
+        Publish a JSON-serialized message to a channel
+        """
+        self.redis.publish(channel, json.dumps(message))
+
+    @read_op
+    def subscribe(self, channel):
+        """
+        Subscribe to a channel using Redis PUB/SUB. The returned watcher
+        should be closed once it is not needed (or used via 'with').
+        """
+        return RedisChannelWatcher(self.redis, channel)
+
 
 def create_instance(conf):
     """
@@ -0,0 +1,45 @@
+# Copyright (c) 2021 Charles University, Faculty of Arts,
+#                    Institute of the Czech National Corpus
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 2
+# dated June, 1991.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+import unittest
+
+from plugins.redis_db import RedisDb
+
+
+class PipelineTest(unittest.TestCase):
+    """
+    Please note that no Redis server is needed here as
+    nothing is sent to the database.
+    """
+
+    def setUp(self):
+        self.db = RedisDb(dict(host='localhost', port=6379, id=15))
+
+    def test_read_in_pipeline(self):
+        with self.assertRaises(RuntimeError):
+            with self.db.pipeline() as pipe:
+                pipe.get('foo')
+        with self.assertRaises(RuntimeError):
+            with self.db.pipeline() as pipe:
+                pipe.set_if_absent('foo', 1, 10)
+
+    def test_pools(self):
+        db2 = RedisDb(dict(host='localhost', port=6379, id=15))
+        db3 = RedisDb(dict(host='localhost', port=6379, id=15, max_connections='5'))
+        self.assertIs(self.db.redis.connection_pool, db2.redis.connection_pool)
+        self.assertIsNot(self.db.redis.connection_pool, db3.redis.connection_pool)
+        self.assertEqual(5, db3.redis.connection_pool.max_connections)
+
+
+if __name__ == '__main__':
+    unittest.main()
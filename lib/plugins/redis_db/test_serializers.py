@@ -0,0 +1,49 @@
+# Copyright (c) 2021 Charles University, Faculty of Arts,
+#                    Institute of the Czech National Corpus
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 2
+# dated June, 1991.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+import json
+import unittest
+
+from plugins.redis_db import JSONSerializer, MsgpackSerializer, msgpack
+
+
+class SerializersTest(unittest.TestCase):
+
+    VALUE = {'query_id': '~abc', 'created': 1600000000.5, 'name': None, 'aligned': ['intercorp_cs', 'intercorp_de']}
+
+    def test_json(self):
+        s = JSONSerializer()
+        self.assertEqual(self.VALUE, s.loads(s.dumps(self.VALUE).encode('utf-8')))
+
+    @unittest.skipIf(msgpack is None, 'msgpack not installed')
+    def test_msgpack(self):
+        s = MsgpackSerializer()
+        data = s.dumps(self.VALUE)
+        self.assertTrue(len(data) < len(json.dumps(self.VALUE)))
+        self.assertEqual(self.VALUE, s.loads(data))
+
+    @unittest.skipIf(msgpack is None, 'msgpack not installed')
+    def test_msgpack_reads_json(self):
+        s = MsgpackSerializer()
+        self.assertEqual(self.VALUE, s.loads(json.dumps(self.VALUE).encode('utf-8')))
+        # values written by INCR are plain numbers
+        self.assertEqual(5, s.loads(b'5'))
+
+    @unittest.skipIf(msgpack is None, 'msgpack not installed')
+    def test_msgpack_non_str_keys(self):
+        s = MsgpackSerializer()
+        self.assertEqual({1: 'a', 2: {3: 'b'}}, s.loads(s.dumps({1: 'a', 2: {3: 'b'}})))
+
+
+if __name__ == '__main__':
+    unittest.main()
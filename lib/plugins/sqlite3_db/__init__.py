@@ -31,18 +31,74 @@ with high concurrency (hundreds or more simultaneous users).
 
 The sqlite3 plugin stores data in a single table called "data" with the following structure:
 CREATE TABLE data (key text PRIMARY KEY, value text, expires integer)
+
+Notifications (see KeyValueStorage.publish, KeyValueStorage.subscribe) are
+supported only if the optional 'notify_dir' is configured. In such case, each
+channel is mapped to one of a fixed number of small files within the directory
+and subscribers watch the file modification time (which is much cheaper than
+querying the database). Without 'notify_dir', subscribers just poll.
+
+Expired items are not removed when read. Reads just ignore them and the actual
+removal is performed by the exported 'delete_expired' task in batches of limited
+size. The task must be scheduled (Celery: 'db.delete_expired', rq: 'db__delete_expired';
+see conf/beatconfig.sample.py and conf/rq-schedule-conf.sample.json), otherwise
+the database grows without limits.
+
+With the optional 'layout' set to 'native', hashes and lists are stored
+in dedicated tables with a row per field/item (see the 'native' module).
 """
 
 import threading
 import json
 import time
+import os
+import hashlib
 
 import sqlite3
 
-from plugins.abstract.general_storage import KeyValueStorage
+from plugins.abstract.general_storage import KeyValueStorage, ChannelWatcher
 
 thread_local = threading.local()
 
+# channels are mapped to a fixed number of files to keep the notification directory small
+NOTIFY_NUM_BUCKETS = 256
+
+# max. number of expired items removed within a single transaction
+DEFAULT_SWEEP_CHUNK_SIZE = 1000
+
+# a condition matching non-expired items (requires the current time as an argument)
+ALIVE = '(expires = -1 OR expires > ?)'
+
+
+class FileChannelWatcher(ChannelWatcher):
+    """
+    A channel watcher based on a modification time of a notification file
+    """
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, path: str):
+        self._path = path
+        self._last_mtime = self._get_mtime()
+
+    def _get_mtime(self):
+        try:
+            return os.stat(self._path).st_mtime_ns
+        except OSError:
+            return None
+
+    def wait(self, timeout):
+        deadline = time.time() + timeout
+        while True:
+            mtime = self._get_mtime()
+            if mtime != self._last_mtime:
+                self._last_mtime = mtime
+                return True
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self.POLL_INTERVAL, remaining))
+
 
 class DefaultDb(KeyValueStorage):
     def __init__(self, conf):
@@ -51,6 +107,8 @@ class DefaultDb(KeyValueStorage):
         conf -- a dictionary containing 'settings' module compatible configuration of the plug-in
         """
         self.conf = conf
+        if self.conf.get('notify_dir'):
+            os.makedirs(self.conf['notify_dir'], exist_ok=True)
 
     def _conn(self):
         """
@@ -60,19 +118,9 @@ class DefaultDb(KeyValueStorage):
             thread_local.conn = sqlite3.connect(self.conf.get('db_path'))
         return thread_local.conn
 
-    def _delete_expired(self, key):
-        cursor = self._conn().cursor()
-        cursor.execute('SELECT expires FROM data WHERE key = ?', (key,))
-        ans = cursor.fetchone()
-        if ans and -1 < ans[0] < time.time():
-            cursor.execute('DELETE FROM data WHERE key = ?', (key,))
-            self._conn().commit()
-        return None
-
     def _load_raw_data(self, key):
-        self._delete_expired(key)
         cursor = self._conn().cursor()
-        cursor.execute('SELECT value, expires FROM data WHERE key = ?', (key,))
+        cursor.execute(f'SELECT value, expires FROM data WHERE key = ? AND {ALIVE}', (key, time.time()))
         ans = cursor.fetchone()
         if ans:
             return ans
@@ -85,9 +133,8 @@ class DefaultDb(KeyValueStorage):
         self._conn().commit()
 
     def rename(self, key, new_key):
-        self._delete_expired(key)
         cursor = self._conn().cursor()
-        cursor.execute('UPDATE data SET key = ? WHERE key = ?', (new_key, key))
+        cursor.execute(f'UPDATE OR REPLACE data SET key = ? WHERE key = ? AND {ALIVE}', (new_key, key, time.time()))
         self._conn().commit()
 
     def list_get(self, key, from_idx=0, to_idx=-1):
@@ -151,8 +198,16 @@ class DefaultDb(KeyValueStorage):
         data[field] = value
         self.set(key, data)
 
+    def hash_mget(self, key, fields):
+        data = self.get(key)
+        if type(data) is not dict:
+            return [None] * len(fields)
+        return [data.get(field, None) for field in fields]
+
     def hash_del(self, key, field):
         sdata = self._load_raw_data(key)
+        if sdata is None:
+            return
         data = json.loads(sdata[0])
         if field in data:
             del data[field]
@@ -229,9 +284,8 @@ class DefaultDb(KeyValueStorage):
         returns:
         boolean answer
         """
-        self._delete_expired(key)
         cursor = self._conn().cursor()
-        cursor.execute('SELECT COUNT(*) FROM data WHERE key = ?', (key,))
+        cursor.execute(f'SELECT COUNT(*) FROM data WHERE key = ? AND {ALIVE}', (key, time.time()))
         return cursor.fetchone()[0] > 0
 
     def set_ttl(self, key, ttl):
@@ -243,23 +297,27 @@ class DefaultDb(KeyValueStorage):
         ttl -- number of seconds to wait before the value is removed
         (please note that set/update actions reset the timer to zero)
         """
-        self._delete_expired(key)
-        if self.exists(key):
-            cursor = self._conn().cursor()
-            cursor.execute('UPDATE data SET expires = ? WHERE key = ?', (time.time() + ttl, key))
+        now = time.time()
+        cursor = self._conn().cursor()
+        cursor.execute(f'UPDATE data SET expires = ? WHERE key = ? AND {ALIVE}', (now + ttl, key, now))
+        if cursor.rowcount > 0:
             self._conn().commit()
         return None
 
     def get_ttl(self, key):
+        """
+        Return the expiration time of an item, -1 if the item does not expire
+        and -2 if there is no such item.
+        """
         cursor = self._conn().cursor()
-        cursor.execute('SELECT expires FROM data WHERE key = ?', (key,))
-        return cursor.fetchone()[0]
+        cursor.execute(f'SELECT expires FROM data WHERE key = ? AND {ALIVE}', (key, time.time()))
+        ans = cursor.fetchone()
+        return ans[0] if ans else -2
 
     def clear_ttl(self, key):
-        self._delete_expired(key)
-        if self.exists(key):
-            cursor = self._conn().cursor()
-            cursor.execute('UPDATE data SET expires = -1 WHERE key = ?', (key,))
+        cursor = self._conn().cursor()
+        cursor.execute(f'UPDATE data SET expires = -1 WHERE key = ? AND {ALIVE}', (key, time.time()))
+        if cursor.rowcount > 0:
             self._conn().commit()
         return None
 
@@ -278,15 +336,91 @@ class DefaultDb(KeyValueStorage):
     def hash_set_map(self, key, mapping):
         """
         Set key to value within hash 'name' for each corresponding
-        key and value from the 'mapping' dict.
+        key and value from the 'mapping' dict (using a single read-modify-write).
         """
-        self.set(key, mapping)
+        data = self.get(key)
+        if type(data) is not dict:
+            data = {}
+        data.update(mapping)
+        self.set(key, data)
         return True
 
+    def set_if_absent(self, key, data, ttl):
+        """
+        An atomic operation "set if not exists" with expiration
+        """
+        now = time.time()
+        conn = self._conn()
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM data WHERE key = ? AND expires > -1 AND expires <= ?', (key, now))
+        cursor.execute('INSERT OR IGNORE INTO data (key, value, expires) VALUES (?, ?, ?)',
+                       (key, json.dumps(data), now + ttl))
+        conn.commit()
+        return cursor.rowcount > 0
+
+    def delete_expired(self, chunk_size=DEFAULT_SWEEP_CHUNK_SIZE):
+        """
+        Remove all the expired items. To prevent long blocking of other writers,
+        items are removed in chunks, each within its own transaction.
+
+        arguments:
+        chunk_size -- max. number of items removed within a single transaction
+
+        returns:
+        number of removed items
+        """
+        conn = self._conn()
+        cursor = conn.cursor()
+        cursor.execute('CREATE INDEX IF NOT EXISTS data_expires_idx ON data (expires)')
+        total = 0
+        while True:
+            cursor.execute('DELETE FROM data WHERE rowid IN (SELECT rowid FROM data '
+                           'WHERE expires > -1 AND expires <= ? LIMIT ?)', (time.time(), chunk_size))
+            conn.commit()
+            total += cursor.rowcount
+            if cursor.rowcount < chunk_size:
+                return total
+
+    def export_tasks(self):
+        """
+        Export tasks for Celery worker(s)
+        """
+        def delete_expired(chunk_size=DEFAULT_SWEEP_CHUNK_SIZE):
+            return self.delete_expired(chunk_size)
+        return delete_expired,
+
+    def _notify_file_path(self, channel):
+        bucket = int(hashlib.md5(channel.encode('utf-8')).hexdigest(), 16) % NOTIFY_NUM_BUCKETS
+        return os.path.join(self.conf['notify_dir'], f'{bucket:02x}.notify')
+
+    def publish(self, channel, message):
+        """
+        Publish a message to a channel. Please note that subscribers
+        are only notified about the fact that something has been
+        published (the message itself is not delivered).
+        """
+        if self.conf.get('notify_dir'):
+            path = self._notify_file_path(channel)
+            with open(path, 'w') as fw:
+                fw.write(json.dumps(message))
+            os.utime(path)
+
+    def subscribe(self, channel):
+        if self.conf.get('notify_dir'):
+            return FileChannelWatcher(self._notify_file_path(channel))
+        return super().subscribe(channel)
+
 
 def create_instance(conf):
     """
     Arguments:
     conf -- a dictionary containing imported XML configuration of the plugin
     """
-    return DefaultDb(conf.get('plugins', 'db'))
+    plugin_conf = conf.get('plugins', 'db')
+    layout = plugin_conf.get('layout', 'default')
+    if layout == 'native':
+        from .native import NativeDb
+        return NativeDb(plugin_conf)
+    elif layout != 'default':
+        raise ValueError(f'Unknown sqlite3_db layout: {layout}')
+    return DefaultDb(plugin_conf)
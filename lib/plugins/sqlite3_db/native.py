@@ -0,0 +1,550 @@
+# Copyright (c) 2021 Charles University, Faculty of Arts,
+#                    Institute of the Czech National Corpus
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 2
+# dated June, 1991.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+"""
+A 'native' layout of the sqlite3_db plug-in. Unlike the default layout (where each
+value including hashes and lists is stored as a single JSON blob), hashes and lists
+are stored in their own tables with one row per field/item. Operations like hash_set,
+hash_del, list_append, list_pop or list_set therefore do not have to read and rewrite
+the whole value and their cost does not depend on the size of the stored structure.
+
+Database structure:
+
+CREATE TABLE item (key TEXT PRIMARY KEY, type INTEGER NOT NULL, value TEXT, expires INTEGER NOT NULL)
+CREATE TABLE hash (key TEXT NOT NULL, field TEXT NOT NULL, value TEXT, PRIMARY KEY (key, field))
+CREATE TABLE list (key TEXT NOT NULL, idx INTEGER NOT NULL, value TEXT, PRIMARY KEY (key, idx))
+
+The 'item' table contains all the keys along with their type and expiration (-1 = no expiration).
+The 'value' column is used by plain values only. List items always occupy a contiguous range
+of 'idx' values so both a length of a list and a position of an item can be obtained
+from the primary key index.
+
+The database is used in the WAL mode (readers do not block a writer and vice versa). Each operation
+is committed at once (even if it consists of multiple SQL statements) and multiple operations
+can be grouped into a single transaction using NativeDb.batch().
+Expired items are ignored by reads and removed by the 'delete_expired' task.
+
+Please note that the layout does not use the 'data' table of the default layout
+(i.e. switching the layout of an existing installation starts with no data).
+"""
+
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from plugins.sqlite3_db import DefaultDb, ALIVE, DEFAULT_SWEEP_CHUNK_SIZE
+
+thread_local = threading.local()
+
+TYPE_STRING = 0
+TYPE_HASH = 1
+TYPE_LIST = 2
+
+# how long a connection waits for a lock held by other process/thread (in seconds)
+DEFAULT_BUSY_TIMEOUT = 10
+
+# max. number of SQL variables used in a single query (SQLite's limit can be as low as 999)
+MAX_QUERY_VARS = 500
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS item (
+    key TEXT PRIMARY KEY,
+    type INTEGER NOT NULL,
+    value TEXT,
+    expires INTEGER NOT NULL DEFAULT -1
+);
+CREATE INDEX IF NOT EXISTS item_expires_idx ON item (expires);
+CREATE TABLE IF NOT EXISTS hash (
+    key TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (key, field)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS list (
+    key TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    value TEXT,
+    PRIMARY KEY (key, idx)
+) WITHOUT ROWID;
+'''
+
+
+class ConnState(object):
+    """
+    A thread-local connection along with a nesting level of the batch() context
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.batch_depth = 0
+
+
+def list_range(length, from_idx, to_idx):
+    """
+    Normalize a Redis-like inclusive range of list items
+
+    returns:
+    a 2-tuple (first, last) of zero-based indices or None if the range is empty
+    """
+    if from_idx < 0:
+        from_idx = max(0, length + from_idx)
+    if to_idx < 0:
+        to_idx = length + to_idx
+    to_idx = min(to_idx, length - 1)
+    if from_idx > to_idx:
+        return None
+    return from_idx, to_idx
+
+
+class NativeDb(DefaultDb):
+
+    def __init__(self, conf):
+        """
+        arguments:
+        conf -- a dictionary containing 'settings' module compatible configuration of the plug-in
+        """
+        super().__init__(conf)
+        self._db_path = conf.get('db_path')
+        self._busy_timeout = int(conf.get('busy_timeout', DEFAULT_BUSY_TIMEOUT))
+
+    def _state(self):
+        if not hasattr(thread_local, 'states'):
+            thread_local.states = {}
+        state = thread_local.states.get(self._db_path)
+        if state is None:
+            conn = sqlite3.connect(self._db_path, timeout=self._busy_timeout)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            conn.executescript(SCHEMA)
+            state = ConnState(conn)
+            thread_local.states[self._db_path] = state
+        return state
+
+    def _conn(self):
+        """
+        Returns thread-local connection
+        """
+        return self._state().conn
+
+    @contextmanager
+    def _write(self):
+        """
+        Provide a cursor for a write operation. The write lock is acquired at once
+        so the operation can safely read data it is going to modify. Changes are
+        committed once the operation is finished unless the operation is a part of a batch.
+        """
+        state = self._state()
+        if not state.conn.in_transaction:
+            state.conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield state.conn.cursor()
+        except Exception:
+            if state.batch_depth == 0:
+                state.conn.rollback()
+            raise
+        if state.batch_depth == 0:
+            state.conn.commit()
+
+    @contextmanager
+    def batch(self):
+        """
+        Group multiple operations into a single transaction (i.e. a single
+        commit). Batches can be nested - the outermost one commits the changes.
+        In case of an error, all the changes made within the batch are rolled back.
+        """
+        state = self._state()
+        state.batch_depth += 1
+        try:
+            yield self
+        except Exception:
+            state.batch_depth -= 1
+            if state.batch_depth == 0:
+                state.conn.rollback()
+            raise
+        state.batch_depth -= 1
+        if state.batch_depth == 0:
+            state.conn.commit()
+
+    def pipeline(self):
+        """
+        Operations within a pipeline are committed at once (see batch())
+        """
+        return self.batch()
+
+    @staticmethod
+    def _item_type(cursor, key):
+        """
+        Return a type of a non-expired item or None if there is no such item
+        """
+        cursor.execute(f'SELECT type FROM item WHERE key = ? AND {ALIVE}', (key, time.time()))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _purge(cursor, key):
+        cursor.execute('DELETE FROM hash WHERE key = ?', (key,))
+        cursor.execute('DELETE FROM list WHERE key = ?', (key,))
+        cursor.execute('DELETE FROM item WHERE key = ?', (key,))
+
+    def _prepare(self, cursor, key, item_type):
+        """
+        Make sure there is a (non-expired) item of a required type
+        so its structure can be modified. An expired item is replaced
+        by a new one.
+        """
+        cursor.execute('SELECT type, expires FROM item WHERE key = ?', (key,))
+        row = cursor.fetchone()
+        if row is not None and -1 < row[1] <= time.time():
+            self._purge(cursor, key)
+            row = None
+        if row is None:
+            cursor.execute('INSERT INTO item (key, type, value, expires) VALUES (?, ?, NULL, -1)',
+                           (key, item_type))
+        elif row[0] != item_type:
+            raise TypeError(f'Invalid type of value stored with key {key}')
+
+    def _check_type(self, cursor, key, item_type):
+        """
+        Test whether there is a non-expired item of a required type. In case
+        the item exists and is of a different type, TypeError is raised.
+        """
+        curr_type = self._item_type(cursor, key)
+        if curr_type is not None and curr_type != item_type:
+            raise TypeError(f'Invalid type of value stored with key {key}')
+        return curr_type is not None
+
+    @staticmethod
+    def _list_bounds(cursor, key):
+        cursor.execute('SELECT MIN(idx), MAX(idx) FROM list WHERE key = ?', (key,))
+        return cursor.fetchone()
+
+    def rename(self, key, new_key):
+        with self._write() as cursor:
+            if self._item_type(cursor, key) is None:
+                return
+            self._purge(cursor, new_key)
+            for table in ('hash', 'list', 'item'):
+                cursor.execute(f'UPDATE {table} SET key = ? WHERE key = ?', (new_key, key))
+
+    def list_get(self, key, from_idx=0, to_idx=-1):
+        cursor = self._conn().cursor()
+        if not self._check_type(cursor, key, TYPE_LIST):
+            return []
+        first, last = self._list_bounds(cursor, key)
+        if first is None:
+            return []
+        rng = list_range(last - first + 1, from_idx, to_idx)
+        if rng is None:
+            return []
+        cursor.execute('SELECT value FROM list WHERE key = ? AND idx BETWEEN ? AND ? ORDER BY idx',
+                       (key, first + rng[0], first + rng[1]))
+        return [json.loads(row[0]) for row in cursor.fetchall()]
+
+    def list_append(self, key, value):
+        with self._write() as cursor:
+            self._prepare(cursor, key, TYPE_LIST)
+            cursor.execute('INSERT INTO list (key, idx, value) '
+                           'SELECT ?, COALESCE(MAX(idx) + 1, 0), ? FROM list WHERE key = ?',
+                           (key, json.dumps(value), key))
+
+    def list_pop(self, key):
+        with self._write() as cursor:
+            if not self._check_type(cursor, key, TYPE_LIST):
+                return None
+            cursor.execute('SELECT idx, value FROM list WHERE key = ? ORDER BY idx LIMIT 1', (key,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            cursor.execute('DELETE FROM list WHERE key = ? AND idx = ?', (key, row[0]))
+            if self._list_bounds(cursor, key)[0] is None:
+                self._purge(cursor, key)
+            return json.loads(row[1])
+
+    def list_len(self, key):
+        cursor = self._conn().cursor()
+        if not self._check_type(cursor, key, TYPE_LIST):
+            return 0
+        first, last = self._list_bounds(cursor, key)
+        return 0 if first is None else last - first + 1
+
+    def list_set(self, key, idx, value):
+        with self._write() as cursor:
+            if not self._check_type(cursor, key, TYPE_LIST):
+                raise IndexError('list index out of range')
+            first, last = self._list_bounds(cursor, key)
+            pos = first + idx if idx >= 0 else last + 1 + idx
+            if not first <= pos <= last:
+                raise IndexError('list index out of range')
+            cursor.execute('UPDATE list SET value = ? WHERE key = ? AND idx = ?', (json.dumps(value), key, pos))
+
+    def list_trim(self, key, keep_left, keep_right):
+        with self._write() as cursor:
+            if not self._check_type(cursor, key, TYPE_LIST):
+                return
+            first, last = self._list_bounds(cursor, key)
+            rng = list_range(last - first + 1, keep_left, keep_right) if first is not None else None
+            if rng is None:
+                self._purge(cursor, key)
+            else:
+                cursor.execute('DELETE FROM list WHERE key = ? AND (idx < ? OR idx > ?)',
+                               (key, first + rng[0], first + rng[1]))
+
+    def hash_get(self, key, field):
+        return self.hash_mget(key, [field])[0]
+
+    def hash_set(self, key, field, value):
+        """
+        Puts a value into a hash table stored under the passed key
+
+        arguments:
+        key -- data access key
+        field -- hash table entry key
+        value -- a value to be stored
+        """
+        self.hash_set_map(key, {field: value})
+
+    def hash_mget(self, key, fields):
+        cursor = self._conn().cursor()
+        if len(fields) == 0 or not self._check_type(cursor, key, TYPE_HASH):
+            return [None] * len(fields)
+        found = {}
+        for i in range(0, len(fields), MAX_QUERY_VARS):
+            chunk = fields[i:i + MAX_QUERY_VARS]
+            cursor.execute('SELECT field, value FROM hash WHERE key = ? AND field IN ({0})'.format(
+                ', '.join(['?'] * len(chunk))), [key] + list(chunk))
+            found.update(cursor.fetchall())
+        return [json.loads(found[f]) if f in found else None for f in fields]
+
+    def hash_del(self, key, field):
+        with self._write() as cursor:
+            if not self._check_type(cursor, key, TYPE_HASH):
+                return
+            cursor.execute('DELETE FROM hash WHERE key = ? AND field = ?', (key, field))
+            cursor.execute('SELECT 1 FROM hash WHERE key = ? LIMIT 1', (key,))
+            if cursor.fetchone() is None:
+                self._purge(cursor, key)
+
+    def hash_get_all(self, key):
+        """
+        Returns a complete hash object (= Python dict) stored under the passed
+        key. If the provided key is not present then an empty dict is returned.
+
+        arguments:
+        key -- data access key
+        """
+        cursor = self._conn().cursor()
+        if not self._check_type(cursor, key, TYPE_HASH):
+            return {}
+        cursor.execute('SELECT field, value FROM hash WHERE key = ?', (key,))
+        return dict((field, json.loads(value)) for field, value in cursor.fetchall())
+
+    def hash_set_map(self, key, mapping):
+        """
+        Set key to value within hash 'name' for each corresponding
+        key and value from the 'mapping' dict (using a single multi-row insert).
+        """
+        if len(mapping) == 0:
+            return True
+        with self._write() as cursor:
+            self._prepare(cursor, key, TYPE_HASH)
+            cursor.executemany('INSERT OR REPLACE INTO hash (key, field, value) VALUES (?, ?, ?)',
+                               [(key, field, json.dumps(value)) for field, value in mapping.items()])
+        return True
+
+    def hash_incr(self, key, field, amount=1):
+        """
+        Atomically increments an integer value within a hash. A missing field
+        is initialized as 'amount'.
+        """
+        with self._write() as cursor:
+            self._prepare(cursor, key, TYPE_HASH)
+            cursor.execute('UPDATE hash SET value = CAST(value AS INTEGER) + ? WHERE key = ? AND field = ?',
+                           (amount, key, field))
+            if cursor.rowcount == 0:
+                cursor.execute('INSERT INTO hash (key, field, value) VALUES (?, ?, ?)', (key, field, amount))
+            cursor.execute('SELECT value FROM hash WHERE key = ? AND field = ?', (key, field))
+            return int(cursor.fetchone()[0])
+
+    def _get_item(self, cursor, key):
+        cursor.execute(f'SELECT type, value, expires FROM item WHERE key = ? AND {ALIVE}', (key, time.time()))
+        return cursor.fetchone()
+
+    def get(self, key, default=None):
+        """
+        Loads data from key->value storage. For compatibility with the default
+        layout, hashes and lists can be obtained this way too.
+
+        arguments:
+        key -- an access key
+        default -- optional value to be returned in case no data is found under the 'key'
+
+        returns:
+        a dictionary containing respective data
+        """
+        row = self._get_item(self._conn().cursor(), key)
+        if row is None:
+            return default
+        if row[0] == TYPE_HASH:
+            return self.hash_get_all(key)
+        elif row[0] == TYPE_LIST:
+            return self.list_get(key)
+        data = json.loads(row[1])
+        if type(data) is dict:
+            data['__timestamp__'] = row[2]
+            data['__key__'] = key
+        return data
+
+    def mget(self, keys):
+        """
+        Gets multiple plain values using a single query per
+        MAX_QUERY_VARS keys.
+
+        arguments:
+        keys -- a list of data access keys
+        """
+        cursor = self._conn().cursor()
+        found = {}
+        for i in range(0, len(keys), MAX_QUERY_VARS):
+            chunk = keys[i:i + MAX_QUERY_VARS]
+            cursor.execute('SELECT key, type, value FROM item WHERE key IN ({0}) AND {1}'.format(
+                ', '.join(['?'] * len(chunk)), ALIVE), list(chunk) + [time.time()])
+            for key, item_type, value in cursor.fetchall():
+                found[key] = json.loads(value) if item_type == TYPE_STRING else self.get(key)
+        return [found.get(key) for key in keys]
+
+    def set(self, key, data):
+        """
+        Saves 'data' with 'key'. Any previous value (including a hash or a list)
+        stored with the key is replaced.
+
+        arguments:
+        key -- an access key
+        data -- a dictionary containing data to be saved
+        """
+        if type(data) is dict:
+            data = dict((k, v) for k, v in data.items() if not k.startswith('__') and not k.endswith('__'))
+        with self._write() as cursor:
+            cursor.execute('DELETE FROM hash WHERE key = ?', (key,))
+            cursor.execute('DELETE FROM list WHERE key = ?', (key,))
+            cursor.execute('INSERT OR REPLACE INTO item (key, type, value, expires) VALUES (?, ?, ?, -1)',
+                           (key, TYPE_STRING, json.dumps(data)))
+
+    def remove(self, key):
+        """
+        Deletes data with passed access key
+
+        arguments:
+        key -- an access key
+        """
+        with self._write() as cursor:
+            self._purge(cursor, key)
+
+    def exists(self, key):
+        """
+        Tests whether the 'key' exists in the storage
+
+        arguments:
+        key -- an access key
+
+        returns:
+        boolean answer
+        """
+        return self._item_type(self._conn().cursor(), key) is not None
+
+    def set_ttl(self, key, ttl):
+        """
+        Set auto expiration timeout in seconds.
+
+        arguments:
+        key -- data access key
+        ttl -- number of seconds to wait before the value is removed
+        (please note that set actions reset the timer to zero)
+        """
+        now = time.time()
+        with self._write() as cursor:
+            cursor.execute(f'UPDATE item SET expires = ? WHERE key = ? AND {ALIVE}', (now + ttl, key, now))
+
+    def get_ttl(self, key):
+        """
+        Return a number of seconds to the expiration of an item, -1 if
+        the item does not expire and -2 if there is no such item (i.e. just like Redis).
+        """
+        row = self._get_item(self._conn().cursor(), key)
+        if row is None:
+            return -2
+        return -1 if row[2] == -1 else max(0, int(row[2] - time.time()))
+
+    def clear_ttl(self, key):
+        now = time.time()
+        with self._write() as cursor:
+            cursor.execute(f'UPDATE item SET expires = -1 WHERE key = ? AND {ALIVE}', (key, now))
+
+    def incr(self, key, amount=1):
+        """
+        Increments the value of 'key' by 'amount'.  If no key exists,
+        the value will be initialized as 'amount'
+        """
+        with self._write() as cursor:
+            self._prepare(cursor, key, TYPE_STRING)
+            cursor.execute('UPDATE item SET value = COALESCE(CAST(value AS INTEGER), 0) + ? WHERE key = ?',
+                           (amount, key))
+            cursor.execute('SELECT value FROM item WHERE key = ?', (key,))
+            return int(cursor.fetchone()[0])
+
+    def set_if_absent(self, key, data, ttl):
+        """
+        An atomic operation "set if not exists" with expiration
+        """
+        now = time.time()
+        with self._write() as cursor:
+            cursor.execute('SELECT expires FROM item WHERE key = ?', (key,))
+            row = cursor.fetchone()
+            if row is not None:
+                if row[0] == -1 or row[0] > now:
+                    return False
+                self._purge(cursor, key)
+            cursor.execute('INSERT INTO item (key, type, value, expires) VALUES (?, ?, ?, ?)',
+                           (key, TYPE_STRING, json.dumps(data), now + ttl))
+            return True
+
+    def delete_expired(self, chunk_size=DEFAULT_SWEEP_CHUNK_SIZE):
+        """
+        Remove all the expired items (including rows of expired hashes and lists).
+        Items are removed in chunks, each within its own transaction.
+
+        arguments:
+        chunk_size -- max. number of items removed within a single transaction
+
+        returns:
+        number of removed items
+        """
+        total = 0
+        while True:
+            with self._write() as cursor:
+                cursor.execute('SELECT key FROM item WHERE expires > -1 AND expires <= ? LIMIT ?',
+                               (time.time(), chunk_size))
+                keys = [row[0] for row in cursor.fetchall()]
+                for i in range(0, len(keys), MAX_QUERY_VARS):
+                    chunk = keys[i:i + MAX_QUERY_VARS]
+                    for table in ('hash', 'list', 'item'):
+                        cursor.execute('DELETE FROM {0} WHERE key IN ({1})'.format(
+                            table, ', '.join(['?'] * len(chunk))), chunk)
+            total += len(keys)
+            if len(keys) < chunk_size:
+                return total
@@ -0,0 +1,110 @@
+# Copyright (c) 2021 Charles University, Faculty of Arts,
+#                    Institute of the Czech National Corpus
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 2
+# dated June, 1991.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+from plugins.sqlite3_db.native import NativeDb
+
+
+class NativeDbTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db = NativeDb(dict(db_path=os.path.join(self.tmp_dir, 'test.db')))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_list_ops(self):
+        for i in range(10):
+            self.db.list_append('l', i)
+        self.assertEqual(0, self.db.list_pop('l'))
+        self.assertEqual(list(range(1, 10)), self.db.list_get('l'))
+        self.assertEqual([8, 9], self.db.list_get('l', -2))
+        self.assertEqual([2, 3, 4], self.db.list_get('l', 1, 3))
+        self.assertEqual([], self.db.list_get('l', 5, 2))
+        self.db.list_set('l', 0, 'first')
+        self.db.list_set('l', -1, 'last')
+        self.assertRaises(IndexError, self.db.list_set, 'l', 9, 'x')
+        self.db.list_trim('l', 0, 2)
+        self.assertEqual(['first', 2, 3], self.db.list_get('l'))
+        self.assertEqual(3, self.db.list_len('l'))
+        self.db.list_trim('l', 5, 10)
+        self.assertFalse(self.db.exists('l'))
+
+    def test_hash_ops(self):
+        self.db.hash_set('h', 'a', {'x': 1})
+        self.db.hash_set_map('h', dict(b=2, c=[3]))
+        self.assertEqual([{'x': 1}, None, [3]], self.db.hash_mget('h', ['a', 'missing', 'c']))
+        self.db.hash_del('h', 'a')
+        self.assertEqual(dict(b=2, c=[3]), self.db.hash_get_all('h'))
+        self.assertEqual(dict(b=2, c=[3]), self.db.get('h'))
+        self.assertRaises(TypeError, self.db.list_append, 'h', 1)
+        self.db.hash_del('h', 'b')
+        self.db.hash_del('h', 'c')
+        self.assertFalse(self.db.exists('h'))
+
+    def test_plain_values(self):
+        self.db.set('a', dict(foo='bar'))
+        self.db.set('b', [1, 2])
+        self.assertEqual([{'foo': 'bar'}, [1, 2], None],
+                         self.db.mget(['a', 'b', 'c']))
+        self.assertEqual(5, self.db.incr('n', 5))
+        self.assertEqual(6, self.db.incr('n'))
+        self.db.rename('b', 'a')
+        self.assertEqual([1, 2], self.db.get('a'))
+        self.assertFalse(self.db.exists('b'))
+
+    def test_expiration(self):
+        self.db.hash_set('h', 'a', 1)
+        self.db.set_ttl('h', 0.1)
+        self.assertTrue(self.db.set_if_absent('lock', 1, 0.1))
+        self.assertFalse(self.db.set_if_absent('lock', 1, 10))
+        time.sleep(0.2)
+        self.assertEqual(-2, self.db.get_ttl('h'))
+        self.assertIsNone(self.db.hash_get('h', 'a'))
+        self.db.hash_set('h', 'b', 2)
+        self.assertEqual(dict(b=2), self.db.hash_get_all('h'))
+        self.assertEqual(-1, self.db.get_ttl('h'))
+        self.assertTrue(self.db.set_if_absent('lock', 2, 10))
+
+    def test_delete_expired(self):
+        for i in range(5):
+            self.db.hash_set('h%d' % i, 'a', i)
+            self.db.set_ttl('h%d' % i, 0.1 if i % 2 == 0 else 10)
+        time.sleep(0.2)
+        self.assertEqual(3, self.db.delete_expired(chunk_size=2))
+        cursor = self.db._conn().cursor()
+        cursor.execute('SELECT COUNT(*) FROM hash')
+        self.assertEqual(2, cursor.fetchone()[0])
+
+    def test_batch(self):
+        with self.db.batch():
+            self.db.set('a', 1)
+            self.db.hash_set('h', 'f', 1)
+        self.assertEqual(1, self.db.get('a'))
+        try:
+            with self.db.batch():
+                self.db.set('a', 2)
+                self.db.list_append('h', 1)
+        except TypeError:
+            pass
+        self.assertEqual(1, self.db.get('a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -106,10 +106,11 @@ class UcnkCorpArch3(MySQLCorparch):
 
     def __init__(self, db_backend, auth, user_items, tag_prefix, max_num_hints,
                  max_page_size, access_req_sender, access_req_smtp_server,
-                 access_req_recipients, default_label, registry_lang):
+                 access_req_recipients, default_label, registry_lang, shared_db=None):
         super().__init__(
             db_backend=db_backend, user_items=user_items, tag_prefix=tag_prefix,
-            max_num_hints=max_num_hints, max_page_size=max_page_size, registry_lang=registry_lang)
+            max_num_hints=max_num_hints, max_page_size=max_page_size, registry_lang=registry_lang,
+            shared_db=shared_db)
         self._auth = auth
         self.access_req_sender = access_req_sender
         self.access_req_smtp_server = access_req_smtp_server
@@ -201,7 +202,7 @@ class UcnkCorpArch3(MySQLCorparch):
 
     def on_soft_reset(self):
         num_items = len(self._corpus_info_cache)
-        self._corpus_info_cache = {}
+        self._corpus_info_cache.clear(shared=True)
         self._keywords = None
         self._colors = {}
         self._descriptions = defaultdict(lambda: {})
@@ -209,8 +210,8 @@ class UcnkCorpArch3(MySQLCorparch):
             'soft reset, cleaning all corpus info caches (pid {}: {} corpora)'.format(os.getpid(), num_items))
 
 
-@inject(plugins.runtime.USER_ITEMS, plugins.runtime.AUTH, plugins.runtime.INTEGRATION_DB)
-def create_instance(conf, user_items, auth, cnc_db):
+@inject(plugins.runtime.USER_ITEMS, plugins.runtime.AUTH, plugins.runtime.INTEGRATION_DB, plugins.runtime.DB)
+def create_instance(conf, user_items, auth, cnc_db, db):
     db_backend = Backend(
         cnc_db, user_table='user', corp_table='corpora', group_acc_table='relation',
         user_acc_table='user_corpus_relation', user_acc_corp_attr='corpus_id',
@@ -227,4 +228,5 @@ def create_instance(conf, user_items, auth, cnc_db):
         access_req_sender=conf.get('plugins', 'corparch')['access_req_sender'],
         access_req_recipients=conf.get('plugins', 'corparch')['access_req_recipients'],
         default_label=conf.get('plugins', 'corparch')['default_label'],
-        registry_lang=conf.get('corpora', 'manatee_registry_locale', 'en_US'))
+        registry_lang=conf.get('corpora', 'manatee_registry_locale', 'en_US'),
+        shared_db=db)
@@ -19,6 +19,41 @@ import numpy as np
 import pulp
 
 
+class SparseRows(object):
+    """
+    A matrix in the CSR (compressed sparse row) format. Nonzero values of the i-th row
+    are stored in data[indptr[i]:indptr[i + 1]] and their column indices
+    in indices[indptr[i]:indptr[i + 1]].
+
+    arguments:
+    rows -- a list of 2-tuples (column indices, values) - one for each row
+    num_cols -- number of columns
+    """
+
+    def __init__(self, rows, num_cols):
+        self.shape = (len(rows), num_cols)
+        self.indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum([len(cols) for cols, _ in rows])
+        self.indices = np.zeros(self.indptr[-1], dtype=np.int64)
+        self.data = np.zeros(self.indptr[-1], dtype=np.float64)
+        for i, (cols, values) in enumerate(rows):
+            self.indices[self.indptr[i]:self.indptr[i + 1]] = cols
+            self.data[self.indptr[i]:self.indptr[i + 1]] = values
+
+    def row(self, i):
+        """
+        Return a 2-tuple (column indices, values) of nonzero items of a row
+        """
+        return self.indices[self.indptr[i]:self.indptr[i + 1]], self.data[self.indptr[i]:self.indptr[i + 1]]
+
+    def dot_row(self, i, vector):
+        """
+        Return a dot product of a row and a (dense) vector
+        """
+        cols, values = self.row(i)
+        return np.dot(values, np.asarray(vector)[cols])
+
+
 class CorpusComposition(object):
 
     def __init__(self, status, variables, size_assembled, category_sizes, used_bounds, num_texts=None):
@@ -44,6 +79,10 @@ class MetadataModel:
     meta_db -- a Database instance
     category_tree -- a tree holding the user input
     id_attr -- an unique identifier of a 'bibliography' item (defined in corpora.xml).
+
+    The coefficient matrix (A) is stored as a sparse matrix (each category condition
+    typically matches just a small part of all the texts) and the solver's constraints
+    are created directly from its nonzero items.
     """
 
     def __init__(self, meta_db, category_tree, id_attr):
@@ -56,12 +95,12 @@ class MetadataModel:
         # no matter whether they have matching aligned counterparts
         self.num_texts = len(self.text_sizes)
         self.b = [0] * (self.c_tree.num_categories - 1)
-        self.A = np.zeros((self.c_tree.num_categories, self.num_texts))
-        used_ids = set()
-        self._init_ab(self.c_tree.root_node, used_ids)
-        # for items without aligned counterparts we create
-        # conditions fulfillable only for x[i] = 0
-        self._init_ab_nonalign(used_ids)
+        rows = [(np.zeros(0, dtype=np.int64), np.zeros(0))] * len(self.b)
+        used = np.zeros(self.num_texts, dtype=bool)
+        self._init_ab(self.c_tree.root_node, rows, used)
+        self.A = SparseRows(rows, self.num_texts)
+        # items without aligned counterparts can be only x[i] = 0
+        self.x_max = self._init_ab_nonalign(used)
 
     def _get_text_sizes(self):
         """
@@ -93,16 +132,18 @@ class MetadataModel:
             i += 1
         return sizes, id_map
 
-    def _init_ab_nonalign(self, used_ids):
-        # Now we process items with no aligned counterparts.
-        # In this case we must define a condition which will be
-        # fulfilled iff X[i] == 0
-        for k, v in list(self._id_map.items()):
-            if k not in used_ids:
-                for i in range(1, len(self.b)):
-                    self.A[i][v] = self.b[i] * 2 if self.b[i] > 0 else 10000
+    @staticmethod
+    def _init_ab_nonalign(used):
+        """
+        Now we process items with no aligned counterparts. Instead of additional
+        conditions fulfilled iff X[i] == 0, such items just get the upper bound 0.
+
+        returns:
+        a vector of upper bounds of all the X[i] variables
+        """
+        return np.where(used, 1, 0)
 
-    def _init_ab(self, node, used_ids):
+    def _init_ab(self, node, rows, used):
         """
         Initialization method for coefficient matrix (A) and vector of bounds (b)
         Recursively traverses all nodes of given categoryTree starting from its root.
@@ -110,7 +151,8 @@ class MetadataModel:
 
         args:
         node -- currently processed node of the categoryTree
-        used_ids -- a set of ids used in previous nodes
+        rows -- a list of rows (column indices, values) of the coefficient matrix
+        used -- a vector marking texts used in previous nodes
         """
         if node.metadata_condition is not None:
             sql_items = ['m1.{0} {1} ?'.format(mc.attr, mc.op)
@@ -126,14 +168,16 @@ class MetadataModel:
             sql_args += [mc.value for subl in node.metadata_condition for mc in subl]  # 'WHERE' args
             sql_args.append(self._db.corpus_id)
             self._db.execute(sql, sql_args)
-            for row in self._db.fetchall():
-                self.A[node.node_id - 1][self._id_map[row[0]]] = row[1]
-                used_ids.add(row[0])
+            data = self._db.fetchall()
+            cols = np.fromiter((self._id_map[row[0]] for row in data), dtype=np.int64, count=len(data))
+            values = np.fromiter((row[1] for row in data), dtype=np.float64, count=len(data))
+            rows[node.node_id - 1] = (cols, values)
+            used[cols] = True
             self.b[node.node_id - 1] = node.size
 
         if len(node.children) > 0:
             for child in node.children:
-                self._init_ab(child, used_ids)
+                self._init_ab(child, rows, used)
 
     def solve(self):
         """
@@ -149,32 +193,33 @@ class MetadataModel:
 
         x_min = 0
         x_max = 1
-        num_conditions = len(self.b)
-        x = pulp.LpVariable.dicts('x', list(range(self.num_texts)), x_min, x_max)
+        # variables with the upper bound 0 are not needed at all
+        x = dict((j, pulp.LpVariable('x_%d' % j, x_min, x_max)) for j in np.flatnonzero(self.x_max).tolist())
         lp_prob = pulp.LpProblem('Minmax Problem', pulp.LpMaximize)
-        lp_prob += pulp.lpSum(x), 'Minimize_the_maximum'
-        for i in range(num_conditions):
+        lp_prob += pulp.LpAffineExpression([(v, 1) for v in x.values()]), 'Minimize_the_maximum'
+        for i in range(len(self.b)):
+            cols, values = self.A.row(i)
+            if len(cols) == 0:
+                continue  # an empty condition (0 <= b[i]) is always fulfilled
             label = 'Max_constraint_%d' % i
-            condition = pulp.lpSum([self.A[i][j] * x[j]
-                                    for j in range(self.num_texts)]) <= self.b[i]
-            lp_prob += condition, label
+            condition = pulp.LpConstraint(
+                pulp.LpAffineExpression(zip([x[j] for j in cols.tolist()], values.tolist())),
+                sense=pulp.LpConstraintLE, rhs=self.b[i], name=label)
+            lp_prob += condition
 
         stat = lp_prob.solve()
 
-        variables = [0] * self.num_texts
-        # transform Pulp's variables (x_[number]) back to
-        # the indices we need
-        for v in lp_prob.variables():
-            if v.name == '__dummy':
-                continue
-            i = int(v.name[2:len(v.name)])
-            variables[i] = np.round(v.varValue, decimals=0)
+        values = np.zeros(self.num_texts)
+        for j, v in x.items():
+            values[j] = v.varValue or 0
+        values = np.round(values, decimals=0)
+        variables = list(values)
 
         category_sizes = []
         for c in range(0, self.c_tree.num_categories - 1):
-            cat_size = self._get_category_size(variables, c)
+            cat_size = self._get_category_size(values, c)
             category_sizes.append(cat_size)
-        size_assembled = self._get_assembled_size(variables)
+        size_assembled = self._get_assembled_size(values)
 
         return CorpusComposition(status=pulp.LpStatus[stat], variables=variables, size_assembled=size_assembled,
                                  category_sizes=category_sizes, used_bounds=self.b, num_texts=sum(variables))
@@ -183,5 +228,4 @@ class MetadataModel:
         return np.dot(results, self.text_sizes)
 
     def _get_category_size(self, results, cat_id):
-        category_sizes = self.A[cat_id][:]
-        return np.dot(results, category_sizes)
+        return self.A.dot_row(cat_id, results)
@@ -0,0 +1,103 @@
+# Copyright (c) 2021 Charles University, Faculty of Arts,
+#                    Institute of the Czech National Corpus
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 2
+# dated June, 1991.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+
+"""
+A benchmark of the subcmixer's optimization model. The script generates a synthetic
+metadata database (or uses an existing one generated before) with a specified number
+of documents and measures how long it takes to build and solve the model for
+a mix based on two attributes (text type and year).
+"""
+
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+from plugins.ucnk_subcmixer.database import Database
+from plugins.ucnk_subcmixer.category_tree import CategoryTree, CategoryExpression
+from plugins.ucnk_subcmixer.metadata_model import MetadataModel
+
+CORPUS_ID = 'synthetic'
+
+TEXT_TYPES = ('fiction', 'news', 'science', 'blog')
+
+YEARS = tuple(str(y) for y in range(2000, 2020))
+
+CORPUS_MAX_SIZE = 500000000
+
+
+def create_db(db_path, num_docs, seed):
+    random.seed(seed)
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, corpus_id TEXT, item_id TEXT, doc_id TEXT, '
+                 'doc_txtype TEXT, doc_year TEXT, poscount INTEGER)')
+    conn.executemany(
+        'INSERT INTO item (corpus_id, item_id, doc_id, doc_txtype, doc_year, poscount) VALUES (?, ?, ?, ?, ?, ?)',
+        ((CORPUS_ID, 'doc%d' % i, 'doc%d' % i, random.choice(TEXT_TYPES), random.choice(YEARS),
+          random.randint(100, 10000)) for i in range(num_docs)))
+    conn.execute('CREATE INDEX item_corpus_id_idx ON item (corpus_id, doc_txtype, doc_year)')
+    conn.commit()
+    conn.close()
+
+
+def mk_conditions():
+    """
+    Create a category list (just like SubcMixer._import_task_args does) requiring
+    equal shares of all the text types and of two selected years within each of them
+    """
+    ans = [[0, None, 1, None]]
+    counter = 1
+    for txtype in TEXT_TYPES:
+        ans.append([counter, 0, 1. / len(TEXT_TYPES), CategoryExpression('doc.txtype', '==', txtype)])
+        parent = counter
+        counter += 1
+        for year in YEARS[:2]:
+            ans.append([counter, parent, 0.5, CategoryExpression('doc.year', '==', year)])
+            counter += 1
+    return ans
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark subcmixer optimization model')
+    parser.add_argument('db_path', metavar='DB_PATH', type=str,
+                        help='Path to a metadata database (created if it does not exist)')
+    parser.add_argument('-n', '--num-docs', type=int, default=100000,
+                        help='Number of documents in a newly created database (default is 100000)')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='Random generator seed')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db_path):
+        t0 = time.time()
+        create_db(args.db_path, args.num_docs, args.seed)
+        print('Created database with {0} documents in {1:.2f}s'.format(args.num_docs, time.time() - t0))
+
+    db = Database(db_path=args.db_path, table_name='item', corpus_id=CORPUS_ID, id_attr='doc.id',
+                  aligned_corpora=[])
+    t0 = time.time()
+    cat_tree = CategoryTree(mk_conditions(), db, 'item', CORPUS_MAX_SIZE)
+    t1 = time.time()
+    mm = MetadataModel(meta_db=db, category_tree=cat_tree, id_attr='doc_id')
+    t2 = time.time()
+    result = mm.solve()
+    t3 = time.time()
+    print('texts: {0}, categories: {1}, nonzero coefficients: {2}'.format(
+        mm.num_texts, len(mm.b), len(mm.A.data)))
+    print('category tree: {0:.2f}s, model: {1:.2f}s, solve: {2:.2f}s'.format(t1 - t0, t2 - t1, t3 - t2))
+    print(result)
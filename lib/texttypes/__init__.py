@@ -171,16 +171,26 @@ class TextTypes(object):
                 k = item.split('.')[0]
                 struct_calc[k] = CachedStructNormsCalc(self._corp, k, subcnorm, self._tt_cache)
             cache_ok = True
-            for col in reduce(lambda p, c: p + c['Line'], tt, []):
-                if 'textboxlength' not in col:
-                    structname, attrname = col['name'].split('.')
-                    for val in col['Values']:
-                        try:
-                            v = struct_calc[structname].compute_norm(attrname, val['v'])
-                        except KeyError:
-                            v = 0  # no problem here as the value is actually not required by subcorpattrs
-                            cache_ok = False
-                        val['xcnt'] = v
+            cols = [col for col in reduce(lambda p, c: p + c['Line'], tt, []) if 'textboxlength' not in col]
+            required = collections.defaultdict(list)
+            for col in cols:
+                structname, attrname = col['name'].split('.')
+                required[structname].append(attrname)
+            for structname, attrnames in required.items():
+                if structname in struct_calc:
+                    struct_calc[structname].precalc(attrnames)
+            for col in cols:
+                structname, attrname = col['name'].split('.')
+                calc = struct_calc.get(structname)
+                for val in col['Values']:
+                    if calc is None:
+                        val['xcnt'] = 0  # no problem here as the value is actually not required by subcorpattrs
+                        continue
+                    try:
+                        val['xcnt'] = calc.compute_norm(attrname, val['v'])
+                    except KeyError:
+                        val['xcnt'] = 0  # the value is not in the corpus (= outdated tt cache)
+                        cache_ok = False
             if not cache_ok:
                 self._tt_cache.clear(self._corp)
                 logging.getLogger(__name__).warning(
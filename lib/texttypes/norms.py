@@ -18,7 +18,10 @@
 # 02110-1301, USA.
 
 from functools import partial
+from typing import Dict, Iterable
 import collections
+import corplib
+import settings
 from .cache import TextTypesCache
 from corplib.corpus import KCorpus
 
@@ -77,13 +80,26 @@ class StructNormsCalc(object):
             r.next()
         return cnt
 
+    def compute_norms(self, attrname) -> Dict[str, int]:
+        """
+        Compute norms of all the values of an attribute in a single
+        pass over the structure.
+        """
+        attr = self._struct.get_attr(attrname)
+        norms = corplib.struct_attr_norms(self._corp, self._structname, attrname, self._subcnorm,
+                                          cache_dir=settings.get('corpora', 'struct_norms_cache_dir'))
+        return dict((attr.id2str(i), v) for i, v in enumerate(norms))
+
 
 class CachedStructNormsCalc(StructNormsCalc):
     """
     A caching variant of StructNormsCalc. Uses 'db' key=>value plug-in to
-    store values.
+    store values. Norms are always calculated and stored for all the values
+    of an attribute at once.
     """
 
+    COMPLETE_ATTRS_KEY = '__complete__'
+
     def __init__(self, corpus: KCorpus, structname, subcnorm, tt_cache: TextTypesCache):
         """
         arguments:
@@ -96,14 +112,39 @@ class CachedStructNormsCalc(StructNormsCalc):
         self._tt_cache = tt_cache
         mkdict = partial(collections.defaultdict, lambda: {})
         try:
-            self._data = mkdict(self._tt_cache.get_attr_values(corpus.corpname, structname, subcnorm))
+            stored = dict(self._tt_cache.get_attr_values(corpus.corpname, structname, subcnorm))
         except (IOError, TypeError):
-            self._data = mkdict()
+            stored = {}
+        # attributes with all the values calculated
+        self._complete = set(stored.pop(self.COMPLETE_ATTRS_KEY, []))
+        self._data = mkdict(stored)
+
+    def _store(self):
+        data = dict(self._data)
+        data[self.COMPLETE_ATTRS_KEY] = sorted(self._complete)
+        self._tt_cache.set_attr_values(self._corp.corpname, self._structname, self._subcnorm, data)
+
+    def precalc(self, attrnames: Iterable[str]):
+        """
+        Calculate and store norms of all the values of the provided
+        attributes (at once).
+        """
+        missing = [a for a in attrnames if a not in self._complete]
+        for attrname in missing:
+            self._data[attrname] = super(CachedStructNormsCalc, self).compute_norms(attrname)
+            self._complete.add(attrname)
+        if len(missing) > 0:
+            self._store()
+
+    def compute_norms(self, attrname) -> Dict[str, int]:
+        self.precalc([attrname])
+        return self._data[attrname]
 
     def compute_norm(self, attrname, value):
-        if attrname not in self._data or value not in self._data[attrname]:
-            self._data[attrname][value] = super(
-                CachedStructNormsCalc, self).compute_norm(attrname, value)
-            self._tt_cache.set_attr_values(self._corp.corpname, self._structname, self._subcnorm, self._data)
+        """
+        Return a norm of a value. As norms are calculated for all the values
+        of an attribute, a KeyError is raised for values not found in the corpus.
+        """
+        if attrname not in self._complete:
+            self.compute_norms(attrname)
         return self._data[attrname][value]
-
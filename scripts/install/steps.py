@@ -290,6 +290,7 @@ class SetupKontext(InstallationStep):
         create_directory('/var/local/corpora/subcorp', WEBSERVER_USER, WEBSERVER_USER, 0o2775)
         create_directory('/var/local/corpora/freqs-precalc', WEBSERVER_USER, WEBSERVER_USER, 0o2775)
         create_directory('/var/local/corpora/freqs-cache', WEBSERVER_USER, WEBSERVER_USER, 0o2775)
+        create_directory('/var/local/corpora/struct-norms-cache', WEBSERVER_USER, WEBSERVER_USER, 0o2775)
         create_directory('/var/local/corpora/colls-cache', WEBSERVER_USER, WEBSERVER_USER, 0o2775)
 
         create_directory('/var/log/kontext', WEBSERVER_USER, None)
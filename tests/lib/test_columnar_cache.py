@@ -0,0 +1,59 @@
+# Copyright (c) 2021 Institute of the Czech National Corpus
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 2
+# dated June, 1991.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+import os
+import tempfile
+import unittest
+
+from bgcalc import columnar_cache
+
+
+class ColumnarCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'test.kcol')
+        self.items = [dict(Word=[{'n': 'word%d' % i}], freq=i, rel=i / 2., norel='' if i % 2 else 1, relbar=None)
+                      for i in range(100)]
+        columnar_cache.save(self.path, dict(conc_size=1000),
+                            [(dict(Head=[{'n': 'word'}]), self.items), (dict(Head=[]), [])])
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_meta(self):
+        with columnar_cache.ColumnarResult(self.path) as data:
+            self.assertEqual(dict(conc_size=1000), data.meta)
+            self.assertEqual(2, len(data.tables))
+            self.assertEqual(dict(Head=[{'n': 'word'}]), data.tables[0].meta)
+            self.assertEqual(100, data.tables[0].num_rows)
+            self.assertEqual(0, data.tables[1].num_rows)
+
+    def test_full_load(self):
+        with columnar_cache.ColumnarResult(self.path) as data:
+            self.assertEqual(self.items, data.tables[0].rows())
+            self.assertEqual([], data.tables[1].rows())
+
+    def test_slicing(self):
+        with columnar_cache.ColumnarResult(self.path) as data:
+            self.assertEqual(self.items[10:20], data.tables[0].rows(10, 20))
+            self.assertEqual(self.items[95:120], data.tables[0].rows(95, 120))
+            self.assertEqual([], data.tables[0].rows(120, 140))
+
+    def test_invalid_file(self):
+        with open(self.path, 'wb') as fw:
+            fw.write(b'foo bar baz')
+        self.assertRaises(ValueError, lambda: columnar_cache.ColumnarResult(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+# Copyright (c) 2021 Institute of the Czech National Corpus
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 2
+# dated June, 1991.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+import os
+import tempfile
+import unittest
+
+from bgcalc import csv_cache
+
+
+def by_freq(rows):
+    return sorted(range(len(rows)), key=lambda i: rows[i][1])
+
+
+class CsvCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'test.csv')
+        self.rows = [('word "%d", x' % i, (i * 7) % 13) for i in range(50)]
+        csv_cache.save_cached(self.path, len(self.rows), self.rows, dict(freq=by_freq))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_partial(self):
+        self.assertEqual((50, self.rows[10:20]), csv_cache.load_cached_partial(self.path, 10, 10))
+        self.assertEqual((50, self.rows[45:]), csv_cache.load_cached_partial(self.path, 45, 10))
+        self.assertEqual((50, []), csv_cache.load_cached_partial(self.path, 60, 10))
+
+    def test_full(self):
+        self.assertEqual((50, self.rows), csv_cache.load_cached_full(self.path))
+
+    def test_sorted(self):
+        srt = sorted(self.rows, key=lambda x: x[1])
+        self.assertEqual(srt[5:15], csv_cache.load_cached_sorted(self.path, 5, 10, 'freq', by_freq)[1])
+        self.assertEqual(sorted(self.rows, key=lambda x: x[1], reverse=True)[:10],
+                         csv_cache.load_cached_sorted(self.path, 0, 10, 'freq', by_freq, True)[1])
+        self.assertEqual(list(reversed(self.rows))[:5],
+                         csv_cache.load_cached_sorted(self.path, 0, 5, reverse=True)[1])
+
+    def test_missing_indices(self):
+        for item in os.listdir(self.tmp_dir.name):
+            if item != 'test.csv':
+                os.unlink(os.path.join(self.tmp_dir.name, item))
+        by_value = lambda rows: sorted(range(len(rows)), key=lambda i: rows[i][0])
+        self.assertEqual(sorted(self.rows)[:3],
+                         csv_cache.load_cached_sorted(self.path, 0, 3, 'value', by_value)[1])
+        self.assertEqual(self.rows[3:6], csv_cache.load_cached_partial(self.path, 3, 3)[1])
+        self.assertEqual(sorted(self.rows, key=lambda x: x[1], reverse=True)[20:30],
+                         csv_cache.load_cached_sorted(self.path, 20, 10, 'freq', by_freq, True)[1])
+
+    def test_quoted_newlines(self):
+        rows = [('line\r\nbreak %d' % i, i) for i in range(10)]
+        csv_cache.save_cached(self.path, len(rows), rows)
+        os.unlink(self.path + '.idx')
+        self.assertEqual(rows[4:7], csv_cache.load_cached_partial(self.path, 4, 3)[1])
+        self.assertEqual((10, rows), csv_cache.load_cached_full(self.path))
+
+    def test_outdated_index(self):
+        with open(self.path + '.idx', 'rb') as fr:
+            old_index = fr.read()
+        rows = [('x%d' % i, i) for i in range(70)]
+        csv_cache.save_cached(self.path, len(rows), rows)
+        with open(self.path + '.idx', 'wb') as fw:
+            fw.write(old_index)
+        self.assertEqual(rows[60:], csv_cache.load_cached_partial(self.path, 60, 20)[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
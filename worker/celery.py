@@ -31,7 +31,6 @@ complete and properly configured KonText package.
 
 import os
 import sys
-import pickle
 
 APP_PATH = os.path.realpath(f'{os.path.dirname(os.path.abspath(__file__))}/..')
 sys.path.insert(0, f'{APP_PATH}/lib')
@@ -101,19 +100,7 @@ def clean_colls_cache():
 # ----------------------------- FREQUENCY DISTRIBUTION ------------------------
 
 
-class FreqsTask(app.Task):
-
-    cache_data = None
-    cache_path = None
-
-    def after_return(self, *args, **kw):
-        if self.cache_data:
-            with open(self.cache_path, 'wb') as f:
-                pickle.dump(self.cache_data, f)
-                self.cache_data = None
-
-
-@app.task(base=FreqsTask, name='calculate_freqs')
+@app.task(name='calculate_freqs')
 def calculate_freqs(args):
     return general.calculate_freqs(args)
 
@@ -149,6 +136,11 @@ def compile_arf(user_id, corp_id, subcorp: str, attr, logfile):
 def compile_docf(user_id, corp_id, subcorp: str, attr, logfile):
     return general.compile_docf(user_id, corp_id, subcorp, attr, logfile)
 
+
+@app.task(name='precalc_tt_norms')
+def precalc_tt_norms(user_id, corp_id, subcorp: str, subcnorm):
+    return general.precalc_tt_norms(user_id, corp_id, subcorp, subcnorm)
+
 # ----------------------------- SUBCORPORA ------------------------------------
 
 
@@ -33,7 +33,8 @@ import os
 import importlib.util
 import sys
 import time
-import pickle
+import re
+import collections
 
 APP_PATH = os.path.realpath(f'{os.path.dirname(os.path.abspath(__file__))}/..')
 sys.path.insert(0, f'{APP_PATH}/../lib')
@@ -71,6 +72,9 @@ from corplib import CorpusManager
 from corplib.corpus import KCorpus
 from bgcalc import (freq_calc, subc_calc, coll_calc, pquery, wordlist)
 from argmapping.wordlist import WordlistFormArgs
+from texttypes.cache import TextTypesCache
+from texttypes.norms import CachedStructNormsCalc
+import plugins
 
 stderr_redirector = get_stderr_redirector(settings)
 
@@ -219,8 +223,7 @@ def calculate_colls(coll_args: coll_calc.CollCalcArgs):
     """
     ans = coll_calc.calculate_colls_bg(coll_args)
     if not ans['processing'] and len(ans['data']['Items']) > 0:
-        with open(coll_args.cache_path, 'wb') as f:
-            pickle.dump(ans['data'], f)
+        coll_calc.save_colls_cache(coll_args.cache_path, ans['data'])
     return ans
 
 
@@ -233,13 +236,10 @@ def clean_colls_cache():
 
 def calculate_freqs(args):
     args = freq_calc.FreqCalsArgs(**args)
-    calculate_freqs.cache_path = args.cache_path
     ans = freq_calc.calculate_freqs_bg(args)
     trigger_cache_limit = settings.get_int('corpora', 'freqs_cache_min_lines', 10)
     if args.force_cache or max(len(d.get('Items', ())) for d in ans['freqs']) >= trigger_cache_limit:
-        calculate_freqs.cache_data = ans
-    else:
-        calculate_freqs.cache_data = None
+        freq_calc.save_freqs_cache(args.cache_path, ans)
     return ans
 
 
@@ -320,6 +320,28 @@ def compile_docf(user_id, corp_id, subcorp, attr, logfile):
                                   doc_struct, attr, corp_id))
 
 
+def precalc_tt_norms(user_id, corp_id, subcorp, subcnorm):
+    """
+    Precalculate sizes of all the text types (structural attribute values
+    listed in SUBCORPATTRS) so the first text types form rendering is fast.
+    The task is intended to be scheduled (see conf/beatconfig.sample.py or
+    conf/rq-schedule-conf.sample.json) for large corpora, typically after
+    their data are updated.
+    """
+    corp = _load_corp(corp_id, subcorp, user_id)
+    subcorpattrs = corp.get_conf('SUBCORPATTRS') or corp.get_conf('FULLREF')
+    if not subcorpattrs or subcorpattrs == '#':
+        return {'message': 'no text types to process'}
+    required = collections.defaultdict(list)
+    for item in re.split(r'\s*[,|]\s*', subcorpattrs):
+        structname, attrname = item.split('.')
+        required[structname].append(attrname)
+    tt_cache = TextTypesCache(plugins.runtime.DB.instance)
+    for structname, attrnames in required.items():
+        CachedStructNormsCalc(corp, structname, subcnorm, tt_cache).precalc(attrnames)
+    return {'message': 'OK'}
+
+
 # ----------------------------- SUBCORPORA ------------------------------------
 
 
@@ -104,6 +104,10 @@ def compile_arf(user_id, corp_id, subcorp: str, attr, logfile):
 def compile_docf(user_id, corp_id, subcorp: str, attr, logfile):
     return general.compile_docf(user_id, corp_id, subcorp, attr, logfile)
 
+
+def precalc_tt_norms(user_id, corp_id, subcorp: str, subcnorm):
+    return general.precalc_tt_norms(user_id, corp_id, subcorp, subcnorm)
+
 # ----------------------------- WORD LIST -------------------------------------
 
 